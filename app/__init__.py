@@ -2,6 +2,7 @@
 
 from flask import Flask
 from app.extensions import init_extensions
+from app.registro import configurar_registro
 from app.config import config_by_name
 
 
@@ -10,6 +11,7 @@ def create_app(config_name='development'):
     app = Flask(__name__, static_folder='../static', static_url_path='/')
     app.config.from_object(config_by_name[config_name])
 
+    configurar_registro(app)
     init_extensions(app)
     
     from .control import control
@@ -23,6 +25,12 @@ def create_app(config_name='development'):
 
     from .ronda import ronda
     app.register_blueprint(ronda)
+
+    from .torneos import torneos
+    app.register_blueprint(torneos)
+
+    from .metricas import metricas
+    app.register_blueprint(metricas)
     
     return app
 
@@ -0,0 +1,219 @@
+# app/almacen_preguntas.py
+
+import json
+import os
+import sys
+import threading
+
+from app.duplicados import DetectorDuplicados
+from app.indice_preguntas import IndicePreguntas
+
+
+class Pregunta:
+    """Registro compacto de una pregunta del banco.
+
+    Las respuestas se guardan como tuplas ``(respuesta, pts)`` y el tema se
+    interna, porque miles de preguntas comparten unas pocas categorías. La
+    dificultad es opcional; sin ella el índice la deduce de los puntos.
+    """
+
+    __slots__ = ("tema", "pregunta", "respuestas", "dificultad")
+
+    def __init__(self, tema, pregunta, respuestas, dificultad=None):
+        self.tema = sys.intern(tema)
+        self.pregunta = pregunta
+        self.respuestas = tuple(respuestas)
+        self.dificultad = dificultad
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(
+            datos["tema"],
+            datos["pregunta"],
+            ((respuesta["respuesta"], respuesta["pts"]) for respuesta in datos["respuestas"]),
+            datos.get("dificultad"),
+        )
+
+    def a_dict(self):
+        datos = {
+            "tema": self.tema,
+            "pregunta": self.pregunta,
+            "respuestas": [{"respuesta": respuesta, "pts": pts} for respuesta, pts in self.respuestas],
+        }
+        if self.dificultad:
+            datos["dificultad"] = self.dificultad
+        return datos
+
+
+def _serializar(pregunta):
+    return json.dumps(pregunta.a_dict(), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _escribir_atomico(ruta, lineas):
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        archivo.writelines(lineas)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+    if hasattr(os, "O_DIRECTORY"):
+        descriptor = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+class AlmacenPreguntasJSONL:
+    """Banco de preguntas como log JSONL de solo anexado.
+
+    Las inserciones se anexan al final del archivo y se sincronizan a disco;
+    las reescrituras completas (compactación) usan un archivo temporal y
+    ``os.replace`` para que nunca quede un banco a medio escribir. Si existe
+    un ``preguntas.json`` con el formato anterior y aún no hay log, se migra.
+    """
+
+    def __init__(self, ruta, ruta_legada=None):
+        self.ruta = ruta
+        self.ruta_legada = ruta_legada
+
+    def cargar(self):
+        if not os.path.exists(self.ruta):
+            preguntas = [Pregunta.desde_dict(datos) for datos in self._cargar_legado()]
+            self.compactar(preguntas)
+            return preguntas
+
+        lineas_danadas = []
+        preguntas = list(self.iterar(lineas_danadas))
+        if lineas_danadas:
+            self.compactar(preguntas)
+        return preguntas
+
+    def iterar(self, lineas_danadas=None):
+        """Recorre el log línea a línea sin cargar el archivo completo."""
+        with open(self.ruta, "r", encoding="utf-8") as archivo:
+            for numero, linea in enumerate(archivo, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    yield Pregunta.desde_dict(json.loads(linea))
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    # Una escritura interrumpida deja una última línea incompleta.
+                    if lineas_danadas is not None:
+                        lineas_danadas.append(numero)
+
+    def agregar(self, preguntas):
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            archivo.writelines(_serializar(pregunta) for pregunta in preguntas)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def compactar(self, preguntas):
+        _escribir_atomico(self.ruta, (_serializar(pregunta) for pregunta in preguntas))
+
+    def _cargar_legado(self):
+        if self.ruta_legada and os.path.exists(self.ruta_legada):
+            with open(self.ruta_legada, "r", encoding="utf-8") as archivo:
+                return json.load(archivo)
+        return []
+
+
+class BancoPreguntas:
+    """Banco de preguntas que se carga e indexa la primera vez que se usa.
+
+    Las preguntas repetidas o casi repetidas respecto a las existentes no se
+    agregan; ``deduplicar`` limpia las que ya estaban en el banco.
+    """
+
+    def __init__(self, almacen, umbral_duplicados=0.85):
+        self.almacen = almacen
+        self.umbral_duplicados = umbral_duplicados
+        self._indice = None
+        self._duplicados = None
+        self._lock = threading.Lock()
+
+    @property
+    def indice(self):
+        if self._indice is None:
+            with self._lock:
+                if self._indice is None:
+                    self._indice = IndicePreguntas(self.almacen.cargar())
+        return self._indice
+
+    @property
+    def duplicados(self):
+        if self._duplicados is None:
+            preguntas = self.preguntas
+            with self._lock:
+                if self._duplicados is None:
+                    detector = DetectorDuplicados(self.umbral_duplicados)
+                    for posicion, pregunta in enumerate(preguntas):
+                        detector.agregar(posicion, pregunta.pregunta)
+                    self._duplicados = detector
+        return self._duplicados
+
+    @property
+    def preguntas(self):
+        return self.indice.preguntas
+
+    def buscar_parecida(self, texto):
+        """Devuelve la pregunta del banco igual o casi igual a ``texto``, o ``None``."""
+        parecida = self.duplicados.buscar(texto)
+        return self.preguntas[parecida[0]] if parecida else None
+
+    def agregar(self, preguntas):
+        """Agrega las preguntas nuevas y devuelve ``(repetida, existente)`` por cada descartada."""
+        indice = self.indice
+        detector = self.duplicados
+        with self._lock:
+            nuevas, repetidas = [], []
+            total = len(indice.preguntas)
+            try:
+                for pregunta in preguntas:
+                    parecida = detector.agregar_si_nueva(total + len(nuevas), pregunta.pregunta)
+                    if parecida is None:
+                        nuevas.append(pregunta)
+                    elif parecida[0] < total:
+                        repetidas.append((pregunta, indice.preguntas[parecida[0]]))
+                    else:
+                        repetidas.append((pregunta, nuevas[parecida[0] - total]))
+                if nuevas:
+                    self.almacen.agregar(nuevas)
+            except BaseException:
+                # El detector ya registró las nuevas para encontrar repetidas
+                # dentro del mismo lote; si no se escribieron, se olvidan para
+                # no rechazar después preguntas que no están en el banco.
+                for posicion in range(total, total + len(nuevas)):
+                    detector.quitar(posicion)
+                raise
+            for pregunta in nuevas:
+                indice.agregar(pregunta)
+        return repetidas
+
+    def deduplicar(self, umbral=None, simular=False):
+        """Reescribe el banco conservando la primera aparición de cada pregunta repetida.
+
+        Devuelve los pares ``(repetida, conservada)``; con ``simular`` no se
+        modifica nada.
+        """
+        # El recorrido se hace con el lock tomado: una pregunta agregada
+        # mientras tanto se perdería al compactar con ``unicas``.
+        with self._lock:
+            preguntas = self._indice.preguntas if self._indice is not None else self.almacen.cargar()
+            detector = DetectorDuplicados(umbral or self.umbral_duplicados)
+            unicas, repetidas = [], []
+            for pregunta in preguntas:
+                parecida = detector.agregar_si_nueva(len(unicas), pregunta.pregunta)
+                if parecida is None:
+                    unicas.append(pregunta)
+                else:
+                    repetidas.append((pregunta, unicas[parecida[0]]))
+
+            if repetidas and not simular:
+                self.almacen.compactar(unicas)
+                self._indice = None
+                self._duplicados = None
+        return repetidas
+
+    def guardar(self):
+        self.almacen.compactar(self.preguntas)
@@ -0,0 +1,144 @@
+# app/codigos.py
+
+import random
+import string
+import threading
+import time
+from collections import OrderedDict, deque
+
+ALFABETO_CODIGOS = string.ascii_uppercase + string.digits
+
+
+class CodigosAgotados(Exception):
+    pass
+
+
+class ReservasMemoria:
+    """Reservas de códigos de este proceso, con caducidad."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        # Con un TTL fijo el orden de inserción es el de caducidad.
+        self._reservas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reservar(self, code):
+        """Reserva ``code`` si está libre; devuelve ``False`` si ya estaba reservado."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar(ahora)
+            if code in self._reservas:
+                return False
+            self._reservas[code] = ahora + self.ttl
+            return True
+
+    def liberar(self, code):
+        with self._lock:
+            self._reservas.pop(code, None)
+
+    def __contains__(self, code):
+        with self._lock:
+            caduca = self._reservas.get(code)
+        return caduca is not None and caduca > time.monotonic()
+
+    def __len__(self):
+        with self._lock:
+            self._purgar(time.monotonic())
+            return len(self._reservas)
+
+    def _purgar(self, ahora):
+        while self._reservas:
+            code, caduca = next(iter(self._reservas.items()))
+            if caduca > ahora:
+                break
+            self._reservas.popitem(last=False)
+
+
+class AsignadorCodigos:
+    """Entrega códigos de partida que no están en uso.
+
+    Un código está ocupado si ``en_uso`` lo dice (tablero conectado, partida
+    viva o archivada, rondas en el historial) o si tiene una reserva; todas
+    las comprobaciones son búsquedas por clave. Cada candidato se reserva de
+    forma atómica en ``reservas`` (con varios workers, un almacén compartido
+    con índice único) y después se comprueba con ``en_uso`` fuera del lock,
+    así que las consultas al almacén de una asignación no frenan a las demás.
+
+    Las reservas cubren el tiempo entre que el tablero recibe el código y se
+    crea la partida, y caducan solas: un código entregado que nunca llegó a
+    tener partida vuelve a quedar libre, igual que el de una partida
+    archivada sin rondas cuando el archivo caduca. Con ``tamano_pool`` se
+    mantienen códigos libres generados de antemano.
+    """
+
+    def __init__(self, en_uso, longitud=6, ttl_reserva=3600, tamano_pool=0,
+                 iniciar_tarea=None, max_intentos=32, azar=None, reservas=None):
+        self.en_uso = en_uso
+        self.longitud = longitud
+        self.tamano_pool = tamano_pool
+        self.iniciar_tarea = iniciar_tarea
+        self.max_intentos = max_intentos
+        self.reservas = reservas if reservas is not None else ReservasMemoria(ttl_reserva)
+        self._azar = azar or random.SystemRandom()
+        self._pool = deque()
+        self._en_pool = set()
+        self._rellenando = False
+        self._lock = threading.Lock()
+
+    def asignar(self):
+        for _ in range(self.max_intentos):
+            code = self._candidato()
+            if not self.reservas.reservar(code):
+                continue
+            if self.en_uso(code):
+                self.reservas.liberar(code)
+                continue
+            self._programar_relleno()
+            return code
+        raise CodigosAgotados(f"No se encontró un código libre tras {self.max_intentos} intentos.")
+
+    def liberar(self, code):
+        self.reservas.liberar(code)
+
+    def rellenar(self):
+        """Completa el pool de códigos libres hasta ``tamano_pool``."""
+        try:
+            fallidos = 0
+            while fallidos < self.max_intentos:
+                with self._lock:
+                    if len(self._pool) >= self.tamano_pool:
+                        return
+                    code = self._generar()
+                if code in self._en_pool or code in self.reservas or self.en_uso(code):
+                    fallidos += 1
+                    continue
+                with self._lock:
+                    if code not in self._en_pool:
+                        self._pool.append(code)
+                        self._en_pool.add(code)
+        finally:
+            self._rellenando = False
+
+    def __len__(self):
+        return len(self.reservas)
+
+    def _candidato(self):
+        with self._lock:
+            if self._pool:
+                code = self._pool.popleft()
+                self._en_pool.discard(code)
+                return code
+            return self._generar()
+
+    def _generar(self):
+        return "".join(self._azar.choices(ALFABETO_CODIGOS, k=self.longitud))
+
+    def _programar_relleno(self):
+        with self._lock:
+            if not self.tamano_pool or self._rellenando or len(self._pool) >= self.tamano_pool // 2:
+                return
+            self._rellenando = True
+        if self.iniciar_tarea:
+            self.iniciar_tarea(self.rellenar)
+        else:
+            self.rellenar()
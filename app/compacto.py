@@ -0,0 +1,102 @@
+# app/compacto.py
+#
+# Formato compacto de updateBoard y patchBoard para los tableros que lo piden
+# al unirse. En lugar de objetos con claves, cada valor va en la posición que
+# le da su esquema:
+#
+#   estado     lista con los campos de CAMPOS_TABLERO en su orden
+#   equipo     [name, color, score, avatar] y, si tiene otras claves, un dict al final
+#   respuesta  [respuesta, pts, banderas] con revealed = 1 y shownOnBoard = 2
+#
+# updateBoard envía {"v": version, "d": estado} y patchBoard {"v": version,
+# "o": ops}, donde cada op es [tipo, ruta] o [tipo, ruta, valor] con tipo 0
+# (add), 1 (replace) o 2 (remove) y la ruta es una lista de posiciones sobre
+# el estado compacto. El cliente aplica las ops sobre su estado compacto y lo
+# expande con el mismo esquema (popular_choice_page/lib/compacto.ts).
+
+from app.difusion import CAMPOS_TABLERO
+
+FORMATO_COMPACTO = "compacto"
+
+CAMPOS = list(CAMPOS_TABLERO)
+POSICION_CAMPO = {campo: indice for indice, campo in enumerate(CAMPOS)}
+CAMPOS_EQUIPO = ("name", "color", "score", "avatar")
+POSICION_EQUIPO = {campo: indice for indice, campo in enumerate(CAMPOS_EQUIPO)}
+BANDERAS_RESPUESTA = {"revealed": 1, "shownOnBoard": 2}
+TIPOS_OP = {"add": 0, "replace": 1, "remove": 2}
+
+
+def compactar_equipo(equipo):
+    if not isinstance(equipo, dict):
+        return equipo
+    valores = [equipo.get(campo) for campo in CAMPOS_EQUIPO]
+    otros = {clave: valor for clave, valor in equipo.items() if clave not in POSICION_EQUIPO}
+    return valores + [otros] if otros else valores
+
+
+def compactar_respuesta(respuesta):
+    if not isinstance(respuesta, dict):
+        return respuesta
+    banderas = sum(bit for campo, bit in BANDERAS_RESPUESTA.items() if respuesta.get(campo))
+    return [respuesta.get("respuesta", ""), respuesta.get("pts", 0), banderas]
+
+
+def compactar_campo(campo, valor):
+    if campo in ("equipo1", "equipo2"):
+        return compactar_equipo(valor)
+    if campo == "respuestas" and isinstance(valor, list):
+        return [compactar_respuesta(respuesta) for respuesta in valor]
+    return valor
+
+
+def compactar_game_info(game_info):
+    return [compactar_campo(campo, game_info.get(campo, defecto)) for campo, defecto in CAMPOS_TABLERO.items()]
+
+
+def compactar_ops(ops, game_info):
+    """Traduce ops JSON Patch de ``game_info`` a ops compactas.
+
+    ``game_info`` es el estado ya parcheado: de ahí salen las banderas de una
+    respuesta y los valores completos cuando una ruta no tiene posición en el
+    esquema (se reemplaza entonces el campo de primer nivel entero).
+    """
+    compactas = []
+    vistas = set()
+
+    def reemplazar(campo, posicion):
+        agregar(TIPOS_OP["replace"], [posicion], compactar_campo(campo, game_info.get(campo)))
+
+    def agregar(tipo, ruta, *valor):
+        clave = (tipo, tuple(ruta))
+        if clave not in vistas:
+            vistas.add(clave)
+            compactas.append([tipo, ruta, *valor])
+
+    for op in ops:
+        partes = [parte.replace("~1", "/").replace("~0", "~") for parte in op["path"].split("/")[1:]]
+        campo = partes[0]
+        if campo not in POSICION_CAMPO:
+            continue
+        posicion = POSICION_CAMPO[campo]
+
+        if len(partes) == 1:
+            if op["op"] == "remove":
+                reemplazar(campo, posicion)
+            else:
+                agregar(TIPOS_OP[op["op"]], [posicion], compactar_campo(campo, op["value"]))
+        elif campo in ("equipo1", "equipo2") and len(partes) == 2 and partes[1] in POSICION_EQUIPO and op["op"] != "remove":
+            agregar(TIPOS_OP["replace"], [posicion, POSICION_EQUIPO[partes[1]]], op["value"])
+        elif campo == "respuestas" and partes[1].isdigit():
+            indice = int(partes[1])
+            respuestas = game_info.get("respuestas") or []
+            if len(partes) == 2 or indice >= len(respuestas):
+                reemplazar(campo, posicion)
+            elif partes[2] in BANDERAS_RESPUESTA:
+                agregar(TIPOS_OP["replace"], [posicion, indice, 2], compactar_respuesta(respuestas[indice])[2])
+            elif partes[2] in ("respuesta", "pts") and op["op"] != "remove":
+                agregar(TIPOS_OP["replace"], [posicion, indice, 0 if partes[2] == "respuesta" else 1], op["value"])
+            else:
+                reemplazar(campo, posicion)
+        else:
+            reemplazar(campo, posicion)
+    return compactas
@@ -0,0 +1,630 @@
+# app/compartido.py
+#
+# Implementaciones del estado compartido entre workers sobre un archivo SQLite.
+# Sirven como sustituto local de un almacén compartido (p. ej. Redis) cuando
+# varios procesos de la misma máquina atienden el mismo juego.
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import socketio
+from pymongo.errors import DuplicateKeyError
+
+from app.compacto import FORMATO_COMPACTO
+from app.difusion import calcular_parche, instantanea_atrasada
+from app.estado import filtrar_campos, aplicar_cambios
+from app.torneos import LIMITE_CLASIFICACION, nuevo_torneo
+
+
+class BaseSQLite:
+    ESQUEMA = ""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._conexion().executescript(self.ESQUEMA)
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    @contextmanager
+    def _transaccion(self):
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexion
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        conexion.execute("COMMIT")
+
+
+class AlmacenPartidasSQLite(BaseSQLite):
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS partidas (
+            codigo TEXT PRIMARY KEY,
+            documento TEXT NOT NULL,
+            actualizada REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS partidas_archivadas (
+            codigo TEXT PRIMARY KEY,
+            documento TEXT NOT NULL,
+            archivada REAL NOT NULL
+        );
+    """
+
+    def __init__(self, ruta):
+        super().__init__(ruta)
+        columnas = {fila[1] for fila in self._conexion().execute("PRAGMA table_info(partidas)")}
+        if "actualizada" not in columnas:
+            self._conexion().execute("ALTER TABLE partidas ADD COLUMN actualizada REAL NOT NULL DEFAULT 0")
+
+    def buscar(self, code, campos=None):
+        fila = self._conexion().execute(
+            "SELECT documento FROM partidas WHERE codigo = ?", (code,)
+        ).fetchone()
+        return filtrar_campos(json.loads(fila[0]), campos) if fila else None
+
+    def insertar(self, partida):
+        try:
+            self._conexion().execute(
+                "INSERT INTO partidas (codigo, documento, actualizada) VALUES (?, ?, ?)",
+                (partida["codigo"], json.dumps(partida), time.time()),
+            )
+        except sqlite3.IntegrityError as exc:
+            # Otro worker creó la partida primero; ``CachePartidas.crear`` lo trata como en Mongo.
+            raise DuplicateKeyError(str(exc)) from exc
+
+    def actualizar(self, code, cambios, revision=None):
+        with self._transaccion() as conexion:
+            fila = conexion.execute(
+                "SELECT documento FROM partidas WHERE codigo = ?", (code,)
+            ).fetchone()
+            if not fila:
+                return None
+            partida = json.loads(fila[0])
+            if revision is not None and partida.get("revision", 0) != revision:
+                return None
+            aplicar_cambios(partida, cambios)
+            conexion.execute(
+                "UPDATE partidas SET documento = ?, actualizada = ? WHERE codigo = ?",
+                (json.dumps(partida), time.time(), code),
+            )
+            return partida
+
+    def archivada(self, code):
+        return self._conexion().execute(
+            "SELECT 1 FROM partidas_archivadas WHERE codigo = ?", (code,)
+        ).fetchone() is not None
+
+    def inactivas(self, antiguedad):
+        filas = self._conexion().execute(
+            "SELECT codigo FROM partidas WHERE actualizada < ?", (time.time() - antiguedad,)
+        ).fetchall()
+        return [fila[0] for fila in filas]
+
+    def archivar(self, code):
+        with self._transaccion() as conexion:
+            fila = conexion.execute(
+                "SELECT documento FROM partidas WHERE codigo = ?", (code,)
+            ).fetchone()
+            if not fila:
+                return False
+            conexion.execute(
+                "INSERT OR REPLACE INTO partidas_archivadas (codigo, documento, archivada) VALUES (?, ?, ?)",
+                (code, fila[0], time.time()),
+            )
+            conexion.execute("DELETE FROM partidas WHERE codigo = ?", (code,))
+            return True
+
+
+class ReservasCodigosSQLite(BaseSQLite):
+    """Reservas de códigos compartidas por los workers, misma interfaz que ``ReservasMemoria``."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS codigos_reservados (
+            codigo TEXT PRIMARY KEY,
+            caduca REAL NOT NULL
+        );
+    """
+
+    def __init__(self, ruta, ttl=3600):
+        super().__init__(ruta)
+        self.ttl = ttl
+
+    def reservar(self, code):
+        ahora = time.time()
+        # La clave primaria hace atómica la reserva; una vencida se reemplaza.
+        cursor = self._conexion().execute(
+            "INSERT INTO codigos_reservados (codigo, caduca) VALUES (?, ?) "
+            "ON CONFLICT (codigo) DO UPDATE SET caduca = excluded.caduca WHERE caduca <= ?",
+            (code, ahora + self.ttl, ahora),
+        )
+        return cursor.rowcount == 1
+
+    def liberar(self, code):
+        self._conexion().execute("DELETE FROM codigos_reservados WHERE codigo = ?", (code,))
+
+    def __contains__(self, code):
+        return self._conexion().execute(
+            "SELECT 1 FROM codigos_reservados WHERE codigo = ? AND caduca > ?", (code, time.time())
+        ).fetchone() is not None
+
+    def __len__(self):
+        with self._transaccion() as conexion:
+            conexion.execute("DELETE FROM codigos_reservados WHERE caduca <= ?", (time.time(),))
+            return conexion.execute("SELECT COUNT(*) FROM codigos_reservados").fetchone()[0]
+
+
+class TrabajosGeneracionSQLite(BaseSQLite):
+    """Trabajos de generación compartidos por los workers, misma interfaz que ``TrabajosMemoria``."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS trabajos_generacion (
+            id TEXT PRIMARY KEY,
+            documento TEXT NOT NULL,
+            caduca REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS trabajos_generacion_caduca ON trabajos_generacion (caduca);
+    """
+
+    def __init__(self, ruta, ttl=3600):
+        super().__init__(ruta)
+        self.ttl = ttl
+
+    def guardar(self, trabajo):
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO trabajos_generacion (id, documento, caduca) VALUES (?, ?, ?)",
+                (trabajo["id"], json.dumps(trabajo), ahora + self.ttl),
+            )
+            conexion.execute("DELETE FROM trabajos_generacion WHERE caduca <= ?", (ahora,))
+
+    def obtener(self, id_trabajo):
+        fila = self._conexion().execute(
+            "SELECT documento FROM trabajos_generacion WHERE id = ? AND caduca > ?", (id_trabajo, time.time())
+        ).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+
+class HistorialSQLite(BaseSQLite):
+    """Historial de rondas de solo anexado, misma interfaz que ``HistorialMongo``."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS rondas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL,
+            documento TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS rondas_codigo ON rondas (codigo);
+    """
+
+    def agregar(self, code, ronda):
+        self._conexion().execute(
+            "INSERT INTO rondas (codigo, documento) VALUES (?, ?)", (code, json.dumps(ronda))
+        )
+
+    def rondas(self, code):
+        filas = self._conexion().execute(
+            "SELECT documento FROM rondas WHERE codigo = ? ORDER BY id", (code,)
+        ).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+    def tiene(self, code):
+        return self._conexion().execute(
+            "SELECT 1 FROM rondas WHERE codigo = ? LIMIT 1", (code,)
+        ).fetchone() is not None
+
+    def preguntas_usadas(self, code, desde=0):
+        filas = self._conexion().execute(
+            "SELECT documento FROM rondas WHERE codigo = ? ORDER BY id LIMIT -1 OFFSET ?", (code, desde)
+        ).fetchall()
+        return [json.loads(fila[0])["pregunta"] for fila in filas]
+
+    def iterar(self, codigos):
+        # Una conexión propia para que el cursor no se cruce con otras
+        # consultas del mismo hilo mientras se recorre.
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            for code in sorted(codigos):
+                for codigo, documento in conexion.execute(
+                    "SELECT codigo, documento FROM rondas WHERE codigo = ? ORDER BY id", (code,)
+                ):
+                    yield {**json.loads(documento), "codigo": codigo}
+        finally:
+            conexion.close()
+
+
+class GeneracionesSQLite(BaseSQLite):
+    """Contador por partida que invalida las cachés de los demás workers."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS generaciones (
+            codigo TEXT PRIMARY KEY,
+            generacion INTEGER NOT NULL
+        );
+    """
+
+    def actual(self, code):
+        fila = self._conexion().execute(
+            "SELECT generacion FROM generaciones WHERE codigo = ?", (code,)
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def incrementar(self, code):
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "INSERT INTO generaciones (codigo, generacion) VALUES (?, 1) "
+                "ON CONFLICT (codigo) DO UPDATE SET generacion = generacion + 1",
+                (code,),
+            )
+            return conexion.execute(
+                "SELECT generacion FROM generaciones WHERE codigo = ?", (code,)
+            ).fetchone()[0]
+
+
+class RegistroTablerosSQLite(BaseSQLite):
+    """Misma interfaz que ``RegistroTableros``, visible desde todos los workers."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS tableros (
+            sid TEXT PRIMARY KEY,
+            codigo TEXT NOT NULL,
+            worker TEXT NOT NULL,
+            formato TEXT NOT NULL DEFAULT 'json'
+        );
+        CREATE INDEX IF NOT EXISTS tableros_codigo ON tableros (codigo);
+    """
+
+    def __init__(self, ruta):
+        super().__init__(ruta)
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._ultima_purga = time.monotonic()
+        columnas = {fila[1] for fila in self._conexion().execute("PRAGMA table_info(tableros)")}
+        if "formato" not in columnas:
+            self._conexion().execute("ALTER TABLE tableros ADD COLUMN formato TEXT NOT NULL DEFAULT 'json'")
+        self._conexion().execute("DELETE FROM tableros WHERE worker = ?", (self.worker,))
+
+    def conectar(self, code, sid, formato="json"):
+        self._conexion().execute(
+            "INSERT OR REPLACE INTO tableros (sid, codigo, worker, formato) VALUES (?, ?, ?, ?)",
+            (sid, code, self.worker, formato),
+        )
+
+    def desconectar(self, sid):
+        with self._transaccion() as conexion:
+            fila = conexion.execute("SELECT codigo FROM tableros WHERE sid = ?", (sid,)).fetchone()
+            conexion.execute("DELETE FROM tableros WHERE sid = ?", (sid,))
+        return fila[0] if fila else None
+
+    def codigo(self, sid):
+        fila = self._conexion().execute("SELECT codigo FROM tableros WHERE sid = ?", (sid,)).fetchone()
+        return fila[0] if fila else None
+
+    def sids(self, code):
+        filas = self._conexion().execute("SELECT sid FROM tableros WHERE codigo = ?", (code,))
+        return {fila[0] for fila in filas}
+
+    def compactos(self, code):
+        filas = self._conexion().execute(
+            "SELECT sid FROM tableros WHERE codigo = ? AND formato = ?", (code, FORMATO_COMPACTO)
+        )
+        return {fila[0] for fila in filas}
+
+    def total_clientes(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM tableros").fetchone()[0]
+
+    def purgar(self, esta_conectado, intervalo=0):
+        """Quita los SID de este worker que ya no están conectados."""
+        ahora = time.monotonic()
+        if ahora - self._ultima_purga < intervalo:
+            return 0
+        self._ultima_purga = ahora
+        filas = self._conexion().execute("SELECT sid FROM tableros WHERE worker = ?", (self.worker,))
+        muertos = [(fila[0],) for fila in filas if not esta_conectado(fila[0])]
+        self._conexion().executemany("DELETE FROM tableros WHERE sid = ?", muertos)
+        return len(muertos)
+
+    def __contains__(self, code):
+        return self._conexion().execute(
+            "SELECT 1 FROM tableros WHERE codigo = ? LIMIT 1", (code,)
+        ).fetchone() is not None
+
+    def __getitem__(self, code):
+        return self.sids(code)
+
+    def __len__(self):
+        return self._conexion().execute("SELECT COUNT(DISTINCT codigo) FROM tableros").fetchone()[0]
+
+
+class VersionesTableroSQLite(BaseSQLite):
+    """Misma interfaz que ``VersionesTablero``; la secuencia es única entre workers."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS versiones (
+            codigo TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            instantanea TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS parches (
+            codigo TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            ops TEXT NOT NULL,
+            PRIMARY KEY (codigo, version)
+        );
+    """
+
+    def __init__(self, ruta, max_historial=32):
+        super().__init__(ruta)
+        self.max_historial = max_historial
+
+    def registrar(self, code, game_info):
+        with self._transaccion() as conexion:
+            fila = conexion.execute(
+                "SELECT version, instantanea FROM versiones WHERE codigo = ?", (code,)
+            ).fetchone()
+            if fila is None:
+                conexion.execute(
+                    "INSERT INTO versiones (codigo, version, instantanea) VALUES (?, 1, ?)",
+                    (code, json.dumps(game_info)),
+                )
+                return 1, None
+
+            version, instantanea = fila
+            instantanea = json.loads(instantanea)
+            if instantanea_atrasada(game_info, instantanea):
+                return version, []
+            ops = calcular_parche(instantanea, game_info)
+            if not ops:
+                return version, ops
+            version += 1
+            conexion.execute(
+                "UPDATE versiones SET version = ?, instantanea = ? WHERE codigo = ?",
+                (version, json.dumps(game_info), code),
+            )
+            conexion.execute(
+                "INSERT OR REPLACE INTO parches (codigo, version, ops) VALUES (?, ?, ?)",
+                (code, version, json.dumps(ops)),
+            )
+            conexion.execute(
+                "DELETE FROM parches WHERE codigo = ? AND version <= ?",
+                (code, version - self.max_historial),
+            )
+            return version, ops
+
+    def instantanea(self, code, game_info):
+        fila = self._conexion().execute(
+            "SELECT version, instantanea FROM versiones WHERE codigo = ?", (code,)
+        ).fetchone()
+        if fila is not None:
+            instantanea = json.loads(fila[1])
+            if not instantanea_atrasada(instantanea, game_info):
+                return fila[0], instantanea
+        version, _ = self.registrar(code, game_info)
+        fila = self._conexion().execute(
+            "SELECT version, instantanea FROM versiones WHERE codigo = ?", (code,)
+        ).fetchone()
+        # Otra difusión más nueva pudo registrarse antes que ``game_info``.
+        if fila is not None and fila[0] == version:
+            return version, json.loads(fila[1])
+        return version, game_info
+
+    def parches_desde(self, code, version):
+        conexion = self._conexion()
+        fila = conexion.execute("SELECT version FROM versiones WHERE codigo = ?", (code,)).fetchone()
+        if fila is None or version > fila[0]:
+            return None
+        parches = [
+            {"version": v, "ops": json.loads(ops)}
+            for v, ops in conexion.execute(
+                "SELECT version, ops FROM parches WHERE codigo = ? AND version > ? ORDER BY version",
+                (code, version),
+            )
+        ]
+        if len(parches) != fila[0] - version:
+            return None
+        return parches
+
+    def olvidar(self, code):
+        with self._transaccion() as conexion:
+            conexion.execute("DELETE FROM versiones WHERE codigo = ?", (code,))
+            conexion.execute("DELETE FROM parches WHERE codigo = ?", (code,))
+
+
+class TorneosSQLite(BaseSQLite):
+    """Torneos y sus agregados, misma interfaz que ``TorneosMongo``."""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS torneos (
+            id TEXT PRIMARY KEY,
+            documento TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS torneo_partidas (
+            torneo TEXT NOT NULL,
+            codigo TEXT NOT NULL,
+            marcador TEXT NOT NULL,
+            PRIMARY KEY (torneo, codigo)
+        );
+        CREATE TABLE IF NOT EXISTS torneo_equipos (
+            torneo TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            nombre TEXT,
+            puntos INTEGER NOT NULL DEFAULT 0,
+            rondas INTEGER NOT NULL DEFAULT 0,
+            rondas_ganadas INTEGER NOT NULL DEFAULT 0,
+            partidas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (torneo, clave)
+        );
+        CREATE INDEX IF NOT EXISTS torneo_equipos_puntos ON torneo_equipos (torneo, puntos DESC);
+        CREATE TABLE IF NOT EXISTS torneo_respuestas (
+            torneo TEXT NOT NULL,
+            clave_pregunta TEXT NOT NULL,
+            clave_respuesta TEXT NOT NULL,
+            pregunta TEXT,
+            respuesta TEXT,
+            apariciones INTEGER NOT NULL DEFAULT 0,
+            reveladas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (torneo, clave_pregunta, clave_respuesta)
+        );
+        CREATE INDEX IF NOT EXISTS torneo_respuestas_reveladas ON torneo_respuestas (torneo, reveladas DESC);
+    """
+
+    def crear(self, nombre, codigos=()):
+        torneo = nuevo_torneo(nombre, codigos)
+        self._conexion().execute("INSERT INTO torneos (id, documento) VALUES (?, ?)", (torneo["id"], json.dumps(torneo)))
+        return torneo
+
+    def obtener(self, torneo):
+        fila = self._conexion().execute("SELECT documento FROM torneos WHERE id = ?", (torneo,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def listar(self):
+        return [json.loads(fila[0]) for fila in self._conexion().execute("SELECT documento FROM torneos").fetchall()]
+
+    def agregar_partida(self, torneo, code):
+        with self._transaccion() as conexion:
+            fila = conexion.execute("SELECT documento FROM torneos WHERE id = ?", (torneo,)).fetchone()
+            if not fila:
+                return False
+            documento = json.loads(fila[0])
+            if code not in documento["codigos"]:
+                documento["codigos"].append(code)
+                conexion.execute("UPDATE torneos SET documento = ? WHERE id = ?", (json.dumps(documento), torneo))
+            return True
+
+    def marcador(self, torneo, code):
+        fila = self._conexion().execute(
+            "SELECT marcador FROM torneo_partidas WHERE torneo = ? AND codigo = ?", (torneo, code)
+        ).fetchone()
+        return json.loads(fila[0]) if fila else {}
+
+    def acumular(self, torneo, code, marcador, equipos, respuestas):
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO torneo_partidas (torneo, codigo, marcador) VALUES (?, ?, ?)",
+                (torneo, code, json.dumps(marcador)),
+            )
+            conexion.executemany(
+                """INSERT INTO torneo_equipos (torneo, clave, nombre, puntos, rondas, rondas_ganadas, partidas)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (torneo, clave) DO UPDATE SET
+                       nombre = excluded.nombre,
+                       puntos = puntos + excluded.puntos,
+                       rondas = rondas + excluded.rondas,
+                       rondas_ganadas = rondas_ganadas + excluded.rondas_ganadas,
+                       partidas = partidas + excluded.partidas""",
+                [(torneo, clave, c["nombre"], c["puntos"], c["rondas"], c["rondas_ganadas"], c["partidas"])
+                 for clave, c in equipos.items()],
+            )
+            conexion.executemany(
+                """INSERT INTO torneo_respuestas (torneo, clave_pregunta, clave_respuesta, pregunta, respuesta, apariciones, reveladas)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (torneo, clave_pregunta, clave_respuesta) DO UPDATE SET
+                       apariciones = apariciones + excluded.apariciones,
+                       reveladas = reveladas + excluded.reveladas""",
+                [(torneo, clave[0], clave[1], c["pregunta"], c["respuesta"], c["apariciones"], c["reveladas"])
+                 for clave, c in respuestas.items()],
+            )
+
+    def reemplazar_agregados(self, torneo, marcadores, equipos, respuestas):
+        with self._transaccion() as conexion:
+            for tabla in ("torneo_partidas", "torneo_equipos", "torneo_respuestas"):
+                conexion.execute(f"DELETE FROM {tabla} WHERE torneo = ?", (torneo,))
+            conexion.executemany(
+                "INSERT INTO torneo_partidas (torneo, codigo, marcador) VALUES (?, ?, ?)",
+                [(torneo, code, json.dumps(marcador)) for code, marcador in marcadores.items()],
+            )
+            conexion.executemany(
+                "INSERT INTO torneo_equipos (torneo, clave, nombre, puntos, rondas, rondas_ganadas, partidas) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(torneo, clave, c["nombre"], c["puntos"], c["rondas"], c["rondas_ganadas"], c["partidas"])
+                 for clave, c in equipos.items()],
+            )
+            conexion.executemany(
+                "INSERT INTO torneo_respuestas (torneo, clave_pregunta, clave_respuesta, pregunta, respuesta, apariciones, reveladas) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(torneo, clave[0], clave[1], c["pregunta"], c["respuesta"], c["apariciones"], c["reveladas"])
+                 for clave, c in respuestas.items()],
+            )
+
+    def clasificacion(self, torneo, limite=LIMITE_CLASIFICACION):
+        filas = self._conexion().execute(
+            """SELECT nombre, puntos, rondas, rondas_ganadas, partidas FROM torneo_equipos
+               WHERE torneo = ? ORDER BY puntos DESC, rondas_ganadas DESC LIMIT ?""",
+            (torneo, limite),
+        ).fetchall()
+        return [dict(zip(("nombre", "puntos", "rondas", "rondas_ganadas", "partidas"), fila)) for fila in filas]
+
+    def estadisticas_respuestas(self, torneo, limite=LIMITE_CLASIFICACION):
+        filas = self._conexion().execute(
+            """SELECT pregunta, respuesta, apariciones, reveladas FROM torneo_respuestas
+               WHERE torneo = ? ORDER BY reveladas DESC, apariciones DESC LIMIT ?""",
+            (torneo, limite),
+        ).fetchall()
+        return [dict(zip(("pregunta", "respuesta", "apariciones", "reveladas"), fila)) for fila in filas]
+
+
+class MensajesSQLite(BaseSQLite):
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS mensajes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            canal TEXT NOT NULL,
+            creado REAL NOT NULL,
+            datos TEXT NOT NULL
+        );
+    """
+
+    def publicar(self, canal, datos):
+        self._conexion().execute(
+            "INSERT INTO mensajes (canal, creado, datos) VALUES (?, ?, ?)",
+            (canal, time.time(), datos),
+        )
+
+    def ultimo_id(self):
+        return self._conexion().execute("SELECT COALESCE(MAX(id), 0) FROM mensajes").fetchone()[0]
+
+    def leer_desde(self, canal, ultimo_id):
+        return self._conexion().execute(
+            "SELECT id, datos FROM mensajes WHERE canal = ? AND id > ? ORDER BY id",
+            (canal, ultimo_id),
+        ).fetchall()
+
+    def podar(self, antiguedad):
+        self._conexion().execute("DELETE FROM mensajes WHERE creado < ?", (time.time() - antiguedad,))
+
+
+class ColaSQLite(socketio.PubSubManager):
+    """Gestor de mensajes de Socket.IO que reparte los emits entre workers vía SQLite."""
+
+    name = "sqlite"
+
+    def __init__(self, ruta, channel="flask-socketio", write_only=False, logger=None,
+                 intervalo=0.01, retencion=60):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.mensajes = MensajesSQLite(ruta)
+        self.intervalo = intervalo
+        self.retencion = retencion
+
+    def _publish(self, data):
+        self.mensajes.publicar(self.channel, self.json.dumps(data))
+
+    def _listen(self):
+        ultimo_id = self.mensajes.ultimo_id()
+        ultima_poda = time.monotonic()
+        while True:
+            for ultimo_id, datos in self.mensajes.leer_desde(self.channel, ultimo_id):
+                yield datos
+            if time.monotonic() - ultima_poda > self.retencion:
+                self.mensajes.podar(self.retencion)
+                ultima_poda = time.monotonic()
+            self.server.sleep(self.intervalo)
@@ -3,12 +3,65 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'secret_key_default')
     MONGO_URI = os.getenv('MONGO_URI')
     MONGO_DB = os.getenv('MONGO_DB')
+    MONGO_MAX_POOL = int(os.getenv('MONGO_MAX_POOL', 100))
+    MONGO_MIN_POOL = int(os.getenv('MONGO_MIN_POOL', 0))
+    # Tiempos de espera en milisegundos: elegir servidor, conectar, cada operación y esperar un hueco en el pool
+    MONGO_TIMEOUT_SELECCION_MS = int(os.getenv('MONGO_TIMEOUT_SELECCION_MS', 5000))
+    MONGO_TIMEOUT_CONEXION_MS = int(os.getenv('MONGO_TIMEOUT_CONEXION_MS', 5000))
+    MONGO_TIMEOUT_SOCKET_MS = int(os.getenv('MONGO_TIMEOUT_SOCKET_MS', 10000))
+    MONGO_TIMEOUT_POOL_MS = int(os.getenv('MONGO_TIMEOUT_POOL_MS', 5000))
+    # Crea al arrancar los índices de partida, partida_archivada y ronda
+    MONGO_CREAR_INDICES = os.getenv('MONGO_CREAR_INDICES', 'true').lower() in ('1', 'true', 'yes')
     API_KEY_GEMINI = os.getenv('API_KEY_GEMINI')
+    # gemini o falso (cliente local para pruebas y benchmarks)
+    GENERACION_CLIENTE = os.getenv('GENERACION_CLIENTE', 'gemini')
+    GENERACION_TTL = int(os.getenv('GENERACION_TTL', 3600))
+    GENERACION_MAX_LOTE = int(os.getenv('GENERACION_MAX_LOTE', 5))
+    GENERACION_TEMAS_POPULARES = [tema.strip() for tema in os.getenv('GENERACION_TEMAS_POPULARES', '').split(',') if tema.strip()]
+    PREGUNTAS_PATH = os.getenv('PREGUNTAS_PATH', os.path.join(BASE_DIR, 'preguntas.jsonl'))
+    # Similitud (0 a 1) a partir de la cual dos preguntas se consideran repetidas
+    DUPLICADOS_UMBRAL = float(os.getenv('DUPLICADOS_UMBRAL', 0.85))
     CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '*')
+    PARTIDAS_CACHE_MAX = int(os.getenv('PARTIDAS_CACHE_MAX', 1000))
+    PARTIDAS_CACHE_TTL = int(os.getenv('PARTIDAS_CACHE_TTL', 3600))
+    # Segundos sin cambios tras los que una partida sin tableros se archiva (0 desactiva)
+    PARTIDAS_ARCHIVAR_TRAS = int(os.getenv('PARTIDAS_ARCHIVAR_TRAS', 86400))
+    PARTIDAS_ARCHIVAR_INTERVALO = int(os.getenv('PARTIDAS_ARCHIVAR_INTERVALO', 600))
+    # Segundos que se conservan las partidas archivadas antes de que Mongo las borre (índice TTL)
+    PARTIDAS_ARCHIVO_TTL = int(os.getenv('PARTIDAS_ARCHIVO_TTL', 30 * 86400))
+    # Segundos que un código entregado a un tablero queda reservado aunque aún no tenga partida
+    CODIGOS_RESERVA_TTL = int(os.getenv('CODIGOS_RESERVA_TTL', 3600))
+    # Códigos libres generados de antemano (0 los genera al pedirlos)
+    CODIGOS_POOL = int(os.getenv('CODIGOS_POOL', 0))
+    # Milisegundos en los que se juntan los cambios de una partida en una sola emisión al tablero (0 emite cada cambio)
+    TABLERO_VENTANA_MS = int(os.getenv('TABLERO_VENTANA_MS', 30))
+    # Cada cuántos segundos revisa el servidor las cuentas regresivas pendientes
+    TEMPORIZADOR_RESOLUCION = float(os.getenv('TEMPORIZADOR_RESOLUCION', 0.05))
+    # DEBUG, INFO, WARNING o ERROR
+    LOG_NIVEL = os.getenv('LOG_NIVEL', 'INFO')
+    # Fracción (0 a 1) de los registros DEBUG e INFO que se escriben; WARNING y superiores siempre
+    LOG_MUESTREO = float(os.getenv('LOG_MUESTREO', 1.0))
+    # json (una línea por registro) o texto
+    LOG_FORMATO = os.getenv('LOG_FORMATO', 'json')
+    # Archivo SQLite compartido por los workers de una máquina (modo multi-worker)
+    ALMACEN_COMPARTIDO = os.getenv('ALMACEN_COMPARTIDO')
+    # Cola de mensajes de Socket.IO entre workers (p. ej. redis://); solo junto con
+    # ALMACEN_COMPARTIDO, que sin ella usa el mismo archivo como cola
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    # threading, eventlet o gevent. run.py parchea la librería estándar según este
+    # mismo valor, así que no se deja elegir a Flask-SocketIO: si eligiera eventlet
+    # sin parchear, cada llamada a PyMongo, SQLite o una cola bloquearía a todos.
+    # run.py lo fija en eventlet si no viene dado; threading queda para quien
+    # importa la app sin parchear (CLI de Flask, benchmarks).
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE') or 'threading'
+    # Ejecuta las llamadas a Mongo en el pool de hilos del modo asíncrono
+    MONGO_EN_HILOS = os.getenv('MONGO_EN_HILOS', '').lower() in ('1', 'true', 'yes')
 
 class DevelopmentConfig(Config):
     DEBUG = True
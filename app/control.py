@@ -1,84 +1,185 @@
+import click
 from flask import Blueprint, request, jsonify, current_app
-from app.sockets import tableros
-from app.extensions import socketio
+from app.extensions import archivar_inactivas, codigo_retirado, socketio
+from app.compacto import compactar_game_info, compactar_ops
+from app.difusion import CAMPOS_TABLERO, construir_game_info
+from app.sockets import sala_compacta
+from app.estado import ConflictoPartida
+from app.indice_preguntas import DIFICULTADES
 
-control = Blueprint('control', __name__)
+control = Blueprint('control', __name__, cli_group='partidas')
 
-def buscar_partida_por_codigo(code):
-    return current_app.mongo_db.partida.find_one({"codigo": code})
+class PartidaInexistente(Exception):
+    pass
+
+@control.app_errorhandler(ConflictoPartida)
+def conflicto_partida(error):
+    respuesta, estado = respuesta_conflicto(error)
+    return jsonify(respuesta), estado
+
+def respuesta_conflicto(error):
+    partida = buscar_partida_por_codigo(error.code, CAMPOS_EXISTENCIA) or {}
+    return {
+        "success": False,
+        "message": "El juego cambió mientras se procesaba la solicitud. Actualiza e intenta de nuevo.",
+        "revision": partida.get("revision", 0),
+    }, 409
+
+# Proyección para las rutas que solo comprueban que la partida existe.
+CAMPOS_EXISTENCIA = ('revision',)
+MAX_SORTEO = 50
+
+def buscar_partida_por_codigo(code, campos=None):
+    return current_app.partidas.obtener(code, campos)
+
+def crear_partida(partida):
+    """Crea la partida si su código no está retirado; devuelve si se creó."""
+    code = partida["codigo"]
+    if codigo_retirado(current_app, code):
+        return False
+    current_app.partidas.crear(partida)
+    current_app.codigos.liberar(code)
+    return True
+
+# Respuesta para un tablero que vuelve con el código de una partida ya archivada.
+RESPUESTA_RETIRADO = {"success": False, "message": "El juego ya terminó; genera un código nuevo."}
 
 def validar_codigo(code):
     if not code or len(code) != 6:
         return False, "Código no válido. Debe tener 6 caracteres."
     return True, ""
 
-def update_board(code):
-    partida = buscar_partida_por_codigo(code)
-    if not partida:
-        return
-    game_info = {
-        "codigo": partida.get("codigo", ""),
-        "estado": partida.get("estado", "unknown"),
-        "titulo": partida.get("titulo", ""),
-        "equipo1": partida.get("equipo1", {}),
-        "equipo2": partida.get("equipo2", {}),
-        "pregunta": partida.get("pregunta", ""),
-        "respuestas": partida.get("respuestas", []),
-        "puntuacion_ronda": partida.get("puntuacion_ronda", 0),
-        "equipo_actual": partida.get("equipo_actual", 0),
-        "strike": partida.get("strike", 0),
-        "robo_puntos": partida.get("robo_puntos", False),
-        "regresive": partida.get("regresive", None)
-    }
-    try:
-        for sid in tableros[code]:
-            socketio.emit("updateBoard", game_info, to=sid, room=code)
-    except KeyError:
-        pass
+@control.cli.command('archivar')
+@click.option('--horas', type=float, default=None, help='Horas sin cambios para considerar abandonada una partida.')
+def archivar_partidas(horas):
+    """Mueve al archivo las partidas abandonadas que no tienen tableros conectados."""
+    antiguedad = horas * 3600 if horas is not None else current_app.config['PARTIDAS_ARCHIVAR_TRAS']
+    archivadas = archivar_inactivas(current_app, antiguedad)
+    click.echo(f"{len(archivadas)} partidas archivadas.")
 
+# Comandos del controlador por nombre. Las rutas HTTP y el canal de Socket.IO
+# (evento controlCommand) son dos formas de llegar a los mismos manejadores.
+COMANDOS_CONTROL = {}
 
-@control.route('/connectGameCode', methods=['POST'])
-def connect_game_code():
-    data = request.get_json()
-    code = data.get('code', '').upper()
-    
+def comando(nombre, existente=True):
+    """Registra un manejador ``(code, data) -> (respuesta, estado)``.
+
+    Con ``existente`` el comando necesita una partida ya creada; la HTTP lo
+    comprueba en cada petición y el canal de Socket.IO al conectarse.
+    """
+    def registrar(manejador):
+        COMANDOS_CONTROL[nombre] = (manejador, existente)
+        return manejador
+    return registrar
+
+def ejecutar_comando(nombre, data, code=None, verificada=False):
+    if nombre not in COMANDOS_CONTROL:
+        return {"success": False, "message": f"Comando desconocido: {nombre}."}, 400
+    if not isinstance(data, dict):
+        return {"success": False, "message": "Los datos del comando deben ser un objeto."}, 400
+    manejador, existente = COMANDOS_CONTROL[nombre]
+    code = (code or data.get('code') or '').upper()
     es_valido, mensaje = validar_codigo(code)
     if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    
-    if code in tableros:
-        partida = buscar_partida_por_codigo(code)
-        if not partida:
-            new_partida = {
-                "codigo": code,
-                "estado": "game-setup",
-            }
-            current_app.mongo_db.partida.insert_one(new_partida)
-        for sid in tableros[code]:
-            socketio.emit('gameConnected', {"code": code}, to=sid, room=code)
-        return jsonify({"success": True, "message": "Conexión exitosa."}), 200
+        return {"success": False, "message": mensaje}, 400
+    try:
+        if existente and not verificada and not buscar_partida_por_codigo(code, CAMPOS_EXISTENCIA):
+            raise PartidaInexistente(code)
+        return manejador(code, data)
+    except PartidaInexistente:
+        return {"success": False, "message": "El juego no existe."}, 404
+    except ConflictoPartida as error:
+        return respuesta_conflicto(error)
+
+def responder_http(nombre):
+    respuesta, estado = ejecutar_comando(nombre, request.get_json() or {})
+    return jsonify(respuesta), estado
+
+def actualizar_partida(code, cambios, revision=None):
+    """Como ``partidas.actualizar`` pero lanza ``PartidaInexistente`` si la partida ya no está."""
+    partida = current_app.partidas.actualizar(code, cambios, revision)
+    if partida is None:
+        raise PartidaInexistente(code)
+    return partida
+
+def revision_esperada(data, partida):
+    """Revisión con la que el cliente calculó la acción o, si no la envía, la que leyó el servidor."""
+    revision = data.get('revision')
+    return partida.get('revision', 0) if revision is None else revision
+
+def update_board(code, inmediato=True):
+    """Envía a los tableros el estado de la partida.
+
+    Con ``inmediato=False`` y una ventana configurada, el envío se junta con
+    los demás cambios de la partida en esa ventana y devuelve ``(None, None)``.
+    """
+    coalescedor = current_app.coalescedor
+    if coalescedor is None or inmediato:
+        if coalescedor is not None:
+            coalescedor.descartar(code)
+        return emitir_tablero(code)
+    coalescedor.marcar(code)
+    return None, None
+
+def emitir_tablero(code):
+    partida = buscar_partida_por_codigo(code, CAMPOS_TABLERO)
+    if not partida:
+        return None, None
+    game_info = construir_game_info(partida)
+    version, ops = current_app.versiones_tablero.registrar(code, game_info)
+    if ops is None:
+        evento, payload = "updateBoard", {**game_info, "version": version}
+    elif ops:
+        evento, payload = "patchBoard", {"version": version, "ops": ops}
     else:
-        return jsonify({"success": False, "message": "El código de tablero no existe."}), 404
+        return version, ops
+    compactos = current_app.tableros.compactos(code)
+    if compactos:
+        if ops is None:
+            compacto = {"v": version, "d": compactar_game_info(game_info)}
+        else:
+            compacto = {"v": version, "o": compactar_ops(ops, game_info)}
+        socketio.emit(evento, compacto, to=sala_compacta(code))
+    socketio.emit(evento, payload, to=code, skip_sid=list(compactos) or None)
+    return version, ops
+
+
+@control.route('/connectGameCode', methods=['POST'])
+def connect_game_code():
+    return responder_http('connectGameCode')
+
+@comando('connectGameCode', existente=False)
+def conectar_tablero(code, data):
+    if code not in current_app.tableros:
+        return {"success": False, "message": "El código de tablero no existe."}, 404
+    partida = buscar_partida_por_codigo(code, CAMPOS_EXISTENCIA)
+    if not partida:
+        new_partida = {
+            "codigo": code,
+            "estado": "game-setup",
+        }
+        if not crear_partida(new_partida):
+            return RESPUESTA_RETIRADO, 404
+    socketio.emit('gameConnected', {"code": code}, to=code)
+    return {"success": True, "message": "Conexión exitosa."}, 200
 
 @control.route('/gameSetup', methods=['POST'])
 def game_setup():
-    data = request.get_json()
-    code = data.get('code', '').upper()
+    return responder_http('gameSetup')
+
+@comando('gameSetup', existente=False)
+def configurar_partida(code, data):
     titulo = data.get('titulo', '')
     equipo1 = data.get('e1', {})
     equipo2 = data.get('e2', {})
 
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    
     if not titulo or not equipo1 or not equipo2:
-        return jsonify({"success": False, "message": "Datos incompletos. Se requiere el título y los datos de los dos equipos."}), 400
+        return {"success": False, "message": "Datos incompletos. Se requiere el título y los datos de los dos equipos."}, 400
 
-    partida = buscar_partida_por_codigo(code)
+    partida = buscar_partida_por_codigo(code, CAMPOS_EXISTENCIA)
     
     if not partida:
-        if code in tableros:
+        if code in current_app.tableros:
             new_partida = {
                 "codigo": code,
                 "estado": "game-setup",
@@ -86,148 +187,185 @@ def game_setup():
                 "equipo1": equipo1,
                 "equipo2": equipo2
             }
-            current_app.mongo_db.partida.insert_one(new_partida)
+            if not crear_partida(new_partida):
+                return RESPUESTA_RETIRADO, 404
             partida = new_partida
         else:
-            return jsonify({"success": False, "message": "El código de tablero no existe."}), 404
+            return {"success": False, "message": "El código de tablero no existe."}, 404
 
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
+    actualizar_partida(
+        code,
         {"$set": {
             "titulo": titulo,
             "equipo1": equipo1,
             "equipo2": equipo2,
             "estado": "game-selection"
-        }}
+        }},
+        data.get('revision'),
     )
 
     update_board(code)
 
-    return jsonify({"success": True, "message": "Configuración del juego actualizada con éxito."}), 200
+    return {"success": True, "message": "Configuración del juego actualizada con éxito."}, 200
 
 
 @control.route('/gameTeams', methods=['POST'])
 def game_teams():
-    data = request.get_json()
-    code = data.get('code', '').upper()
+    return responder_http('gameTeams')
 
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    
-    partida = buscar_partida_por_codigo(code)
+@comando('gameTeams', existente=False)
+def equipos_partida(code, data):
+    partida = buscar_partida_por_codigo(code, ('titulo', 'equipo1', 'equipo2', 'estado'))
 
     if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
+        return {"success": False, "message": "El juego no existe."}, 404
 
-    print(partida.get('usadas'))
     equipos = {
         "titulo": partida.get('titulo', ''),
         "equipo1": partida.get('equipo1', {}),
         "equipo2": partida.get('equipo2', {}),
-        "questions": partida.get('usadas', []),
+        "questions": current_app.historial.preguntas_usadas(code),
     }
 
-    return jsonify({"success": True, "equipos": equipos, "estado": partida.get("estado", "unknown")}), 200
+    return {"success": True, "equipos": equipos, "estado": partida.get("estado", "unknown")}, 200
+
+@control.route('/gameDrawQuestions', methods=['POST'])
+def game_draw_questions():
+    return responder_http('gameDrawQuestions')
+
+@comando('gameDrawQuestions')
+def sortear_preguntas(code, data):
+    cantidad = data.get('cantidad', 5)
+    if not isinstance(cantidad, int) or not 1 <= cantidad <= MAX_SORTEO:
+        return {"success": False, "message": f"La cantidad debe ser un entero entre 1 y {MAX_SORTEO}."}, 400
+    categorias = data.get('categorias') or data.get('category') or None
+    if isinstance(categorias, str):
+        categorias = None if categorias.lower() == 'todas' else [categorias]
+    if categorias is not None and not es_lista_de_textos(categorias):
+        return {"success": False, "message": "Las categorías deben ser una lista de textos."}, 400
+    dificultades = data.get('dificultad') or None
+    if isinstance(dificultades, str):
+        dificultades = [dificultades]
+    if dificultades and (not es_lista_de_textos(dificultades) or not set(dificultades) <= set(DIFICULTADES)):
+        return {"success": False, "message": f"La dificultad debe ser una de: {', '.join(DIFICULTADES)}."}, 400
+    pesos = data.get('pesos') or None
+    if pesos is not None and (not isinstance(pesos, dict)
+                              or not all(isinstance(peso, (int, float)) and peso >= 0 for peso in pesos.values())):
+        return {"success": False, "message": "Los pesos deben ser números mayores o iguales a 0 por categoría."}, 400
+
+    sorteadas, restantes = current_app.seleccion_preguntas.sortear(code, cantidad, categorias, dificultades, pesos)
+    return {
+        "success": True,
+        "questions": [{**pregunta.a_dict(), "dificultad": dificultad} for pregunta, dificultad in sorteadas],
+        "restantes": restantes,
+    }, 200
+
+def es_lista_de_textos(valor):
+    return isinstance(valor, list) and all(isinstance(elemento, str) for elemento in valor)
 
 @control.route('/setScores', methods=['POST'])
 def set_scores():
-    data = request.get_json()
-    code = data.get('code', '').upper()
-    scoreFrist = data.get('scoreFrist', 0)
-    scoreSecond = data.get('scoreSecond', 0)
-    print(scoreFrist, scoreSecond)
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    partida = buscar_partida_por_codigo(code)
-    if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
-    equipo1 = partida.get('equipo1', {})
-    equipo1['score'] = scoreFrist
-    equipo2 = partida.get('equipo2', {})
-    equipo2['score'] = scoreSecond
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
+    return responder_http('setScores')
+
+@comando('setScores')
+def fijar_puntuaciones(code, data):
+    # El servidor suma sobre estos valores en roundCommand, así que deben ser enteros.
+    try:
+        scoreFrist = int(data.get('scoreFrist', 0))
+        scoreSecond = int(data.get('scoreSecond', 0))
+    except (TypeError, ValueError):
+        return {"success": False, "message": "Las puntuaciones deben ser números enteros."}, 400
+    actualizar_partida(
+        code,
         {"$set": {
-            "equipo1": equipo1,
-            "equipo2": equipo2
-        }}
+            "equipo1.score": scoreFrist,
+            "equipo2.score": scoreSecond
+        }},
+        data.get('revision'),
     )
-    update_board(code)
-    return jsonify({"success": True, "message": "Puntuaciones actualizadas exitosamente."}), 200
+    update_board(code, inmediato=False)
+    return {"success": True, "message": "Puntuaciones actualizadas exitosamente."}, 200
 
 @control.route('/gameAddQuestion', methods=['POST'])
 def game_question():
-    data = request.get_json()
-    code = data.get('code', '').upper()
+    return responder_http('gameAddQuestion')
+
+@comando('gameAddQuestion')
+def agregar_pregunta(code, data):
     pregunta = data.get('pregunta', {})
     respuestas = pregunta.get('respuestas', [])
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    partida = buscar_partida_por_codigo(code)
-    if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
     if not pregunta or not pregunta.get('pregunta', '').strip():
-        return jsonify({"success": False, "message": "La pregunta no puede estar vacía."}), 400
+        return {"success": False, "message": "La pregunta no puede estar vacía."}, 400
     if not respuestas or len(respuestas) == 0:
-        return jsonify({"success": False, "message": "La pregunta debe tener al menos una respuesta."}), 400
+        return {"success": False, "message": "La pregunta debe tener al menos una respuesta."}, 400
     for respuesta in respuestas:
         if not respuesta.get('respuesta', '').strip():
-            return jsonify({"success": False, "message": "Todas las respuestas deben tener un texto."}), 400
-        if respuesta.get('pts', -1) < 0:
-            return jsonify({"success": False, "message": "Las puntuaciones deben ser mayores o iguales a 0."}), 400
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
+            return {"success": False, "message": "Todas las respuestas deben tener un texto."}, 400
+        pts = respuesta.get('pts')
+        if not isinstance(pts, int) or pts < 0:
+            return {"success": False, "message": "Las puntuaciones deben ser números enteros mayores o iguales a 0."}, 400
+    current_app.temporizadores.cancelar(code)
+    actualizar_partida(
+        code,
         {"$set": {
             "regresive": None,
             "pregunta": pregunta.get('pregunta', ''),
             "respuestas": respuestas,
             "estado": "game-init"
-        }}
+        }},
+        data.get('revision'),
     )
+    current_app.seleccion_preguntas.marcar(code, pregunta['pregunta'])
     update_board(code)
-    return jsonify({"success": True, "message": "Pregunta agregada y el estado del juego ha cambiado a 'game-init'."}), 200
+    return {"success": True, "message": "Pregunta agregada y el estado del juego ha cambiado a 'game-init'."}, 200
 
 @control.route("/gameRegressive", methods=["POST"])
 def init_game_regressive():
-    data = request.get_json()
-    code = data.get('code', '').upper()
-    regresive = data.get('regresive', 10)
-    print(regresive)
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    partida = buscar_partida_por_codigo(code)
-    if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
-        {"$set": {
-            "regresive": regresive
-        }}
-    )
-    update_board(code)
-    return jsonify({"success": True, "message": "Regresivas actualizadas y el estado del juego ha cambiado a 'game-init'."}), 200
+    return responder_http('gameRegressive')
+
+@comando('gameRegressive')
+def cuenta_regresiva(code, data):
+    accion = data.get('accion', 'iniciar')
+    temporizadores = current_app.temporizadores
+    if accion == 'iniciar':
+        regresive = data.get('regresive', 10)
+        if not isinstance(regresive, (int, float)) or regresive < 0:
+            return {"success": False, "message": "La cuenta regresiva debe ser un número de segundos."}, 400
+        # Se guarda solo el valor inicial; los segundos siguientes llegan a los
+        # tableros como eventos regresiveTick sin tocar la base de datos.
+        actualizar_partida(code, {"$set": {"regresive": regresive}}, data.get('revision'))
+        update_board(code)
+        temporizador = temporizadores.iniciar(code, regresive)
+    elif accion == 'pausar':
+        temporizador = temporizadores.pausar(code)
+    elif accion == 'reanudar':
+        temporizador = temporizadores.reanudar(code)
+    elif accion == 'cancelar':
+        temporizadores.cancelar(code)
+        actualizar_partida(code, {"$set": {"regresive": None}}, data.get('revision'))
+        update_board(code)
+        temporizador = None
+    else:
+        return {"success": False, "message": f"Acción desconocida: {accion}."}, 400
+    if temporizador is None and accion in ('pausar', 'reanudar'):
+        return {"success": False, "message": f"No hay una cuenta regresiva que {accion}."}, 409
+    return {"success": True, "message": "Cuenta regresiva actualizada.", "temporizador": temporizador}, 200
 
 @control.route("/gameInitControl", methods=["POST"])
 def init_game_control():
-    data = request.get_json()
-    code = data.get('code', '').upper()
+    return responder_http('gameInitControl')
+
+@comando('gameInitControl')
+def iniciar_control(code, data):
     team = data.get('team', 0)
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-    partida = buscar_partida_por_codigo(code)
-    if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
+    current_app.temporizadores.cancelar(code)
+    actualizar_partida(
+        code,
         {"$set": {
             "estado": "game-control",
             "equipo_actual": team
-        }}
+        }},
+        data.get('revision'),
     )
     update_board(code)
-    return jsonify({"success": True, "message": "Estado del juego actualizado a 'game-control'."}), 200
+    return {"success": True, "message": "Estado del juego actualizado a 'game-control'."}, 200
@@ -0,0 +1,199 @@
+# app/difusion.py
+
+import logging
+import threading
+import time
+from collections import deque
+from copy import deepcopy
+
+log = logging.getLogger(__name__)
+
+CAMPOS_TABLERO = {
+    "codigo": "",
+    "estado": "unknown",
+    "titulo": "",
+    "equipo1": {},
+    "equipo2": {},
+    "pregunta": "",
+    "respuestas": [],
+    "puntuacion_ronda": 0,
+    "equipo_actual": 0,
+    "strike": 0,
+    "robo_puntos": False,
+    "regresive": None,
+    "revision": 0,
+}
+
+
+def construir_game_info(partida):
+    return {campo: partida.get(campo, defecto) for campo, defecto in CAMPOS_TABLERO.items()}
+
+
+def instantanea_atrasada(instantanea, game_info):
+    """Si la partida cambió después de la instantánea sin que se difundiera."""
+    return instantanea.get("revision", 0) < game_info.get("revision", 0)
+
+
+def _escapar(clave):
+    return str(clave).replace("~", "~0").replace("/", "~1")
+
+
+def calcular_parche(anterior, nuevo, ruta=""):
+    """Devuelve las operaciones JSON Patch (RFC 6902) que llevan de ``anterior`` a ``nuevo``."""
+    if isinstance(anterior, dict) and isinstance(nuevo, dict):
+        ops = []
+        for clave, valor in nuevo.items():
+            sub_ruta = f"{ruta}/{_escapar(clave)}"
+            if clave in anterior:
+                ops.extend(calcular_parche(anterior[clave], valor, sub_ruta))
+            else:
+                ops.append({"op": "add", "path": sub_ruta, "value": valor})
+        for clave in anterior:
+            if clave not in nuevo:
+                ops.append({"op": "remove", "path": f"{ruta}/{_escapar(clave)}"})
+        return ops
+
+    if isinstance(anterior, list) and isinstance(nuevo, list) and len(anterior) == len(nuevo):
+        ops = []
+        for indice, (valor_anterior, valor_nuevo) in enumerate(zip(anterior, nuevo)):
+            ops.extend(calcular_parche(valor_anterior, valor_nuevo, f"{ruta}/{indice}"))
+        return ops
+
+    if type(anterior) is type(nuevo) and anterior == nuevo:
+        return []
+    return [{"op": "replace", "path": ruta, "value": nuevo}]
+
+
+class VersionesTablero:
+    """Última instantánea enviada a cada tablero, con su número de secuencia.
+
+    Conserva los parches más recientes para que un cliente que perdió pocas
+    versiones pueda ponerse al día sin descargar el estado completo.
+    """
+
+    def __init__(self, max_historial=32):
+        self.max_historial = max_historial
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, code, game_info):
+        """Registra un nuevo estado y devuelve ``(version, ops)``.
+
+        ``ops`` es ``None`` cuando no había estado previo (hay que enviar la
+        instantánea completa) y una lista vacía si nada cambió o si
+        ``game_info`` es de una revisión anterior a la ya registrada.
+        """
+        with self._lock:
+            estado = self._estados.get(code)
+            if estado is None:
+                self._estados[code] = {
+                    "version": 1,
+                    "instantanea": deepcopy(game_info),
+                    "historial": deque(maxlen=self.max_historial),
+                }
+                return 1, None
+
+            if instantanea_atrasada(game_info, estado["instantanea"]):
+                # Un estado leído antes de la última difusión no la reemplaza.
+                return estado["version"], []
+            ops = calcular_parche(estado["instantanea"], game_info)
+            if not ops:
+                return estado["version"], ops
+            estado["version"] += 1
+            estado["instantanea"] = deepcopy(game_info)
+            estado["historial"].append((estado["version"], ops))
+            return estado["version"], ops
+
+    def instantanea(self, code, game_info):
+        """Devuelve ``(version, game_info)`` vigentes.
+
+        Registra ``game_info`` como una versión nueva si no había estado o si
+        la instantánea quedó detrás de la revisión de la partida.
+        """
+        with self._lock:
+            estado = self._estados.get(code)
+            if estado is not None and not instantanea_atrasada(estado["instantanea"], game_info):
+                return estado["version"], estado["instantanea"]
+        version, _ = self.registrar(code, game_info)
+        with self._lock:
+            estado = self._estados.get(code)
+            # Otra difusión más nueva pudo registrarse antes que ``game_info``.
+            if estado is not None and estado["version"] == version:
+                return version, estado["instantanea"]
+        return version, game_info
+
+    def parches_desde(self, code, version):
+        """Parches posteriores a ``version`` o ``None`` si ya no están en el historial."""
+        with self._lock:
+            estado = self._estados.get(code)
+            if estado is None or version > estado["version"]:
+                return None
+            parches = [
+                {"version": v, "ops": ops}
+                for v, ops in estado["historial"]
+                if v > version
+            ]
+            if len(parches) != estado["version"] - version:
+                return None
+            return parches
+
+    def olvidar(self, code):
+        with self._lock:
+            self._estados.pop(code, None)
+
+
+
+class CoalescedorTablero:
+    """Junta en una sola emisión los cambios de una partida que llegan dentro de ``ventana`` segundos.
+
+    ``emitir(code)`` lee el estado vigente y lo envía a los tableros, así que
+    los estados intermedios de una ráfaga nunca se leen ni se difunden. La
+    tarea de fondo solo corre mientras hay partidas pendientes.
+    """
+
+    def __init__(self, emitir, iniciar_tarea, dormir, ventana):
+        self.emitir = emitir
+        self.iniciar_tarea = iniciar_tarea
+        self.dormir = dormir
+        self.ventana = ventana
+        self._pendientes = {}
+        self._en_marcha = False
+        self._lock = threading.Lock()
+
+    def marcar(self, code):
+        with self._lock:
+            self._pendientes.setdefault(code, time.monotonic() + self.ventana)
+            if self._en_marcha:
+                return
+            self._en_marcha = True
+        self.iniciar_tarea(self._bucle)
+
+    def descartar(self, code):
+        """Olvida un envío pendiente porque el estado se acaba de emitir directamente."""
+        with self._lock:
+            self._pendientes.pop(code, None)
+
+    def vaciar(self, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            listos = [code for code, limite in self._pendientes.items() if limite <= ahora]
+            for code in listos:
+                del self._pendientes[code]
+        for code in listos:
+            try:
+                self.emitir(code)
+            except Exception:
+                log.exception("Error al emitir el tablero", extra={"code": code})
+        return len(listos)
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def _bucle(self):
+        while True:
+            self.dormir(self.ventana / 2)
+            self.vaciar()
+            with self._lock:
+                if not self._pendientes:
+                    self._en_marcha = False
+                    return
@@ -0,0 +1,151 @@
+# app/duplicados.py
+
+import hashlib
+import re
+from array import array
+
+from app.indice_preguntas import normalizar
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+_VACIO = (1 << 63) - 1
+
+
+def simplificar(texto):
+    """Texto normalizado sin signos de puntuación ni espacios repetidos."""
+    return _NO_ALFANUMERICO.sub(" ", normalizar(texto)).strip()
+
+
+def huella(simplificado):
+    return hashlib.blake2b(simplificado.encode(), digest_size=8).digest()
+
+
+def tejas(simplificado, tamano=4):
+    if len(simplificado) <= tamano:
+        return {simplificado}
+    return {simplificado[i:i + tamano] for i in range(len(simplificado) - tamano + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class DetectorDuplicados:
+    """Detecta preguntas duplicadas exactas y casi duplicadas de forma incremental.
+
+    Los duplicados exactos se encuentran por la huella del texto simplificado.
+    Para los casi duplicados se usa MinHash de una sola permutación sobre
+    tejas de caracteres, con LSH por bandas para obtener candidatos. Los
+    candidatos se filtran con la similitud estimada por las firmas y solo los
+    que quedan cerca del umbral se confirman con la similitud de Jaccard real.
+    Una cubeta con más de ``max_cubeta`` preguntas (p. ej. todas las que
+    empiezan igual) deja de aportar candidatos.
+    """
+
+    def __init__(self, umbral=0.85, bins=20, filas=4, margen=0.2, max_cubeta=64):
+        self.umbral = umbral
+        self.bins = bins
+        self.filas = filas
+        self.margen = margen
+        self.max_cubeta = max_cubeta
+        self._huellas = {}
+        self._textos = {}
+        self._firmas = {}
+        self._bandas = {}
+
+    def __len__(self):
+        return len(self._textos)
+
+    def buscar(self, texto):
+        """Devuelve ``(id, similitud)`` del registro más parecido sobre el umbral, o ``None``."""
+        return self._buscar(*self._preparar(texto))
+
+    def agregar(self, identificador, texto):
+        self._registrar(identificador, *self._preparar(texto))
+
+    def agregar_si_nueva(self, identificador, texto):
+        """Registra ``texto`` solo si no se parece a otro; devuelve la coincidencia o ``None``."""
+        preparado = self._preparar(texto)
+        coincidencia = self._buscar(*preparado)
+        if coincidencia is None:
+            self._registrar(identificador, *preparado)
+        return coincidencia
+
+    def quitar(self, identificador):
+        """Olvida un registro, p. ej. el de una pregunta cuya escritura falló."""
+        simplificado = self._textos.pop(identificador, None)
+        if simplificado is None:
+            return
+        clave = huella(simplificado)
+        if self._huellas.get(clave) == identificador:
+            del self._huellas[clave]
+        firma = self._firmas.pop(identificador)
+        for clave_banda in self._claves_bandas(firma):
+            cubeta = self._bandas.get(clave_banda)
+            if cubeta and identificador in cubeta:
+                cubeta.remove(identificador)
+
+    def _preparar(self, texto):
+        simplificado = simplificar(texto)
+        conjunto = tejas(simplificado)
+        return simplificado, huella(simplificado), conjunto, self._firma(conjunto)
+
+    def _buscar(self, simplificado, clave, conjunto, firma):
+        exacto = self._huellas.get(clave)
+        if exacto is not None:
+            return exacto, 1.0
+
+        mejor = None
+        for candidato in self._candidatos(firma):
+            if self._estimar(firma, self._firmas[candidato]) < self.umbral - self.margen:
+                continue
+            similitud = jaccard(conjunto, tejas(self._textos[candidato]))
+            if similitud >= self.umbral and (mejor is None or similitud > mejor[1]):
+                mejor = (candidato, similitud)
+        return mejor
+
+    def _registrar(self, identificador, simplificado, clave, conjunto, firma):
+        self._huellas.setdefault(clave, identificador)
+        self._textos[identificador] = simplificado
+        self._firmas[identificador] = array("q", firma)
+        for clave_banda in self._claves_bandas(firma):
+            cubeta = self._bandas.setdefault(clave_banda, [])
+            if len(cubeta) <= self.max_cubeta:
+                cubeta.append(identificador)
+
+    def _firma(self, conjunto):
+        bins = self.bins
+        firma = [_VACIO] * bins
+        for valor in map(hash, conjunto):
+            valor &= _VACIO
+            indice = valor % bins
+            if valor < firma[indice]:
+                firma[indice] = valor
+        # Densificación: un bin vacío toma el valor del siguiente bin con
+        # datos, así los textos cortos también llenan todas las bandas.
+        if _VACIO in firma:
+            for indice in range(bins):
+                distancia = 1
+                while firma[indice] == _VACIO:
+                    origen = firma[(indice + distancia) % bins]
+                    if origen != _VACIO:
+                        firma[indice] = hash((origen, distancia)) & _VACIO
+                    distancia += 1
+        return firma
+
+    def _estimar(self, firma, otra):
+        return sum(map(int.__eq__, firma, otra)) / self.bins
+
+    def _claves_bandas(self, firma):
+        for banda in range(0, self.bins, self.filas):
+            yield hash((banda, tuple(firma[banda:banda + self.filas])))
+
+    def _candidatos(self, firma):
+        vistos = set()
+        for clave in self._claves_bandas(firma):
+            cubeta = self._bandas.get(clave, ())
+            if len(cubeta) > self.max_cubeta:
+                continue
+            for candidato in cubeta:
+                if candidato not in vistos:
+                    vistos.add(candidato)
+                    yield candidato
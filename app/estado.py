@@ -0,0 +1,461 @@
+# app/estado.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# Campos que no forman parte del estado vivo: el historial que guardaban las
+# versiones anteriores dentro de la partida y la marca de actividad.
+PROYECCION_VIVA = {"_id": 0, "rondas": 0, "usadas": 0, "actualizada": 0}
+
+log = logging.getLogger(__name__)
+
+
+def filtrar_campos(partida, campos):
+    if partida is None or campos is None:
+        return partida
+    return {campo: partida[campo] for campo in ("codigo", *campos) if campo in partida}
+
+
+def asegurar_indices(db, ttl_archivo):
+    """Crea los índices que usan las consultas de la app; es idempotente."""
+    indices = [
+        (db.partida, [("codigo", ASCENDING)], {"unique": True, "name": "codigo_unico"}),
+        (db.partida, [("actualizada", ASCENDING)], {"name": "actividad"}),
+        (db.partida_archivada, [("codigo", ASCENDING)], {"name": "codigo"}),
+        (db.partida_archivada, [("archivada", ASCENDING)], {"expireAfterSeconds": ttl_archivo, "name": "archivo_ttl"}),
+        (db.ronda, [("codigo", ASCENDING), ("numero", ASCENDING)], {"name": "codigo_numero"}),
+        (db.codigo_reservado, [("codigo", ASCENDING)], {"unique": True, "name": "codigo_unico"}),
+        (db.codigo_reservado, [("caduca", ASCENDING)], {"expireAfterSeconds": 0, "name": "reserva_ttl"}),
+        (db.trabajo_generacion, [("caduca", ASCENDING)], {"expireAfterSeconds": 0, "name": "trabajo_ttl"}),
+        (db.torneo_partida, [("torneo", ASCENDING), ("codigo", ASCENDING)], {"unique": True, "name": "torneo_codigo"}),
+        (db.torneo_equipo, [("torneo", ASCENDING), ("clave", ASCENDING)], {"unique": True, "name": "torneo_clave"}),
+        (db.torneo_equipo, [("torneo", ASCENDING), ("puntos", DESCENDING)], {"name": "clasificacion"}),
+        (db.torneo_respuesta, [("torneo", ASCENDING), ("clave_pregunta", ASCENDING), ("clave_respuesta", ASCENDING)],
+         {"unique": True, "name": "torneo_respuesta"}),
+        (db.torneo_respuesta, [("torneo", ASCENDING), ("reveladas", DESCENDING)], {"name": "mas_reveladas"}),
+    ]
+    for coleccion, claves, opciones in indices:
+        try:
+            coleccion.create_index(claves, **opciones)
+        except OperationFailure as exc:
+            # Códigos duplicados previos o un índice con otras opciones: la app sigue funcionando.
+            log.warning("No se pudo crear el índice", extra={"indice": opciones["name"], "coleccion": coleccion.name, "error": str(exc)})
+
+
+class ConflictoPartida(Exception):
+    """La partida cambió desde la revisión con la que se calculó la actualización."""
+
+    def __init__(self, code, revision):
+        super().__init__(f"La partida {code} ya no está en la revisión {revision}")
+        self.code = code
+        self.revision = revision
+
+
+class AlmacenMongo:
+    """Almacén de partidas respaldado por una colección de Mongo.
+
+    Las partidas inactivas se mueven a la colección ``archivo`` con la fecha
+    en que se archivaron.
+    """
+
+    def __init__(self, coleccion, archivo=None):
+        self.coleccion = coleccion
+        self.archivo = archivo
+
+    def buscar(self, code, campos=None):
+        proyeccion = PROYECCION_VIVA if campos is None else {"_id": 0, "codigo": 1, **dict.fromkeys(campos, 1)}
+        return self.coleccion.find_one({"codigo": code}, proyeccion)
+
+    def insertar(self, partida):
+        self.coleccion.insert_one({**partida, "actualizada": datetime.now(timezone.utc)})
+
+    def actualizar(self, code, cambios, revision=None):
+        """Aplica ``cambios`` en una sola operación atómica y devuelve el documento resultante.
+
+        Con ``revision`` solo se actualiza si la partida sigue en esa revisión;
+        si no coincide (o la partida no existe) devuelve ``None``.
+        """
+        filtro = {"codigo": code}
+        if revision is not None:
+            # Las partidas creadas antes de existir el campo cuentan como revisión 0.
+            filtro["revision"] = {"$in": [0, None]} if revision == 0 else revision
+        # Se pide el documento anterior y se le aplican los mismos cambios en
+        # memoria: es el resultado exacto de la actualización atómica.
+        anterior = self.coleccion.find_one_and_update(
+            filtro,
+            {**cambios, "$currentDate": {"actualizada": True}},
+            projection=PROYECCION_VIVA,
+            return_document=ReturnDocument.BEFORE,
+        )
+        return aplicar_cambios(anterior, cambios) if anterior is not None else None
+
+    def archivada(self, code):
+        return self.archivo is not None and self.archivo.find_one({"codigo": code}, {"_id": 1}) is not None
+
+    def inactivas(self, antiguedad):
+        limite = datetime.now(timezone.utc) - timedelta(seconds=antiguedad)
+        filtro = {"$or": [{"actualizada": {"$lt": limite}}, {"actualizada": {"$exists": False}}]}
+        return [partida["codigo"] for partida in self.coleccion.find(filtro, {"_id": 0, "codigo": 1})]
+
+    def archivar(self, code):
+        partida = self.coleccion.find_one({"codigo": code}, {"_id": 0})
+        if partida is None:
+            return False
+        partida["archivada"] = datetime.now(timezone.utc)
+        self.archivo.replace_one({"codigo": code}, partida, upsert=True)
+        # Si la partida cambió mientras se copiaba, sigue viva y no se borra.
+        borrada = self.coleccion.delete_one({"codigo": code, "revision": partida.get("revision")})
+        return borrada.deleted_count == 1
+
+
+class AlmacenMemoria:
+    """Almacén en memoria, útil cuando no hay Mongo configurado."""
+
+    def __init__(self):
+        self.partidas = {}
+        self.archivo = {}
+        self._actividad = {}
+        self._lock = threading.Lock()
+
+    def buscar(self, code, campos=None):
+        with self._lock:
+            partida = filtrar_campos(self.partidas.get(code), campos)
+            return deepcopy(partida) if partida is not None else None
+
+    def insertar(self, partida):
+        with self._lock:
+            if partida["codigo"] in self.partidas:
+                # Igual que el índice único de ``codigo`` en Mongo.
+                raise DuplicateKeyError(f"Ya existe una partida con el código {partida['codigo']}")
+            self.partidas[partida["codigo"]] = deepcopy(partida)
+            self._actividad[partida["codigo"]] = time.time()
+
+    def actualizar(self, code, cambios, revision=None):
+        with self._lock:
+            partida = self.partidas.get(code)
+            if partida is None or (revision is not None and partida.get("revision", 0) != revision):
+                return None
+            self._actividad[code] = time.time()
+            return deepcopy(aplicar_cambios(partida, cambios))
+
+    def archivada(self, code):
+        with self._lock:
+            return code in self.archivo
+
+    def inactivas(self, antiguedad):
+        limite = time.time() - antiguedad
+        with self._lock:
+            return [code for code in self.partidas if self._actividad.get(code, 0) < limite]
+
+    def archivar(self, code):
+        with self._lock:
+            partida = self.partidas.pop(code, None)
+            self._actividad.pop(code, None)
+            if partida is None:
+                return False
+            self.archivo[code] = partida
+            return True
+
+
+class ReservasCodigosMongo:
+    """Reservas de códigos compartidas por los workers: un documento por código con índice único.
+
+    El índice TTL de ``caduca`` borra las reservas vencidas; como Mongo lo
+    aplica cada minuto, ``reservar`` también reemplaza una vencida que siga ahí.
+    """
+
+    def __init__(self, coleccion, ttl=3600):
+        self.coleccion = coleccion
+        self.ttl = ttl
+
+    def reservar(self, code):
+        ahora = datetime.now(timezone.utc)
+        try:
+            self.coleccion.insert_one({"codigo": code, "caduca": ahora + timedelta(seconds=self.ttl)})
+            return True
+        except DuplicateKeyError:
+            resultado = self.coleccion.update_one(
+                {"codigo": code, "caduca": {"$lte": ahora}},
+                {"$set": {"caduca": ahora + timedelta(seconds=self.ttl)}},
+            )
+            return resultado.modified_count == 1
+
+    def liberar(self, code):
+        self.coleccion.delete_one({"codigo": code})
+
+    def __contains__(self, code):
+        return self.coleccion.find_one(
+            {"codigo": code, "caduca": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1}
+        ) is not None
+
+    def __len__(self):
+        return self.coleccion.count_documents({"caduca": {"$gt": datetime.now(timezone.utc)}})
+
+
+class TrabajosGeneracionMongo:
+    """Trabajos de generación compartidos por los workers, uno por documento con el id como ``_id``.
+
+    El índice TTL de ``caduca`` borra los vencidos; ``obtener`` ignora los que
+    sigan ahí.
+    """
+
+    def __init__(self, coleccion, ttl=3600):
+        self.coleccion = coleccion
+        self.ttl = ttl
+
+    def guardar(self, trabajo):
+        caduca = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        self.coleccion.replace_one({"_id": trabajo["id"]}, {**trabajo, "_id": trabajo["id"], "caduca": caduca}, upsert=True)
+
+    def obtener(self, id_trabajo):
+        return self.coleccion.find_one(
+            {"_id": id_trabajo, "caduca": {"$gt": datetime.now(timezone.utc)}}, {"_id": 0, "caduca": 0}
+        )
+
+
+class HistorialMongo:
+    """Historial de rondas en una colección aparte, de solo anexado."""
+
+    def __init__(self, coleccion):
+        self.coleccion = coleccion
+
+    def agregar(self, code, ronda):
+        self.coleccion.insert_one({**ronda, "codigo": code})
+
+    def rondas(self, code):
+        return list(self.coleccion.find({"codigo": code}, {"_id": 0}).sort("numero", ASCENDING))
+
+    def tiene(self, code):
+        return self.coleccion.find_one({"codigo": code}, {"_id": 1}) is not None
+
+    def preguntas_usadas(self, code, desde=0):
+        """Preguntas de las rondas de la partida en orden, saltando las ``desde`` primeras."""
+        return [ronda["pregunta"] for ronda in self.coleccion.find(
+            {"codigo": code}, {"_id": 0, "pregunta": 1}
+        ).sort("numero", ASCENDING).skip(desde)]
+
+    def iterar(self, codigos, lote=500):
+        """Recorre con un cursor las rondas de ``codigos``, ordenadas por código y número."""
+        if not codigos:
+            return iter(())
+        return self.coleccion.find({"codigo": {"$in": list(codigos)}}, {"_id": 0}).sort(
+            [("codigo", ASCENDING), ("numero", ASCENDING)]
+        ).batch_size(lote)
+
+
+class HistorialMemoria:
+    def __init__(self):
+        self._rondas = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, code, ronda):
+        with self._lock:
+            self._rondas.setdefault(code, []).append(deepcopy(ronda))
+
+    def rondas(self, code):
+        with self._lock:
+            return deepcopy(self._rondas.get(code, []))
+
+    def tiene(self, code):
+        with self._lock:
+            return bool(self._rondas.get(code))
+
+    def preguntas_usadas(self, code, desde=0):
+        with self._lock:
+            return [ronda["pregunta"] for ronda in self._rondas.get(code, [])[desde:]]
+
+    def iterar(self, codigos):
+        for code in sorted(codigos):
+            for ronda in self.rondas(code):
+                yield {**ronda, "codigo": code}
+
+
+class AlmacenDescargado:
+    """Envuelve un almacén para ejecutar sus llamadas bloqueantes fuera del bucle de eventos."""
+
+    def __init__(self, almacen, ejecutar):
+        self.almacen = almacen
+        self.ejecutar = ejecutar
+
+    def buscar(self, code, campos=None):
+        return self.ejecutar(self.almacen.buscar, code, campos)
+
+    def insertar(self, partida):
+        return self.ejecutar(self.almacen.insertar, partida)
+
+    def actualizar(self, code, cambios, revision=None):
+        return self.ejecutar(self.almacen.actualizar, code, cambios, revision)
+
+    def archivada(self, code):
+        return self.ejecutar(self.almacen.archivada, code)
+
+    def inactivas(self, antiguedad):
+        return self.ejecutar(self.almacen.inactivas, antiguedad)
+
+    def archivar(self, code):
+        return self.ejecutar(self.almacen.archivar, code)
+
+
+def ejecutor_bloqueante(async_mode):
+    """Devuelve una función que corre código bloqueante en el pool de hilos del modo asíncrono."""
+    if async_mode == "eventlet":
+        from eventlet import tpool
+        return tpool.execute
+    if async_mode == "gevent":
+        from gevent import get_hub
+        return lambda funcion, *args: get_hub().threadpool.apply(funcion, args)
+    return lambda funcion, *args: funcion(*args)
+
+
+def _ubicar(documento, campo):
+    """Devuelve el contenedor y la clave final de una ruta con puntos (``equipo1.score``)."""
+    *ruta, ultima = campo.split(".")
+    for parte in ruta:
+        documento = documento[int(parte)] if isinstance(documento, list) else documento.setdefault(parte, {})
+    return documento, int(ultima) if isinstance(documento, list) else ultima
+
+
+def aplicar_cambios(partida, cambios):
+    """Aplica sobre un dict el subconjunto de operadores de Mongo que usa la app."""
+    for campo, valor in cambios.get("$set", {}).items():
+        contenedor, clave = _ubicar(partida, campo)
+        contenedor[clave] = deepcopy(valor)
+    for campo, valor in cambios.get("$inc", {}).items():
+        contenedor, clave = _ubicar(partida, campo)
+        contenedor[clave] = (contenedor[clave] if isinstance(contenedor, list) else contenedor.get(clave, 0)) + valor
+    for campo, valor in cambios.get("$push", {}).items():
+        contenedor, clave = _ubicar(partida, campo)
+        contenedor.setdefault(clave, []).append(deepcopy(valor))
+    for campo in cambios.get("$unset", {}):
+        contenedor, clave = _ubicar(partida, campo)
+        contenedor.pop(clave, None)
+    return partida
+
+
+class CachePartidas:
+    """Caché write-through por código de partida con desalojo LRU y TTL.
+
+    Las lecturas se sirven desde memoria; cada escritura es una sola operación
+    atómica en el almacén, que incrementa el campo ``revision`` y devuelve el
+    documento resultante para reemplazar la copia en caché. Los documentos
+    devueltos por ``obtener`` son compartidos y no deben modificarse directamente.
+
+    Con varios workers, ``generaciones`` es un contador compartido por partida
+    que cada escritura incrementa; una entrada cuya generación quedó atrás se
+    vuelve a leer del almacén.
+    """
+
+    def __init__(self, almacen, max_partidas=1000, ttl=3600, generaciones=None):
+        self.almacen = almacen
+        self.max_partidas = max_partidas
+        self.ttl = ttl
+        self.generaciones = generaciones
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, code, campos=None):
+        """Devuelve la partida desde la caché o el almacén.
+
+        Con ``campos``, una partida que no está en caché se lee proyectada a
+        esos campos y no se guarda; una que sí está se devuelve completa.
+        """
+        ahora = time.monotonic()
+        generacion = self.generaciones.actual(code) if self.generaciones else 0
+        with self._lock:
+            entrada = self._entradas.get(code)
+            if entrada is not None:
+                if ahora - entrada[0] <= self.ttl and entrada[2] == generacion:
+                    entrada[0] = ahora
+                    self._entradas.move_to_end(code)
+                    return entrada[1]
+                del self._entradas[code]
+
+        if campos is not None:
+            return self.almacen.buscar(code, campos)
+        partida = self.almacen.buscar(code)
+        if partida is None:
+            return None
+        partida.pop("_id", None)
+        with self._lock:
+            self._guardar(code, partida, ahora, generacion)
+        return partida
+
+    def crear(self, partida):
+        partida.setdefault("revision", 0)
+        try:
+            self.almacen.insertar(partida)
+        except DuplicateKeyError:
+            # Otra petición la creó primero (índice único de ``codigo``).
+            return self.obtener(partida["codigo"])
+        generacion = self._incrementar_generacion(partida["codigo"])
+        with self._lock:
+            self._guardar(partida["codigo"], deepcopy(partida), time.monotonic(), generacion)
+        return partida
+
+    def actualizar(self, code, cambios, revision=None):
+        """Aplica ``cambios`` incrementando la revisión de la partida y devuelve la partida resultante.
+
+        Si se indica ``revision`` y la partida ya no está en ella, lanza
+        ``ConflictoPartida`` sin modificar nada.
+        """
+        cambios = {**cambios, "$inc": {**cambios.get("$inc", {}), "revision": 1}}
+        partida = self.almacen.actualizar(code, cambios, revision)
+        if partida is None:
+            self.invalidar(code)
+            if revision is not None:
+                raise ConflictoPartida(code, revision)
+            return None
+        partida.pop("_id", None)
+        generacion = self._incrementar_generacion(code)
+        with self._lock:
+            self._guardar(code, partida, time.monotonic(), generacion)
+        return partida
+
+    def archivar_inactivas(self, antiguedad, en_uso=lambda code: False):
+        """Archiva las partidas sin cambios en ``antiguedad`` segundos y devuelve sus códigos."""
+        archivadas = []
+        for code in self.almacen.inactivas(antiguedad):
+            if not en_uso(code) and self.almacen.archivar(code):
+                self.invalidar(code)
+                archivadas.append(code)
+        return archivadas
+
+    def archivada(self, code):
+        """Si hay una partida archivada con ese código (no se cachea)."""
+        return self.almacen.archivada(code)
+
+    def invalidar(self, code):
+        with self._lock:
+            self._entradas.pop(code, None)
+
+    def purgar(self):
+        """Elimina las partidas inactivas por más de ``ttl`` segundos."""
+        limite = time.monotonic() - self.ttl
+        with self._lock:
+            vencidas = [code for code, (acceso, _, _) in self._entradas.items() if acceso < limite]
+            for code in vencidas:
+                del self._entradas[code]
+        return len(vencidas)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _incrementar_generacion(self, code):
+        return self.generaciones.incrementar(code) if self.generaciones else 0
+
+    def _guardar(self, code, partida, ahora, generacion=0):
+        entrada = self._entradas.get(code)
+        if entrada is not None and entrada[1].get("revision", 0) > partida.get("revision", 0):
+            # Dos escrituras concurrentes pueden terminar en desorden; se queda la más nueva.
+            return
+        self._entradas[code] = [ahora, partida, generacion]
+        self._entradas.move_to_end(code)
+        while len(self._entradas) > self.max_partidas:
+            self._entradas.popitem(last=False)
@@ -2,10 +2,44 @@
 from flask_socketio import SocketIO
 from flask_cors import CORS
 from pymongo import MongoClient
-import json
+import logging
 import os
 
-from app.sockets import socketio_events
+from app.sockets import RegistroTableros, socketio_events
+from app.difusion import CoalescedorTablero, VersionesTablero
+from app.almacen_preguntas import AlmacenPreguntasJSONL, BancoPreguntas
+from app.seleccion import SeleccionPreguntas
+from app.torneos import TorneosMemoria, TorneosMongo
+from app.estado import (
+    AlmacenDescargado,
+    AlmacenMemoria,
+    AlmacenMongo,
+    CachePartidas,
+    HistorialMemoria,
+    HistorialMongo,
+    ReservasCodigosMongo,
+    TrabajosGeneracionMongo,
+    asegurar_indices,
+    ejecutor_bloqueante,
+)
+from app.temporizador import Temporizadores
+from app.codigos import AsignadorCodigos
+from app.metricas import EscuchaMongo, Metricas, instrumentar_emisiones, registrar_medidores
+from app.generacion import ClienteFalso, ClienteGemini, ColaGeneracion
+from app.preguntas import validar_pregunta
+from app.compartido import (
+    AlmacenPartidasSQLite,
+    ColaSQLite,
+    GeneracionesSQLite,
+    HistorialSQLite,
+    RegistroTablerosSQLite,
+    ReservasCodigosSQLite,
+    TorneosSQLite,
+    TrabajosGeneracionSQLite,
+    VersionesTableroSQLite,
+)
+
+log = logging.getLogger(__name__)
 
 socketio = SocketIO()
 cors = CORS()
@@ -16,19 +50,184 @@ def init_extensions(app):
     global mongo_client
     mongo_uri = app.config.get('MONGO_URI')
     mongo_db_name = app.config.get('MONGO_DB')
+    ruta_compartida = app.config.get('ALMACEN_COMPARTIDO')
+    if app.config.get('SOCKETIO_MESSAGE_QUEUE') and not ruta_compartida:
+        # Con varios workers, la caché de partidas, el registro de tableros y
+        # las versiones de los parches también tienen que ser compartidos.
+        raise RuntimeError("SOCKETIO_MESSAGE_QUEUE requiere ALMACEN_COMPARTIDO: "
+                           "los workers deben compartir también el estado de los tableros.")
+    app.metricas = Metricas()
+    almacen = AlmacenMemoria()
+    app.historial = HistorialMemoria()
+    app.torneos = TorneosMemoria()
+    generaciones = None
+    reservas_codigos = None
+    ttl_reserva = app.config.get('CODIGOS_RESERVA_TTL', 3600)
+    trabajos_generacion = None
+    ttl_generacion = app.config.get('GENERACION_TTL', 3600)
     
+    if ruta_compartida:
+        almacen = AlmacenPartidasSQLite(ruta_compartida)
+        app.historial = HistorialSQLite(ruta_compartida)
+        app.torneos = TorneosSQLite(ruta_compartida)
+        generaciones = GeneracionesSQLite(ruta_compartida)
+        app.tableros = RegistroTablerosSQLite(ruta_compartida)
+        app.versiones_tablero = VersionesTableroSQLite(ruta_compartida)
+        reservas_codigos = ReservasCodigosSQLite(ruta_compartida, ttl_reserva)
+        trabajos_generacion = TrabajosGeneracionSQLite(ruta_compartida, ttl_generacion)
+    else:
+        app.tableros = RegistroTableros()
+        app.versiones_tablero = VersionesTablero()
+
     if mongo_uri and mongo_db_name:
-        mongo_client = MongoClient(mongo_uri)
+        mongo_client = MongoClient(
+            mongo_uri,
+            maxPoolSize=app.config.get('MONGO_MAX_POOL', 100),
+            minPoolSize=app.config.get('MONGO_MIN_POOL', 0),
+            serverSelectionTimeoutMS=app.config.get('MONGO_TIMEOUT_SELECCION_MS', 5000),
+            connectTimeoutMS=app.config.get('MONGO_TIMEOUT_CONEXION_MS', 5000),
+            socketTimeoutMS=app.config.get('MONGO_TIMEOUT_SOCKET_MS', 10000),
+            waitQueueTimeoutMS=app.config.get('MONGO_TIMEOUT_POOL_MS', 5000),
+            event_listeners=[EscuchaMongo(app.metricas)],
+        )
         db = mongo_client[mongo_db_name]
         app.mongo_db = db
+        if app.config.get('MONGO_CREAR_INDICES', True):
+            asegurar_indices(db, ttl_archivo=app.config.get('PARTIDAS_ARCHIVO_TTL', 30 * 86400))
+        almacen = AlmacenMongo(db.partida, archivo=db.partida_archivada)
+        app.historial = HistorialMongo(db.ronda)
+        app.torneos = TorneosMongo(db)
+        reservas_codigos = ReservasCodigosMongo(db.codigo_reservado, ttl_reserva)
+        trabajos_generacion = TrabajosGeneracionMongo(db.trabajo_generacion, ttl_generacion)
+
+    opciones_socketio = {'async_mode': app.config.get('SOCKETIO_ASYNC_MODE')}
+    if app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+        opciones_socketio['message_queue'] = app.config['SOCKETIO_MESSAGE_QUEUE']
+    elif ruta_compartida:
+        opciones_socketio['client_manager'] = ColaSQLite(ruta_compartida)
+
+    socketio.init_app(app, cors_allowed_origins=app.config.get('CORS_ALLOWED_ORIGINS', '*'), **opciones_socketio)
+    instrumentar_emisiones(socketio, app.metricas)
+
+    if app.config.get('MONGO_EN_HILOS') and isinstance(almacen, AlmacenMongo):
+        almacen = AlmacenDescargado(almacen, ejecutor_bloqueante(socketio.async_mode))
+
+    app.partidas = CachePartidas(
+        almacen,
+        max_partidas=app.config.get('PARTIDAS_CACHE_MAX', 1000),
+        ttl=app.config.get('PARTIDAS_CACHE_TTL', 3600),
+        generaciones=generaciones,
+    )
+
+    app.temporizadores = Temporizadores(
+        socketio.start_background_task,
+        socketio.sleep,
+        emitir=lambda code, datos: socketio.emit('regresiveTick', datos, to=code),
+        al_terminar=lambda code: terminar_regresiva(app, code),
+        resolucion=app.config.get('TEMPORIZADOR_RESOLUCION', 0.05),
+    )
+
+    ventana = app.config.get('TABLERO_VENTANA_MS', 30) / 1000
+    app.coalescedor = CoalescedorTablero(
+        lambda code: emitir_pendiente(app, code),
+        socketio.start_background_task,
+        socketio.sleep,
+        ventana,
+    ) if ventana > 0 else None
+
+    app.codigos = AsignadorCodigos(
+        en_uso=lambda code: codigo_ocupado(app, code),
+        ttl_reserva=ttl_reserva,
+        reservas=reservas_codigos,
+        tamano_pool=app.config.get('CODIGOS_POOL', 0),
+        iniciar_tarea=socketio.start_background_task,
+    )
 
-    socketio.init_app(app, cors_allowed_origins=app.config.get('CORS_ALLOWED_ORIGINS', '*'))
     socketio_events(socketio)
+
+    if app.config.get('PARTIDAS_ARCHIVAR_TRAS'):
+        socketio.start_background_task(archivar_periodicamente, app)
     
     
     cors.init_app(app, resources={r"/*": {"origins": app.config.get('CORS_ALLOWED_ORIGINS', '*')}})
 
-    file_path = os.path.join(app.root_path, '../preguntas.json')
-    with open(file_path, 'r', encoding='utf-8') as file:
-        app.preguntas = json.load(file)
+    ruta_preguntas = app.config['PREGUNTAS_PATH']
+    app.banco_preguntas = BancoPreguntas(
+        AlmacenPreguntasJSONL(
+            ruta_preguntas,
+            ruta_legada=os.path.join(os.path.dirname(ruta_preguntas), 'preguntas.json'),
+        ),
+        umbral_duplicados=app.config.get('DUPLICADOS_UMBRAL', 0.85),
+    )
+    app.seleccion_preguntas = SeleccionPreguntas(
+        app.banco_preguntas,
+        app.historial,
+        max_partidas=app.config.get('PARTIDAS_CACHE_MAX', 1000),
+    )
+
+    if app.config.get('GENERACION_CLIENTE') == 'falso':
+        cliente = ClienteFalso()
+    else:
+        cliente = ClienteGemini(app.config.get('API_KEY_GEMINI'))
+    app.generador = ColaGeneracion(
+        cliente,
+        validar_pregunta,
+        socketio.start_background_task,
+        notificar=lambda sid, trabajo: socketio.emit('preguntasGeneradas', trabajo, to=sid),
+        es_repetida=lambda pregunta: app.banco_preguntas.buscar_parecida(pregunta['pregunta']) is not None,
+        ttl=ttl_generacion,
+        max_lote=app.config.get('GENERACION_MAX_LOTE', 5),
+        crear_cola=socketio.server.eio.create_queue,
+        cola_vacia=socketio.server.eio.get_queue_empty_exception(),
+        metricas=app.metricas,
+        trabajos=trabajos_generacion,
+    )
+    if app.config.get('GENERACION_TEMAS_POPULARES'):
+        app.generador.precalentar(app.config['GENERACION_TEMAS_POPULARES'])
+
+    registrar_medidores(app)
+
+
+def codigo_retirado(app, code):
+    """Código de una partida archivada o con rondas jugadas, que no se vuelve a usar.
+
+    El historial de rondas y los torneos se guardan por código: una partida
+    nueva con ese código heredaría las rondas de la anterior.
+    """
+    return app.partidas.archivada(code) or app.historial.tiene(code)
+
+def codigo_ocupado(app, code):
+    return (
+        code in app.tableros
+        or app.partidas.obtener(code, ('revision',)) is not None
+        or codigo_retirado(app, code)
+    )
+
+def archivar_inactivas(app, antiguedad):
+    archivadas = app.partidas.archivar_inactivas(antiguedad, en_uso=lambda code: code in app.tableros)
+    for code in archivadas:
+        app.versiones_tablero.olvidar(code)
+        app.seleccion_preguntas.olvidar(code)
+    return archivadas
+
+def terminar_regresiva(app, code):
+    from app.control import update_board
+    with app.app_context():
+        try:
+            app.partidas.actualizar(code, {"$set": {"regresive": 0}})
+            update_board(code)
+        except Exception:
+            log.exception("Error al terminar la cuenta regresiva", extra={"code": code})
+
+def emitir_pendiente(app, code):
+    from app.control import emitir_tablero
+    with app.app_context():
+        emitir_tablero(code)
 
+def archivar_periodicamente(app):
+    while True:
+        socketio.sleep(app.config.get('PARTIDAS_ARCHIVAR_INTERVALO', 600))
+        try:
+            archivar_inactivas(app, app.config['PARTIDAS_ARCHIVAR_TRAS'])
+        except Exception:
+            log.exception("Error al archivar partidas")
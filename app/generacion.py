@@ -0,0 +1,272 @@
+# app/generacion.py
+
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.indice_preguntas import normalizar
+
+log = logging.getLogger(__name__)
+
+PROMPT = """
+Estás diseñando preguntas para un juego basado en "Family Feud", un popular programa de televisión en el que se hacen preguntas a varias personas y los participantes deben adivinar las respuestas más comunes.
+
+Genera {por_tema} preguntas en español para cada uno de estos temas: {temas}. Las preguntas podrían ser usadas en este tipo de juego.
+Cada pregunta debe tener varias respuestas posibles (entre 4 y 5), y la suma total de los puntos de todas las respuestas debe ser 100.
+Las respuestas deben reflejar lo que la mayoría de las personas dirían o pensarían en relación con la pregunta.
+
+Estructura el JSON con este formato:
+
+[{{
+    "tema": str,  # Uno de los temas dados, escrito exactamente igual que en las instrucciones
+    "pregunta": str,  # La pregunta que se hace a los participantes, relacionada con su tema
+    "respuestas": [
+        {{"respuesta": str, "pts": int}},  # La respuesta más común con el puntaje correspondiente
+        {{"respuesta": str, "pts": int}},  # Otras respuestas con puntajes menores
+        ...
+    ]
+}} , ...]
+
+Asegúrate de que las preguntas sean creativas, divertidas y adecuadas para el estilo de juego de "100 Mexicanos Dijeron".
+"""
+
+
+class ErrorGeneracion(Exception):
+    pass
+
+
+class ClienteModelo:
+    """Interfaz del modelo que genera preguntas para uno o varios temas a la vez."""
+
+    def generar(self, temas, por_tema):
+        raise NotImplementedError
+
+
+class ClienteGemini(ClienteModelo):
+    def __init__(self, api_key, modelo="gemini-1.5-flash"):
+        self.api_key = api_key
+        self.nombre_modelo = modelo
+        self._modelo = None
+
+    def generar(self, temas, por_tema):
+        if self._modelo is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._modelo = genai.GenerativeModel(
+                self.nombre_modelo, generation_config={"response_mime_type": "application/json"}
+            )
+        prompt = PROMPT.format(por_tema=por_tema, temas=", ".join(f'"{tema}"' for tema in temas))
+        response = self._modelo.generate_content(prompt)
+        try:
+            return json.loads(response.text)
+        except json.JSONDecodeError:
+            raise ErrorGeneracion("No se pudo generar preguntas válidas con la IA")
+
+
+class ClienteFalso(ClienteModelo):
+    """Cliente local y determinista para pruebas y benchmarks."""
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.llamadas = 0
+
+    def generar(self, temas, por_tema):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        return [
+            {
+                "tema": tema,
+                "pregunta": f"¿Pregunta {i + 1} sobre {tema}?",
+                "respuestas": [{"respuesta": f"respuesta {j + 1}", "pts": pts} for j, pts in enumerate((40, 30, 20, 10))],
+            }
+            for tema in temas
+            for i in range(por_tema)
+        ]
+
+
+class TrabajosMemoria:
+    """Trabajos de generación de este proceso; caducan ``ttl`` segundos después de su último cambio."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        # Con un TTL fijo el orden del último cambio es el de caducidad.
+        self._trabajos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, trabajo):
+        ahora = time.monotonic()
+        with self._lock:
+            self._trabajos[trabajo["id"]] = (ahora + self.ttl, dict(trabajo))
+            self._trabajos.move_to_end(trabajo["id"])
+            while self._trabajos:
+                caduca, _ = next(iter(self._trabajos.values()))
+                if caduca > ahora:
+                    break
+                self._trabajos.popitem(last=False)
+
+    def obtener(self, id_trabajo):
+        with self._lock:
+            entrada = self._trabajos.get(id_trabajo)
+        if entrada is None or entrada[0] <= time.monotonic():
+            return None
+        return entrada[1]
+
+
+class ColaGeneracion:
+    """Cola de trabajos de generación atendida por una tarea en segundo plano.
+
+    Agrupa en una sola llamada al modelo los temas que llegan dentro de
+    ``ventana`` segundos (hasta ``max_lote``) y guarda el resultado por tema
+    durante ``ttl`` segundos, de modo que pedir otra vez el mismo tema no
+    vuelve a llamar al modelo. ``precalentar`` llena esa caché por adelantado.
+    Las preguntas para las que ``es_repetida`` devuelve verdadero se descartan.
+
+    La tarea espera en una cola creada con ``crear_cola``; con eventlet o
+    gevent debe ser la del modo asíncrono (``eio.create_queue``), porque una
+    ``queue.Queue`` bloquearía el bucle de eventos entero.
+
+    El estado de cada trabajo se guarda en ``trabajos``. Con varios workers
+    debe ser un almacén compartido, porque la consulta del trabajo puede
+    llegar a un worker distinto del que lo recibió.
+    """
+
+    def __init__(self, cliente, validar, iniciar_tarea, notificar=None, es_repetida=None,
+                 ttl=3600, por_tema=3, max_lote=5, ventana=0.05, crear_cola=queue.Queue,
+                 cola_vacia=queue.Empty, metricas=None, trabajos=None):
+        self.cliente = cliente
+        self.validar = validar
+        self.es_repetida = es_repetida
+        self.iniciar_tarea = iniciar_tarea
+        self.notificar = notificar
+        self.ttl = ttl
+        self.por_tema = por_tema
+        self.max_lote = max_lote
+        self.ventana = ventana
+        self.metricas = metricas
+        self.trabajos = trabajos if trabajos is not None else TrabajosMemoria(ttl)
+        self._cache = {}
+        self._pendientes = {}
+        self._cola = crear_cola()
+        self._cola_vacia = cola_vacia
+        self._lock = threading.Lock()
+        self._iniciada = False
+
+    def enviar(self, tema, sid=None):
+        """Registra un trabajo y devuelve su id; si el tema está en caché ya queda listo."""
+        trabajo = {"id": uuid.uuid4().hex, "tema": tema, "sid": sid, "estado": "pendiente"}
+        clave = normalizar(tema)
+        self.trabajos.guardar(trabajo)
+        with self._lock:
+            preguntas = self._en_cache(clave)
+            if preguntas is None:
+                encolar = clave not in self._pendientes
+                self._pendientes.setdefault(clave, []).append(trabajo)
+        if preguntas is not None:
+            self._terminar(trabajo, preguntas=preguntas)
+        elif encolar:
+            self._encolar(tema)
+        return trabajo["id"]
+
+    def consultar(self, id_trabajo):
+        trabajo = self.trabajos.obtener(id_trabajo)
+        if trabajo is None:
+            return None
+        return _publico(trabajo)
+
+    def precalentar(self, temas):
+        for tema in temas:
+            clave = normalizar(tema)
+            with self._lock:
+                if self._en_cache(clave) is not None or clave in self._pendientes:
+                    continue
+                self._pendientes[clave] = []
+            self._encolar(tema)
+
+    def _encolar(self, tema):
+        with self._lock:
+            if not self._iniciada:
+                self._iniciada = True
+                self.iniciar_tarea(self._trabajar)
+        self._cola.put(tema)
+
+    def _trabajar(self):
+        while True:
+            temas = [self._cola.get()]
+            limite = time.monotonic() + self.ventana
+            while len(temas) < self.max_lote:
+                try:
+                    temas.append(self._cola.get(timeout=max(0, limite - time.monotonic())))
+                except self._cola_vacia:
+                    break
+            try:
+                self._generar_lote(temas)
+            except Exception:
+                log.exception("Error en la cola de generación", extra={"temas": temas})
+
+    def _generar_lote(self, temas):
+        por_clave = {normalizar(tema): tema for tema in temas}
+        resultados = {clave: [] for clave in por_clave}
+        error = "No se pudo generar preguntas válidas con la IA"
+        try:
+            generadas = self.cliente.generar(list(por_clave.values()), self.por_tema)
+        except ErrorGeneracion as exc:
+            generadas, error = [], str(exc)
+            self._registrar_error("respuesta_invalida")
+        except Exception:
+            log.exception("Error al llamar al modelo de generación", extra={"temas": temas})
+            generadas = []
+            self._registrar_error("excepcion")
+
+        for pregunta in generadas:
+            es_valida, mensaje = self.validar(pregunta) if isinstance(pregunta, dict) else (False, "")
+            clave = normalizar(pregunta["tema"]) if es_valida else None
+            if clave in resultados:
+                if self.es_repetida and self.es_repetida(pregunta):
+                    continue
+                pregunta["tema"] = por_clave[clave]
+                resultados[clave].append(pregunta)
+            elif not es_valida and mensaje:
+                error = f"Formato incorrecto en la pregunta generada: {mensaje}"
+
+        expira = time.monotonic() + self.ttl
+        for clave, preguntas in resultados.items():
+            with self._lock:
+                trabajos = self._pendientes.pop(clave, [])
+                if preguntas:
+                    self._cache[clave] = (expira, preguntas)
+            for trabajo in trabajos:
+                if preguntas:
+                    self._terminar(trabajo, preguntas=preguntas)
+                else:
+                    self._terminar(trabajo, error=error)
+
+    def _registrar_error(self, motivo):
+        if self.metricas is not None:
+            self.metricas.incrementar("generacion_errores_total", motivo=motivo)
+
+    def _terminar(self, trabajo, preguntas=None, error=None):
+        if error is None:
+            trabajo.update(estado="listo", preguntas=preguntas)
+        else:
+            trabajo.update(estado="error", error=error)
+        self.trabajos.guardar(trabajo)
+        if self.notificar and trabajo["sid"]:
+            self.notificar(trabajo["sid"], _publico(trabajo))
+
+    def _en_cache(self, clave):
+        entrada = self._cache.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] < time.monotonic():
+            del self._cache[clave]
+            return None
+        return entrada[1]
+
+
+def _publico(trabajo):
+    return {clave: valor for clave, valor in trabajo.items() if clave != "sid"}
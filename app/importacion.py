@@ -0,0 +1,157 @@
+# app/importacion.py
+#
+# Importación y exportación masiva del banco de preguntas en JSONL o CSV.
+# Los archivos se leen y escriben fila a fila: en memoria solo queda el lote
+# que se está insertando.
+#
+# JSONL: un objeto por línea con el formato de ``Pregunta.a_dict``.
+# CSV:   columnas tema, pregunta, dificultad (opcional) y pares respuesta1,
+#        pts1, respuesta2, pts2, ...
+
+import csv
+import io
+import json
+
+from app.almacen_preguntas import Pregunta
+from app.indice_preguntas import normalizar
+
+FORMATOS = ("jsonl", "csv")
+LOTE = 1000
+MAX_ERRORES = 1000
+
+
+def formato_de(nombre, predeterminado="jsonl"):
+    """Formato según la extensión de ``nombre``; ``predeterminado`` si no se reconoce."""
+    extension = (nombre or "").rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    return "csv" if extension == "csv" else predeterminado
+
+
+def leer_jsonl(lineas):
+    """Genera ``(fila, datos, error)`` por cada línea no vacía."""
+    for fila, linea in enumerate(lineas, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError as exc:
+            yield fila, None, f"JSON inválido: {exc.msg}"
+            continue
+        if not isinstance(datos, dict):
+            yield fila, None, "Cada línea debe ser un objeto JSON"
+        else:
+            yield fila, datos, None
+
+
+def leer_csv(lineas):
+    """Genera ``(fila, datos, error)``; la fila 1 es la cabecera."""
+    lector = csv.DictReader(lineas)
+    numeros = sorted(
+        int(columna[len("respuesta"):]) for columna in lector.fieldnames or ()
+        if columna.startswith("respuesta") and columna[len("respuesta"):].isdigit()
+    )
+    for datos in lector:
+        fila = lector.line_num
+        respuestas = []
+        for numero in numeros:
+            texto = (datos.get(f"respuesta{numero}") or "").strip()
+            pts = (datos.get(f"pts{numero}") or "").strip()
+            if not texto and not pts:
+                continue
+            respuestas.append({"respuesta": texto, "pts": int(pts) if pts.lstrip("-").isdigit() else pts})
+        pregunta = {"tema": (datos.get("tema") or "").strip(), "pregunta": (datos.get("pregunta") or "").strip(), "respuestas": respuestas}
+        if (datos.get("dificultad") or "").strip():
+            pregunta["dificultad"] = datos["dificultad"].strip()
+        yield fila, pregunta, None
+
+
+LECTORES = {"jsonl": leer_jsonl, "csv": leer_csv}
+
+
+def importar(banco, lineas, formato="jsonl", validar=None, lote=LOTE, al_error=None):
+    """Valida, deduplica e inserta por lotes las preguntas de ``lineas``.
+
+    ``lineas`` es cualquier iterable de texto (un archivo abierto, un
+    ``TextIOWrapper`` sobre el cuerpo de la petición). Las filas inválidas y
+    las repetidas (respecto al banco o a filas anteriores del mismo archivo)
+    se informan con su número de fila; se devuelven como mucho
+    ``MAX_ERRORES`` y ``al_error`` recibe todas.
+    """
+    if validar is None:
+        from app.preguntas import validar_pregunta as validar
+    resumen = {"leidas": 0, "agregadas": 0, "repetidas": 0, "invalidas": 0, "errores": []}
+
+    def error(fila, mensaje):
+        if len(resumen["errores"]) < MAX_ERRORES:
+            resumen["errores"].append({"fila": fila, "mensaje": mensaje})
+        if al_error:
+            al_error(fila, mensaje)
+
+    def insertar(pendientes):
+        filas = {id(pregunta): fila for fila, pregunta in pendientes}
+        repetidas = banco.agregar([pregunta for _, pregunta in pendientes])
+        for repetida, existente in repetidas:
+            error(filas[id(repetida)], f"Repetida de: {existente.pregunta}")
+        resumen["repetidas"] += len(repetidas)
+        resumen["agregadas"] += len(pendientes) - len(repetidas)
+
+    pendientes = []
+    for fila, datos, mensaje in LECTORES[formato](lineas):
+        resumen["leidas"] += 1
+        if mensaje is None:
+            # Una fila que el validador no sabe tratar se informa y se salta
+            # como cualquier otra inválida, sin cortar la importación.
+            try:
+                es_valida, mensaje = validar(datos)
+                if es_valida:
+                    mensaje = None
+                    pendientes.append((fila, Pregunta.desde_dict(datos)))
+            except (KeyError, TypeError, AttributeError, ValueError) as exc:
+                mensaje = f"Formato incorrecto: {exc}"
+        if mensaje is not None:
+            resumen["invalidas"] += 1
+            error(fila, mensaje)
+        if len(pendientes) >= lote:
+            insertar(pendientes)
+            pendientes = []
+    if pendientes:
+        insertar(pendientes)
+    # Las repetidas se conocen al escribir cada lote, después de las inválidas.
+    resumen["errores"].sort(key=lambda error: error["fila"])
+    return resumen
+
+
+def exportar(preguntas, formato="jsonl", tema=None):
+    """Genera el banco como líneas de texto en ``formato``, sin armar el archivo completo."""
+    # Se fija el total al empezar: lo que se agregue durante la exportación no entra.
+    total = len(preguntas)
+    seleccion = (preguntas[posicion] for posicion in range(total))
+    if tema:
+        tema = normalizar(tema)
+        seleccion = (pregunta for pregunta in seleccion if normalizar(pregunta.tema) == tema)
+
+    if formato == "jsonl":
+        for pregunta in seleccion:
+            yield json.dumps(pregunta.a_dict(), ensure_ascii=False, separators=(",", ":")) + "\n"
+        return
+
+    columnas_respuestas = max((len(preguntas[posicion].respuestas) for posicion in range(total)), default=1)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    def linea(valores):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerow(valores)
+        return buffer.getvalue()
+
+    cabecera = ["tema", "pregunta", "dificultad"]
+    for numero in range(1, columnas_respuestas + 1):
+        cabecera += [f"respuesta{numero}", f"pts{numero}"]
+    yield linea(cabecera)
+    for pregunta in seleccion:
+        valores = [pregunta.tema, pregunta.pregunta, pregunta.dificultad or ""]
+        for respuesta, pts in pregunta.respuestas:
+            valores += [respuesta, pts]
+        yield linea(valores)
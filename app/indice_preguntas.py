@@ -0,0 +1,145 @@
+# app/indice_preguntas.py
+
+import sys
+import unicodedata
+from collections import defaultdict
+
+
+class _TablaSinAcentos(dict):
+    def __missing__(self, codigo):
+        descompuesto = unicodedata.normalize("NFKD", chr(codigo))
+        base = "".join(c for c in descompuesto if not unicodedata.combining(c))
+        self[codigo] = base
+        return base
+
+
+_SIN_ACENTOS = _TablaSinAcentos()
+
+
+def normalizar(texto):
+    """Texto en minúsculas y sin acentos, para comparar sin distinguir tildes."""
+    texto = texto.casefold()
+    if texto.isascii():
+        return texto
+    return texto.translate(_SIN_ACENTOS)
+
+
+DIFICULTADES = ("facil", "media", "dificil")
+
+
+def calcular_dificultad(pregunta):
+    """Dificultad declarada de la pregunta o, si no tiene, la que sugieren sus puntos.
+
+    Cuanto más se concentran los puntos en la respuesta más popular, más
+    fácil es acertarla.
+    """
+    if pregunta.dificultad in DIFICULTADES:
+        return pregunta.dificultad
+    puntos = [pts for _, pts in pregunta.respuestas]
+    total = sum(puntos)
+    if not total:
+        return "media"
+    concentracion = max(puntos) / total
+    if concentracion >= 0.4:
+        return "facil"
+    return "media" if concentracion >= 0.3 else "dificil"
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndicePreguntas:
+    """Índice del banco de preguntas construido al cargarlo y actualizado al insertar.
+
+    Comparte la lista ``preguntas`` con la app: ``agregar`` la extiende y la
+    indexa. Las búsquedas usan un índice invertido de trigramas sobre el texto
+    normalizado y devuelven posiciones en el orden original del banco.
+
+    Además agrupa las posiciones por ``(tema, dificultad)`` para que
+    ``SeleccionPreguntas`` sortee sin recorrer el banco.
+    """
+
+    def __init__(self, preguntas):
+        self.preguntas = preguntas
+        self._textos = []
+        self._temas = []
+        self._por_tema = defaultdict(list)
+        self._trigramas = defaultdict(list)
+        self._categorias = {}
+        self._grupos = defaultdict(list)
+        self._grupo_de = []
+        self._por_texto = {}
+        for posicion, pregunta in enumerate(preguntas):
+            self._indexar(posicion, pregunta)
+
+    def agregar(self, pregunta):
+        self.preguntas.append(pregunta)
+        self._indexar(len(self.preguntas) - 1, pregunta)
+
+    def categorias(self):
+        return list(self._categorias)
+
+    def posicion(self, texto):
+        return self._por_texto.get(normalizar(texto.strip()))
+
+    def grupo(self, posicion):
+        """``(clave, desplazamiento)`` de la posición dentro de su grupo ``(tema, dificultad)``."""
+        return self._grupo_de[posicion]
+
+    def grupos(self, temas=None, dificultades=None):
+        """Claves ``(tema, dificultad)`` con preguntas, filtradas por tema y dificultad."""
+        temas = {normalizar(tema) for tema in temas} if temas else None
+        return [
+            clave for clave in self._grupos
+            if (temas is None or clave[0] in temas) and (not dificultades or clave[1] in dificultades)
+        ]
+
+    def miembros(self, clave):
+        return self._grupos.get(clave, [])
+
+    def buscar(self, categoria=None, texto="", inicio=0, cantidad=10):
+        """Devuelve ``(pagina, total)`` sin construir la lista filtrada completa."""
+        tema = normalizar(categoria) if categoria else None
+        busqueda = normalizar(texto)
+
+        if not busqueda:
+            posiciones = self._por_tema.get(tema, []) if tema is not None else range(len(self.preguntas))
+            return [self.preguntas[p] for p in posiciones[inicio:inicio + cantidad]], len(posiciones)
+
+        pagina = []
+        total = 0
+        for posicion in self._candidatos(tema, busqueda):
+            if tema is not None and self._temas[posicion] != tema:
+                continue
+            if busqueda not in self._textos[posicion]:
+                continue
+            if inicio <= total < inicio + cantidad:
+                pagina.append(self.preguntas[posicion])
+            total += 1
+        return pagina, total
+
+    def _candidatos(self, tema, busqueda):
+        if len(busqueda) < 3:
+            return self._por_tema.get(tema, []) if tema is not None else range(len(self.preguntas))
+
+        # La lista de posiciones más corta acota los candidatos; el resto se
+        # descarta al verificar la subcadena.
+        candidatos = min((self._trigramas.get(t, []) for t in trigramas(busqueda)), key=len)
+        if tema is not None and len(self._por_tema.get(tema, [])) < len(candidatos):
+            return self._por_tema[tema]
+        return candidatos
+
+    def _indexar(self, posicion, pregunta):
+        texto = normalizar(pregunta.pregunta)
+        tema = sys.intern(normalizar(pregunta.tema))
+        self._textos.append(texto)
+        self._temas.append(tema)
+        self._por_tema[tema].append(posicion)
+        self._categorias.setdefault(pregunta.tema, None)
+        self._por_texto.setdefault(texto.strip(), posicion)
+        clave = (tema, calcular_dificultad(pregunta))
+        self._grupo_de.append((clave, len(self._grupos[clave])))
+        self._grupos[clave].append(posicion)
+        for trigrama in trigramas(texto):
+            self._trigramas[trigrama].append(posicion)
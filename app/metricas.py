@@ -0,0 +1,197 @@
+# app/metricas.py
+
+import bisect
+import json
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from pymongo import monitoring
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_LLAMADAS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+
+class Metricas:
+    """Contadores, histogramas y medidores en memoria, expuestos en formato Prometheus."""
+
+    def __init__(self):
+        self._contadores = {}
+        self._histogramas = {}
+        self._medidores = {}
+        self._ayuda = {}
+        self._lock = threading.Lock()
+
+    def describir(self, nombre, ayuda):
+        self._ayuda[nombre] = ayuda
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = _clave(etiquetas)
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, buckets=BUCKETS_SEGUNDOS, **etiquetas):
+        clave = _clave(etiquetas)
+        with self._lock:
+            limites, serie = self._histogramas.setdefault(nombre, (buckets, {}))
+            cubetas = serie.get(clave)
+            if cubetas is None:
+                cubetas = serie[clave] = [[0] * (len(limites) + 1), 0.0]
+            cubetas[0][bisect.bisect_left(limites, valor)] += 1
+            cubetas[1] += valor
+
+    def medidor(self, nombre, funcion):
+        """Registra un valor que se lee al exponer; ``funcion`` devuelve un número."""
+        self._medidores[nombre] = funcion
+
+    def contador(self, nombre):
+        """Valores de un contador por etiquetas, como ``{(("evento", "x"),): valor}``."""
+        with self._lock:
+            return dict(self._contadores.get(nombre, {}))
+
+    def histograma(self, nombre):
+        """``(cantidad, suma)`` de un histograma por etiquetas."""
+        with self._lock:
+            _, serie = self._histogramas.get(nombre, ((), {}))
+            return {clave: (sum(cubetas), suma) for clave, (cubetas, suma) in serie.items()}
+
+    def exponer(self):
+        lineas = []
+        with self._lock:
+            contadores = {nombre: dict(serie) for nombre, serie in self._contadores.items()}
+            histogramas = {
+                nombre: (limites, {clave: (list(cubetas), suma) for clave, (cubetas, suma) in serie.items()})
+                for nombre, (limites, serie) in self._histogramas.items()
+            }
+        for nombre, serie in sorted(contadores.items()):
+            self._cabecera(lineas, nombre, "counter")
+            for clave, valor in serie.items():
+                lineas.append(f"{nombre}{_etiquetas(clave)} {valor}")
+        for nombre, (limites, serie) in sorted(histogramas.items()):
+            self._cabecera(lineas, nombre, "histogram")
+            for clave, (cubetas, suma) in serie.items():
+                acumulado = 0
+                for limite, cantidad in zip(limites, cubetas):
+                    acumulado += cantidad
+                    lineas.append(f"{nombre}_bucket{_etiquetas(clave, le=limite)} {acumulado}")
+                acumulado += cubetas[-1]
+                lineas.append(f"{nombre}_bucket{_etiquetas(clave, le='+Inf')} {acumulado}")
+                lineas.append(f"{nombre}_sum{_etiquetas(clave)} {suma}")
+                lineas.append(f"{nombre}_count{_etiquetas(clave)} {acumulado}")
+        for nombre, funcion in sorted(self._medidores.items()):
+            try:
+                valor = funcion()
+            except Exception:
+                continue
+            self._cabecera(lineas, nombre, "gauge")
+            lineas.append(f"{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def _cabecera(self, lineas, nombre, tipo):
+        if nombre in self._ayuda:
+            lineas.append(f"# HELP {nombre} {self._ayuda[nombre]}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+def _clave(etiquetas):
+    return tuple(sorted(etiquetas.items()))
+
+
+def _etiquetas(clave, **extra):
+    pares = list(clave) + list(extra.items())
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class EscuchaMongo(monitoring.CommandListener):
+    """Cuenta y cronometra los comandos de PyMongo; suma además los de la petición en curso."""
+
+    def __init__(self, metricas):
+        self.metricas = metricas
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._registrar(event, "ok")
+
+    def failed(self, event):
+        self._registrar(event, "error")
+
+    def _registrar(self, event, resultado):
+        segundos = event.duration_micros / 1e6
+        self.metricas.incrementar("mongo_comandos_total", comando=event.command_name, resultado=resultado)
+        self.metricas.observar("mongo_comando_segundos", segundos, comando=event.command_name)
+        if has_request_context():
+            g.mongo_llamadas = g.get("mongo_llamadas", 0) + 1
+            g.mongo_segundos = g.get("mongo_segundos", 0.0) + segundos
+
+
+def instrumentar_emisiones(socketio, metricas):
+    """Cuenta los eventos emitidos y sus bytes en JSON, por nombre de evento."""
+    if not hasattr(socketio, "_emit_original"):
+        socketio._emit_original = socketio.emit
+
+        def emit(evento, *args, **kwargs):
+            registro = socketio._metricas
+            registro.incrementar("socketio_emisiones_total", evento=evento)
+            if args:
+                tamano = len(json.dumps(args[0], ensure_ascii=False, separators=(",", ":"), default=str).encode())
+                registro.incrementar("socketio_emision_bytes_total", tamano, evento=evento)
+            return socketio._emit_original(evento, *args, **kwargs)
+
+        socketio.emit = emit
+    socketio._metricas = metricas
+
+
+def registrar_medidores(app):
+    metricas = app.metricas
+    metricas.describir("peticiones_http_segundos", "Latencia de las peticiones HTTP por ruta.")
+    metricas.describir("mongo_comandos_total", "Comandos enviados a Mongo.")
+    metricas.describir("mongo_comando_segundos", "Latencia de cada comando de Mongo.")
+    metricas.describir("mongo_comandos_por_peticion", "Comandos de Mongo hechos por cada petición HTTP o comando de Socket.IO.")
+    metricas.describir("mongo_segundos_por_endpoint_total", "Tiempo total en Mongo de las peticiones de cada ruta.")
+    metricas.describir("comandos_socket_segundos", "Latencia de los comandos del controlador por Socket.IO.")
+    metricas.describir("socketio_emisiones_total", "Eventos de Socket.IO emitidos.")
+    metricas.describir("socketio_emision_bytes_total", "Bytes en JSON de los eventos emitidos.")
+    metricas.describir("generacion_errores_total", "Llamadas al modelo de generación que fallaron, por motivo.")
+    metricas.medidor("tableros_partidas", lambda: len(app.tableros))
+    metricas.medidor("tableros_clientes", lambda: app.tableros.total_clientes())
+    metricas.medidor("partidas_en_cache", lambda: len(app.partidas))
+    metricas.medidor("temporizadores_activos", lambda: len(app.temporizadores))
+    metricas.medidor("codigos_reservados", lambda: len(app.codigos))
+    metricas.medidor("selecciones_preguntas", lambda: len(app.seleccion_preguntas))
+    metricas.medidor("tableros_pendientes", lambda: len(app.coalescedor or ()))
+
+
+metricas = Blueprint('metricas', __name__)
+
+@metricas.before_app_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+@metricas.after_app_request
+def terminar_medicion(respuesta):
+    inicio = g.get("inicio_peticion")
+    if inicio is None or request.endpoint == "metricas.exponer_metricas":
+        return respuesta
+    endpoint = request.endpoint or "desconocido"
+    registro = current_app.metricas
+    registro.observar(
+        "peticiones_http_segundos", time.perf_counter() - inicio,
+        endpoint=endpoint, metodo=request.method, estado=respuesta.status_code,
+    )
+    registro.observar("mongo_comandos_por_peticion", g.get("mongo_llamadas", 0), buckets=BUCKETS_LLAMADAS, endpoint=endpoint)
+    if g.get("mongo_segundos"):
+        registro.incrementar("mongo_segundos_por_endpoint_total", g.mongo_segundos, endpoint=endpoint)
+    return respuesta
+
+@metricas.route('/metrics', methods=['GET'])
+def exponer_metricas():
+    return Response(current_app.metricas.exponer(), mimetype="text/plain; version=0.0.4")
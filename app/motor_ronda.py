@@ -0,0 +1,118 @@
+# app/motor_ronda.py
+
+MAX_STRIKES = 3
+
+
+class ComandoInvalido(Exception):
+    pass
+
+
+def _equipo(indice):
+    return "equipo1" if indice == 0 else "equipo2"
+
+
+def _respuesta(partida, datos):
+    respuestas = partida.get("respuestas", [])
+    indice = datos.get("indice")
+    if not isinstance(indice, int) or not 0 <= indice < len(respuestas):
+        raise ComandoInvalido("La respuesta indicada no existe.")
+    return indice, respuestas[indice]
+
+
+def revelar(partida, datos):
+    """Marca o desmarca una respuesta y suma o resta sus puntos al equipo en turno.
+
+    Durante un robo, acertar una respuesta le da al equipo que roba los
+    puntos de la ronda más los de la respuesta y termina el robo.
+    """
+    indice, respuesta = _respuesta(partida, datos)
+    actual = partida.get("equipo_actual", 0)
+    robando = partida.get("robo_puntos", False)
+    puntuacion = partida.get("puntuacion_ronda", 0)
+    pts = respuesta.get("pts", 0)
+    ruta = f"respuestas.{indice}"
+
+    if respuesta.get("revealed"):
+        cambios = {"$set": {f"{ruta}.revealed": False, f"{ruta}.shownOnBoard": False}}
+        if not robando:
+            cambios["$inc"] = {"puntuacion_ronda": -pts, f"{_equipo(actual)}.score": -pts}
+        return cambios
+
+    if not robando and partida.get("strike", 0) >= MAX_STRIKES:
+        raise ComandoInvalido("El equipo ya tiene tres strikes; el otro equipo debe intentar robar.")
+
+    cambios = {"$set": {f"{ruta}.revealed": True, f"{ruta}.shownOnBoard": True}}
+    if robando:
+        cambios["$set"].update({"robo_puntos": False, "strike": 0})
+        cambios["$inc"] = {
+            "puntuacion_ronda": pts,
+            f"{_equipo(actual)}.score": puntuacion + pts,
+            f"{_equipo(1 - actual)}.score": -puntuacion,
+        }
+    else:
+        cambios["$inc"] = {"puntuacion_ronda": pts, f"{_equipo(actual)}.score": pts}
+    return cambios
+
+
+def mostrar(partida, datos):
+    """Muestra u oculta en el tablero una respuesta sin sumar puntos."""
+    indice, respuesta = _respuesta(partida, datos)
+    if respuesta.get("revealed") or partida.get("robo_puntos", False):
+        raise ComandoInvalido("No se puede cambiar la visibilidad de esta respuesta ahora.")
+    return {"$set": {f"respuestas.{indice}.shownOnBoard": not respuesta.get("shownOnBoard", False)}}
+
+
+def strike(partida, datos):
+    if partida.get("robo_puntos", False) or partida.get("strike", 0) >= MAX_STRIKES:
+        raise ComandoInvalido("No se pueden agregar más strikes.")
+    return {"$inc": {"strike": 1}}
+
+
+def quitar_strike(partida, datos):
+    if partida.get("robo_puntos", False) or partida.get("strike", 0) <= 0:
+        raise ComandoInvalido("No hay strikes que quitar.")
+    return {"$inc": {"strike": -1}}
+
+
+def robar(partida, datos):
+    """Pasa el turno al otro equipo para que intente robar los puntos de la ronda."""
+    if partida.get("robo_puntos", False) or partida.get("strike", 0) < MAX_STRIKES:
+        raise ComandoInvalido("Solo se puede robar después de tres strikes.")
+    return {"$set": {"robo_puntos": True, "equipo_actual": 1 - partida.get("equipo_actual", 0)}}
+
+
+def asignar(partida, datos):
+    """Entrega los puntos acumulados de la ronda al equipo indicado."""
+    equipo = datos.get("equipo")
+    actual = partida.get("equipo_actual", 0)
+    if equipo not in (0, 1):
+        raise ComandoInvalido("El equipo debe ser 0 o 1.")
+    if partida.get("robo_puntos", False) or (partida.get("strike", 0) >= MAX_STRIKES):
+        raise ComandoInvalido("No se puede cambiar de equipo durante un robo.")
+    if equipo == actual:
+        return {}
+    puntuacion = partida.get("puntuacion_ronda", 0)
+    return {
+        "$set": {"equipo_actual": equipo},
+        "$inc": {f"{_equipo(equipo)}.score": puntuacion, f"{_equipo(actual)}.score": -puntuacion},
+    }
+
+
+COMANDOS = {
+    "revelar": revelar,
+    "mostrar": mostrar,
+    "strike": strike,
+    "quitar_strike": quitar_strike,
+    "robar": robar,
+    "asignar": asignar,
+}
+
+
+def calcular_comando(partida, comando, datos):
+    """Devuelve la actualización de Mongo que produce ``comando`` sobre la partida."""
+    if partida.get("estado") != "game-control":
+        raise ComandoInvalido("La ronda no está en juego.")
+    funcion = COMANDOS.get(comando) if isinstance(comando, str) else None
+    if funcion is None:
+        raise ComandoInvalido(f"Comando desconocido: {comando}")
+    return funcion(partida, datos)
@@ -1,59 +1,158 @@
-import google.generativeai as genai
-import json
-import os
+import csv
+import io
 
-from flask import Blueprint, request, jsonify, current_app
+import click
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from app.almacen_preguntas import Pregunta
+from app.importacion import FORMATOS, LOTE, exportar, formato_de, importar
+from app.indice_preguntas import DIFICULTADES
+
+TIPOS_EXPORTACION = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
 
 preguntas = Blueprint('preguntas', __name__)
 
 def guardar_preguntas():
-    file_path = os.path.join(current_app.root_path, 'preguntas.json')
-    with open(file_path, 'w', encoding='utf-8') as file:
-        json.dump(current_app.preguntas, file, ensure_ascii=False, indent=4)
+    current_app.banco_preguntas.guardar()
+
+def agregar_preguntas(nuevas):
+    return current_app.banco_preguntas.agregar([Pregunta.desde_dict(pregunta) for pregunta in nuevas])
 
 @preguntas.route('/questions', methods=['GET'])
 def obtener_preguntas():
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
-    categoria = request.args.get('category', 'Todas').lower()
-    search = request.args.get('search', '').lower()
+    categoria = request.args.get('category', 'Todas')
+    search = request.args.get('search', '')
 
-    preguntas = current_app.preguntas
+    if categoria.lower() == 'todas':
+        categoria = None
 
-    if categoria != 'todas':
-        preguntas = [p for p in preguntas if p['tema'].lower() == categoria]
+    paginated_preguntas, total_preguntas = current_app.banco_preguntas.indice.buscar(
+        categoria, search, inicio=(page - 1) * per_page, cantidad=per_page
+    )
 
-    if search:
-        preguntas = [p for p in preguntas if search in p['pregunta'].lower()]
-
-    total_preguntas = len(preguntas)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_preguntas = preguntas[start:end]
+    return jsonify({
+        "questions": [pregunta.a_dict() for pregunta in paginated_preguntas],
+        "totalPages": (total_preguntas + per_page - 1) // per_page 
+    }), 200
 
-    print(len(paginated_preguntas))
+@preguntas.route('/questions', methods=['POST'])
+def agregar_preguntas_banco():
+    data = request.get_json()
+    nuevas = data.get('preguntas', [])
+    if not nuevas:
+        return jsonify({"success": False, "message": "No se recibieron preguntas."}), 400
+    for pregunta in nuevas:
+        es_valida, mensaje = validar_pregunta(pregunta)
+        if not es_valida:
+            return jsonify({"success": False, "message": f"Formato incorrecto en la pregunta: {mensaje}"}), 400
+    repetidas = agregar_preguntas(nuevas)
+    return jsonify({
+        "success": True,
+        "message": f"{len(nuevas) - len(repetidas)} preguntas agregadas, {len(repetidas)} descartadas por repetidas.",
+        "repetidas": [{"pregunta": nueva.pregunta, "existente": existente.pregunta} for nueva, existente in repetidas],
+    }), 200
 
+@preguntas.route('/questions/import', methods=['POST'])
+def importar_preguntas_banco():
+    archivo = request.files.get('archivo')
+    predeterminado = 'csv' if request.mimetype == 'text/csv' else 'jsonl'
+    formato = request.args.get('formato') or formato_de(archivo.filename if archivo else None, predeterminado)
+    if formato not in FORMATOS:
+        return jsonify({"success": False, "message": f"'formato' debe ser uno de: {', '.join(FORMATOS)}"}), 400
+    lote = max(1, request.args.get('lote', LOTE, type=int))
+
+    # Se lee el cuerpo como flujo: el archivo nunca se carga entero en memoria.
+    lineas = io.TextIOWrapper(archivo.stream if archivo else request.stream, encoding='utf-8-sig', newline='')
+    try:
+        resumen = importar(current_app.banco_preguntas, lineas, formato, lote=lote)
+    except UnicodeDecodeError:
+        return jsonify({"success": False, "message": "El archivo debe estar codificado en UTF-8."}), 400
+    except csv.Error as exc:
+        return jsonify({"success": False, "message": f"CSV inválido: {exc}"}), 400
     return jsonify({
-        "questions": paginated_preguntas,
-        "totalPages": (total_preguntas + per_page - 1) // per_page 
+        "success": True,
+        "message": f"{resumen['agregadas']} preguntas agregadas, {resumen['repetidas']} descartadas por repetidas, "
+                   f"{resumen['invalidas']} con errores.",
+        **resumen,
     }), 200
 
+@preguntas.route('/questions/export', methods=['GET'])
+def exportar_preguntas_banco():
+    formato = request.args.get('formato', 'jsonl')
+    if formato not in FORMATOS:
+        return jsonify({"error": f"'formato' debe ser uno de: {', '.join(FORMATOS)}"}), 400
+    categoria = request.args.get('category', 'Todas')
+    if categoria.lower() == 'todas':
+        categoria = None
+    return Response(
+        stream_with_context(exportar(current_app.banco_preguntas.preguntas, formato, categoria)),
+        mimetype=TIPOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f"attachment; filename=preguntas.{formato}"},
+    )
+
 @preguntas.route('/categories', methods=['GET'])
 def obtener_categorias():
-    categorias = {p['tema'] for p in current_app.preguntas}
-    return jsonify({"categories": list(categorias)}), 200
+    return jsonify({"categories": current_app.banco_preguntas.indice.categorias()}), 200
+
+@preguntas.cli.command('deduplicar')
+@click.option('--umbral', type=float, default=None, help='Similitud mínima (0 a 1) para considerar dos preguntas repetidas.')
+@click.option('--simular', is_flag=True, help='Solo lista las repetidas, sin modificar el banco.')
+def deduplicar_banco(umbral, simular):
+    """Elimina del banco las preguntas repetidas o casi repetidas."""
+    repetidas = current_app.banco_preguntas.deduplicar(umbral=umbral, simular=simular)
+    for repetida, conservada in repetidas:
+        click.echo(f"- {repetida.pregunta}\n  = {conservada.pregunta}")
+    accion = "encontradas" if simular else "eliminadas"
+    click.echo(f"{len(repetidas)} preguntas repetidas {accion}.")
+
+@preguntas.cli.command('importar')
+@click.argument('archivo', type=click.File('r', encoding='utf-8-sig', lazy=False))
+@click.option('--formato', type=click.Choice(FORMATOS), default=None, help='Por defecto, según la extensión del archivo.')
+@click.option('--lote', type=click.IntRange(min=1), default=LOTE, show_default=True, help='Preguntas por escritura al banco.')
+def importar_banco(archivo, formato, lote):
+    """Importa preguntas desde un archivo JSONL o CSV ('-' para la entrada estándar)."""
+    formato = formato or formato_de(archivo.name)
+    resumen = importar(
+        current_app.banco_preguntas, archivo, formato, lote=lote,
+        al_error=lambda fila, mensaje: click.echo(f"fila {fila}: {mensaje}", err=True),
+    )
+    click.echo(f"{resumen['leidas']} filas leídas: {resumen['agregadas']} agregadas, "
+               f"{resumen['repetidas']} repetidas, {resumen['invalidas']} con errores.")
+
+@preguntas.cli.command('exportar')
+@click.argument('archivo', type=click.File('w', encoding='utf-8', lazy=True))
+@click.option('--formato', type=click.Choice(FORMATOS), default=None, help='Por defecto, según la extensión del archivo.')
+@click.option('--categoria', default=None, help='Exporta solo las preguntas de esta categoría.')
+def exportar_banco(archivo, formato, categoria):
+    """Exporta el banco de preguntas a un archivo JSONL o CSV ('-' para la salida estándar)."""
+    formato = formato or formato_de(archivo.name)
+    archivo.writelines(exportar(current_app.banco_preguntas.preguntas, formato, categoria))
 
 def validar_pregunta(pregunta):
+    if not isinstance(pregunta, dict):
+        return False, "Cada pregunta debe ser un objeto"
+
     required_keys = {'tema', 'pregunta', 'respuestas'}
     if not all(key in pregunta for key in required_keys):
         return False, "Faltan campos requeridos"
+
+    if not all(isinstance(pregunta[key], str) and pregunta[key].strip() for key in ('tema', 'pregunta')):
+        return False, "'tema' y 'pregunta' deben ser textos no vacíos"
     
+    if pregunta.get('dificultad') is not None and pregunta['dificultad'] not in DIFICULTADES:
+        return False, f"'dificultad' debe ser una de: {', '.join(DIFICULTADES)}"
+
     if not isinstance(pregunta['respuestas'], list) or len(pregunta['respuestas']) < 1:
         return False, "La lista de respuestas debe contener al menos una respuesta"
 
     for respuesta in pregunta['respuestas']:
+        if not isinstance(respuesta, dict):
+            return False, "Cada respuesta debe ser un objeto"
         if not all(key in respuesta for key in {'respuesta', 'pts'}):
             return False, "Cada respuesta debe tener los campos 'respuesta' y 'pts'"
+        if not isinstance(respuesta['respuesta'], str):
+            return False, "'respuesta' debe ser un texto"
         if not isinstance(respuesta['pts'], int):
             return False, "'pts' debe ser un número entero"
 
@@ -66,44 +165,20 @@ def generar_preguntas():
     
     if not tema:
         return jsonify({"error": "El parámetro 'tema' es requerido"}), 400
-    
-    genai.configure(api_key=current_app.config["API_KEY_GEMINI"])
-    
-    prompt = f"""
-    Estás diseñando preguntas para un juego basado en "Family Feud", un popular programa de televisión en el que se hacen preguntas a varias personas y los participantes deben adivinar las respuestas más comunes.
-    
-    Genera 3 preguntas en español sobre el tema "{tema}" que podrían ser usadas en este tipo de juego.
-    Cada pregunta debe tener varias respuestas posibles (entre 4 y 5), y la suma total de los puntos de todas las respuestas debe ser 100.
-    Las respuestas deben reflejar lo que la mayoría de las personas dirían o pensarían en relación con la pregunta.
-
-    Estructura el JSON con este formato:
-
-    [{{
-        "tema": str,  # El tema dado en las instrucciones
-        "pregunta": str,  # La pregunta que se hace a los participantes, relacionada con el tema "{tema}"
-        "respuestas": [
-            {{"respuesta": str, "pts": int}},  # La respuesta más común con el puntaje correspondiente
-            {{"respuesta": str, "pts": int}},  # Otras respuestas con puntajes menores
-            ...
-        ]
-    }} , ...]
-    
-    Asegúrate de que las preguntas sean creativas, divertidas y adecuadas para el estilo de juego de "100 Mexicanos Dijeron".
-    """
-
-    model = genai.GenerativeModel('gemini-1.5-flash',
-                                  generation_config={"response_mime_type": "application/json"})
-    response = model.generate_content(prompt)
-
-    try:
-        print(response.text)
-        preguntas_generadas = json.loads(response.text)
-    except json.JSONDecodeError:
-        return jsonify({"error": "No se pudo generar preguntas válidas con la IA"}), 500
-    
-    for pregunta in preguntas_generadas:
-        es_valida, mensaje = validar_pregunta(pregunta)
-        if not es_valida:
-            return jsonify({"error": f"Formato incorrecto en la pregunta generada: {mensaje}"}), 400
 
-    return jsonify({"preguntas": preguntas_generadas}), 200
+    id_trabajo = current_app.generador.enviar(tema, sid=request.args.get('sid'))
+    return respuesta_trabajo(current_app.generador.consultar(id_trabajo))
+
+@preguntas.route('/generar-preguntas/<id_trabajo>', methods=['GET'])
+def consultar_generacion(id_trabajo):
+    trabajo = current_app.generador.consultar(id_trabajo)
+    if trabajo is None:
+        return jsonify({"error": "El trabajo de generación no existe"}), 404
+    return respuesta_trabajo(trabajo)
+
+def respuesta_trabajo(trabajo):
+    if trabajo["estado"] == "listo":
+        return jsonify({"preguntas": trabajo["preguntas"], "estado": "listo"}), 200
+    if trabajo["estado"] == "error":
+        return jsonify({"error": trabajo["error"], "estado": "error"}), 500
+    return jsonify({"trabajo": trabajo["id"], "estado": "pendiente"}), 202
@@ -0,0 +1,70 @@
+# app/registro.py
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+# Atributos propios de LogRecord; el resto son campos pasados con ``extra``.
+_ATRIBUTOS_REGISTRO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_escucha = None
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos de ``extra`` al primer nivel."""
+
+    def format(self, record):
+        datos = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname,
+            "origen": record.name,
+            "mensaje": record.getMessage(),
+        }
+        datos.update({clave: valor for clave, valor in vars(record).items() if clave not in _ATRIBUTOS_REGISTRO})
+        if record.exc_info:
+            datos["error"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar solo una fracción de los registros por debajo de WARNING."""
+
+    def __init__(self, tasa):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.tasa >= 1 or random.random() < self.tasa
+
+
+def configurar_registro(app):
+    """Configura el logger ``app``: nivel, muestreo y escritura en un hilo aparte.
+
+    Los módulos registran en una cola y un ``QueueListener`` escribe en
+    stderr, para que la E/S del registro no bloquee las peticiones ni los
+    eventos de Socket.IO.
+    """
+    global _escucha
+    if _escucha is not None:
+        _escucha.stop()
+
+    salida = logging.StreamHandler(sys.stderr)
+    if app.config.get('LOG_FORMATO', 'json') == 'json':
+        salida.setFormatter(FormatoJSON())
+    else:
+        salida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    cola = queue.SimpleQueue()
+    _escucha = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    _escucha.start()
+
+    entrada = logging.handlers.QueueHandler(cola)
+    entrada.addFilter(FiltroMuestreo(app.config.get('LOG_MUESTREO', 1.0)))
+
+    registro = logging.getLogger('app')
+    registro.handlers[:] = [entrada]
+    registro.setLevel(app.config.get('LOG_NIVEL', 'INFO').upper())
+    registro.propagate = False
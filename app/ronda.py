@@ -1,14 +1,21 @@
-from flask import Blueprint, request, jsonify, current_app
-from app.control import buscar_partida_por_codigo, update_board, validar_codigo
-from app.sockets import tableros
+from flask import Blueprint, current_app
+from app.control import actualizar_partida, buscar_partida_por_codigo, comando, responder_http, revision_esperada, update_board
+from app.difusion import CAMPOS_TABLERO, construir_game_info
 from app.extensions import socketio
+from app.motor_ronda import ComandoInvalido, calcular_comando
+from app.torneos import registrar_fin_de_ronda
+
+# Comandos que el público debe ver sin esperar a la ventana de agrupación.
+COMANDOS_INMEDIATOS = {"revelar", "mostrar"}
 
 ronda = Blueprint('ronda', __name__)
 
 @ronda.route('/updateGameBoard', methods=['POST'])
 def update_game_board():
-    data = request.get_json()
-    code = data.get('code', '').upper()
+    return responder_http('updateGameBoard')
+
+@comando('updateGameBoard')
+def actualizar_tablero(code, data):
     equipo1 = data.get('equipo1', {})
     equipo2 = data.get('equipo2', {})
     pregunta = data.get('pregunta', '')
@@ -17,16 +24,9 @@ def update_game_board():
     equipo_actual = data.get('equipo_actual', 0)
     strike = data.get('strike', 0)
     robo_puntos = data.get('robo_puntos', False)
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
-
-    partida = buscar_partida_por_codigo(code)
-    if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
 
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
+    actualizar_partida(
+        code,
         {
             "$set": {
                 "equipo1": equipo1,
@@ -38,26 +38,53 @@ def update_game_board():
                 "strike": strike,
                 "robo_puntos": robo_puntos,
             }
-        }
+        },
+        data.get('revision'),
     )
 
-    update_board(code)
-    return jsonify({"success": True, "message": "Estado del juego actualizado exitosamente."}), 200
+    update_board(code, inmediato=bool(data.get('inmediato')))
+    return {"success": True, "message": "Estado del juego actualizado exitosamente."}, 200
+
+
+@ronda.route('/roundCommand', methods=['POST'])
+def round_command():
+    return responder_http('roundCommand')
+
+# roundCommand y endRound leen la partida completa, así que comprueban ellos
+# mismos que exista en lugar de hacer una lectura más en el despachador.
+@comando('roundCommand', existente=False)
+def comando_ronda(code, data):
+    partida = buscar_partida_por_codigo(code)
+    if not partida:
+        return {"success": False, "message": "El juego no existe."}, 404
+
+    try:
+        cambios = calcular_comando(partida, data.get('comando'), data)
+    except ComandoInvalido as exc:
+        return {"success": False, "message": str(exc)}, 409
+
+    if cambios:
+        actualizar_partida(code, cambios, revision_esperada(data, partida))
+    version, ops = update_board(code, inmediato=data.get('comando') in COMANDOS_INMEDIATOS)
+    if ops is None:
+        return {"success": True, "version": version,
+                "gameInfo": construir_game_info(buscar_partida_por_codigo(code, CAMPOS_TABLERO))}, 200
+    return {"success": True, "version": version, "ops": ops}, 200
 
 
 @ronda.route("/endRound", methods=["POST"])
 def end_round():
-    data = request.get_json()
-    code = data.get('code', '').upper()
-    es_valido, mensaje = validar_codigo(code)
-    if not es_valido:
-        return jsonify({"success": False, "message": mensaje}), 400
+    return responder_http('endRound')
+
+@comando('endRound', existente=False)
+def terminar_ronda(code, data):
     partida = buscar_partida_por_codigo(code)
     if not partida:
-        return jsonify({"success": False, "message": "El juego no existe."}), 404
+        return {"success": False, "message": "El juego no existe."}, 404
     
-    current_app.mongo_db.partida.update_one(
-        {"codigo": code},
+    revision = revision_esperada(data, partida)
+    actualizar_partida(
+        code,
         {
             "$set": {
                 "estado": "game-selection",
@@ -65,21 +92,26 @@ def end_round():
                 "strike":0,
                 "robo_puntos": False,
             },
-            "$push": {
-                "rondas": {
-                    "equipo1": partida.get("equipo1", {}),
-                    "equipo2": partida.get("equipo2", {}),
-                    "pregunta": partida.get("pregunta", ""),
-                    "respuestas": partida.get("respuestas", []),
-                    "puntuacion_ronda": partida.get("puntuacion_ronda", 0),
-                    "equipo_actual": partida.get("equipo_actual", 0),
-                    "strike": partida.get("strike", 0),
-                    "robo_puntos": partida.get("robo_puntos", False)
-                },
-                "usadas": partida.get("pregunta", ""),
-            }
-        }
+            "$inc": {"rondas_jugadas": 1},
+        },
+        revision,
     )
+    # La ronda se guarda con el estado leído en ``revision``, que es justo el
+    # que la actualización condicionada acaba de reemplazar.
+    ronda = {
+        "numero": partida.get("rondas_jugadas", 0) + 1,
+        "revision": revision,
+        "equipo1": partida.get("equipo1", {}),
+        "equipo2": partida.get("equipo2", {}),
+        "pregunta": partida.get("pregunta", ""),
+        "respuestas": partida.get("respuestas", []),
+        "puntuacion_ronda": partida.get("puntuacion_ronda", 0),
+        "equipo_actual": partida.get("equipo_actual", 0),
+        "strike": partida.get("strike", 0),
+        "robo_puntos": partida.get("robo_puntos", False),
+    }
+    current_app.historial.agregar(code, ronda)
+    registrar_fin_de_ronda(partida, ronda)
     update_board(code)
-    return jsonify({"success": True, "message": "Ronda terminada y estado actualizado a 'game-control'."}), 200
+    return {"success": True, "message": "Ronda terminada y estado actualizado a 'game-control'."}, 200
 
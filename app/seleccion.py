@@ -0,0 +1,201 @@
+# app/seleccion.py
+
+import random
+import threading
+from collections import OrderedDict
+
+from app.indice_preguntas import calcular_dificultad, normalizar
+
+
+class _Grupo:
+    """Preguntas de un grupo ``(tema, dificultad)`` no usadas en una partida.
+
+    Es un Fisher-Yates perezoso sobre los desplazamientos del grupo: las
+    casillas ``[0, restantes)`` tienen las preguntas libres y el resto las
+    usadas. Solo se guardan las casillas que cambiaron, así que marcar una
+    pregunta cuesta O(1) y la memoria crece con las usadas, no con el banco.
+    """
+
+    __slots__ = ("total", "restantes", "valor_en", "casilla_de")
+
+    def __init__(self):
+        self.total = 0
+        self.restantes = 0
+        self.valor_en = {}
+        self.casilla_de = {}
+
+    def crecer(self, total):
+        if self.restantes == self.total:
+            self.total = self.restantes = total
+            return
+        # Las preguntas agregadas al banco entran libres: cada una se cambia
+        # por la primera casilla usada.
+        while self.total < total:
+            self._intercambiar(self.total, self.restantes)
+            self.total += 1
+            self.restantes += 1
+
+    def marcar(self, desplazamiento):
+        casilla = self.casilla_de.get(desplazamiento, desplazamiento)
+        if casilla >= self.restantes:
+            return False
+        self.restantes -= 1
+        self._intercambiar(casilla, self.restantes)
+        return True
+
+    def valor(self, casilla):
+        return self.valor_en.get(casilla, casilla)
+
+    def _intercambiar(self, a, b):
+        if a != b:
+            valor_a, valor_b = self.valor(a), self.valor(b)
+            self._colocar(a, valor_b)
+            self._colocar(b, valor_a)
+
+    def _colocar(self, casilla, valor):
+        if casilla == valor:
+            self.valor_en.pop(casilla, None)
+            self.casilla_de.pop(valor, None)
+        else:
+            self.valor_en[casilla] = valor
+            self.casilla_de[valor] = casilla
+
+
+class _EstadoPartida:
+    __slots__ = ("indice", "grupos", "rondas_vistas")
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.grupos = {}
+        self.rondas_vistas = 0
+
+    def grupo(self, clave):
+        grupo = self.grupos.get(clave)
+        if grupo is None:
+            grupo = self.grupos[clave] = _Grupo()
+        grupo.crecer(len(self.indice.miembros(clave)))
+        return grupo
+
+    def marcar(self, posicion):
+        clave, desplazamiento = self.indice.grupo(posicion)
+        return self.grupo(clave).marcar(desplazamiento)
+
+
+class SeleccionPreguntas:
+    """Sorteo de preguntas no usadas por partida, por tema y dificultad.
+
+    Cada partida guarda qué preguntas del banco ya usó en un ``_Grupo`` por
+    ``(tema, dificultad)``, así que sortear ``k`` preguntas cuesta O(k) por
+    grupo sin importar el tamaño del banco. Las usadas se toman del historial
+    de rondas (solo las rondas nuevas desde el último sorteo) y de
+    ``marcar``, que se llama al poner una pregunta en juego. Si el banco se
+    reindexa, el estado de la partida se reconstruye desde el historial.
+    """
+
+    def __init__(self, banco, historial, max_partidas=1000, azar=None):
+        self.banco = banco
+        self.historial = historial
+        self.max_partidas = max_partidas
+        self.azar = azar or random.Random()
+        self._partidas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sortear(self, code, cantidad, temas=None, dificultades=None, pesos=None):
+        """Devuelve ``(preguntas, restantes)``; cada pregunta es un par ``(Pregunta, dificultad)``.
+
+        Sin ``pesos`` todas las preguntas libres tienen la misma probabilidad.
+        ``pesos`` da un peso por tema (1 para los que no aparecen) y dentro de
+        cada tema se sortea de manera uniforme. Sortear no marca las preguntas
+        como usadas.
+        """
+        while True:
+            with self._lock:
+                desde = self._estado(code).rondas_vistas
+            # Solo se leen las rondas terminadas desde el último sorteo.
+            nuevas = self.historial.preguntas_usadas(code, desde=desde)
+            with self._lock:
+                estado = self._estado(code)
+                if estado.rondas_vistas != desde:
+                    # Otro sorteo avanzó o el estado se reconstruyó mientras se leía.
+                    continue
+                for texto in nuevas:
+                    posicion = estado.indice.posicion(texto)
+                    if posicion is not None:
+                        estado.marcar(posicion)
+                estado.rondas_vistas += len(nuevas)
+                return self._sortear(estado, cantidad, temas, dificultades, pesos)
+
+    def marcar(self, code, texto):
+        """Marca como usada la pregunta del banco con ese texto; ``False`` si no está o ya estaba usada."""
+        with self._lock:
+            estado = self._estado(code)
+            posicion = estado.indice.posicion(texto)
+            return posicion is not None and estado.marcar(posicion)
+
+    def olvidar(self, code):
+        with self._lock:
+            self._partidas.pop(code, None)
+
+    def __len__(self):
+        return len(self._partidas)
+
+    def _sortear(self, estado, cantidad, temas, dificultades, pesos):
+        indice = estado.indice
+        grupos = {clave: estado.grupo(clave) for clave in indice.grupos(temas, dificultades)}
+        libres = {clave: grupo.restantes for clave, grupo in grupos.items()}
+        movidas = {clave: {} for clave in grupos}
+        pesos_tema = {normalizar(tema): peso for tema, peso in (pesos or {}).items()}
+        elegidas = []
+        while len(elegidas) < cantidad:
+            clave = self._elegir_grupo(libres, pesos_tema if pesos else None)
+            if clave is None:
+                break
+            # Fisher-Yates sobre las casillas libres del grupo, con los
+            # cambios de este sorteo aparte para no tocar el estado.
+            grupo, cambios = grupos[clave], movidas[clave]
+            casilla = self.azar.randrange(libres[clave])
+            ultima = libres[clave] - 1
+            desplazamiento = cambios.get(casilla, grupo.valor(casilla))
+            cambios[casilla] = cambios.get(ultima, grupo.valor(ultima))
+            libres[clave] = ultima
+            elegidas.append(indice.miembros(clave)[desplazamiento])
+        restantes = sum(grupo.restantes for grupo in grupos.values())
+        return [(indice.preguntas[posicion], calcular_dificultad(indice.preguntas[posicion])) for posicion in elegidas], restantes
+
+    def _estado(self, code):
+        indice = self.banco.indice
+        estado = self._partidas.get(code)
+        if estado is None or estado.indice is not indice:
+            estado = self._partidas[code] = _EstadoPartida(indice)
+            while len(self._partidas) > self.max_partidas:
+                self._partidas.popitem(last=False)
+        self._partidas.move_to_end(code)
+        return estado
+
+    def _elegir_grupo(self, libres, pesos_tema):
+        if pesos_tema is None:
+            total = sum(libres.values())
+            if not total:
+                return None
+            objetivo = self.azar.randrange(total)
+            for clave, cantidad in libres.items():
+                if objetivo < cantidad:
+                    return clave
+                objetivo -= cantidad
+
+        libres_tema = {}
+        for (tema, _), cantidad in libres.items():
+            libres_tema[tema] = libres_tema.get(tema, 0) + cantidad
+        ponderados = [
+            (clave, pesos_tema.get(clave[0], 1) * cantidad / libres_tema[clave[0]])
+            for clave, cantidad in libres.items() if cantidad and pesos_tema.get(clave[0], 1) > 0
+        ]
+        if not ponderados:
+            return None
+        total = sum(peso for _, peso in ponderados)
+        objetivo = self.azar.random() * total
+        for clave, peso in ponderados:
+            if objetivo < peso:
+                return clave
+            objetivo -= peso
+        return ponderados[-1][0]
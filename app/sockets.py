@@ -1,47 +1,192 @@
 # app/sockets.py
 
-from flask_socketio import emit, join_room
-from flask import request
-import random
-import string
+from flask_socketio import emit, join_room, leave_room
+from flask import current_app, g, request, session
+import logging
+
+from app.compacto import FORMATO_COMPACTO
+from app.metricas import BUCKETS_LLAMADAS
+import threading
+import time
+
+INTERVALO_PURGA = 60
+
+log = logging.getLogger(__name__)
+
+
+class RegistroTableros:
+    """Tableros conectados, indexados por código y por SID, con el formato que pidió cada uno."""
+
+    def __init__(self):
+        self._sids_por_codigo = {}
+        self._codigo_por_sid = {}
+        self._compactos_por_codigo = {}
+        self._lock = threading.Lock()
+        self._ultima_purga = time.monotonic()
+
+    def conectar(self, code, sid, formato="json"):
+        with self._lock:
+            self._quitar(sid)
+            self._sids_por_codigo.setdefault(code, set()).add(sid)
+            self._codigo_por_sid[sid] = code
+            if formato == FORMATO_COMPACTO:
+                self._compactos_por_codigo.setdefault(code, set()).add(sid)
+
+    def desconectar(self, sid):
+        with self._lock:
+            return self._quitar(sid)
+
+    def codigo(self, sid):
+        return self._codigo_por_sid.get(sid)
+
+    def sids(self, code):
+        with self._lock:
+            return set(self._sids_por_codigo.get(code, ()))
+
+    def compactos(self, code):
+        """SID de los tableros de ``code`` que reciben el formato compacto."""
+        with self._lock:
+            return set(self._compactos_por_codigo.get(code, ()))
+
+    def total_clientes(self):
+        return len(self._codigo_por_sid)
+
+    def purgar(self, esta_conectado, intervalo=0):
+        """Quita los SID que ya no están conectados; devuelve cuántos se quitaron."""
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultima_purga < intervalo:
+                return 0
+            self._ultima_purga = ahora
+            muertos = [sid for sid in self._codigo_por_sid if not esta_conectado(sid)]
+            for sid in muertos:
+                self._quitar(sid)
+        return len(muertos)
+
+    def __contains__(self, code):
+        return code in self._sids_por_codigo
+
+    def __getitem__(self, code):
+        return self.sids(code)
+
+    def __len__(self):
+        return len(self._sids_por_codigo)
+
+    def _quitar(self, sid):
+        code = self._codigo_por_sid.pop(sid, None)
+        if code is not None:
+            sids = self._sids_por_codigo.get(code)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._sids_por_codigo[code]
+            compactos = self._compactos_por_codigo.get(code)
+            if compactos is not None:
+                compactos.discard(sid)
+                if not compactos:
+                    del self._compactos_por_codigo[code]
+        return code
+
+
+def sala_compacta(code):
+    """Sala extra de los tableros de ``code`` que reciben el formato compacto."""
+    return f"{code}:{FORMATO_COMPACTO}"
 
-# Diccionario para almacenar los tableros y sus clientes conectados
-tableros = {}
 
 def socketio_events(socketio):
+    def esta_conectado(sid):
+        return socketio.server.manager.is_connected(sid, '/')
+
+    def registrar_tablero(code, formato="json"):
+        tableros = current_app.tableros
+        anterior = tableros.codigo(request.sid)
+        if anterior is not None:
+            leave_room(sala_compacta(anterior))
+            if anterior != code:
+                leave_room(anterior)
+        join_room(code)
+        if formato == FORMATO_COMPACTO:
+            join_room(sala_compacta(code))
+        tableros.conectar(code, request.sid, formato)
+
+    def respuesta_control(respuesta, estado):
+        return {**respuesta, "status": estado}
+
     @socketio.on('connect')
     def handle_connect():
-        print('Cliente conectado')
+        log.debug("Cliente conectado", extra={"sid": request.sid})
+        current_app.tableros.purgar(esta_conectado, intervalo=INTERVALO_PURGA)
     
     @socketio.on('disconnect')
     def handle_disconnect():
-        for code, clients in tableros.items():
-            if request.sid in clients:
-                clients.remove(request.sid)
-                print(f'Cliente ${code} desconectado')
-                break
+        code = current_app.tableros.desconectar(request.sid)
+        if code is not None:
+            log.info("Tablero desconectado", extra={"code": code, "sid": request.sid})
+            if code not in current_app.tableros:
+                current_app.versiones_tablero.olvidar(code)
     
     @socketio.on('generateGameCode')
-    def handle_generate_game_code():
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        join_room(code)
-        print(code)
-        if code not in tableros:
-            tableros[code] = []
-        tableros[code].append(request.sid)
+    def handle_generate_game_code(data=None):
+        code = current_app.codigos.asignar()
+        registrar_tablero(code, (data or {}).get('formato', 'json'))
         emit('gameCodeGenerated', {'code': code}, room= code)
-        print(f'Código de juego generado: {code}')
+        log.info("Código de juego generado", extra={"code": code, "sid": request.sid})
     
     @socketio.on('joinGame')
     def handle_join_board(data):
         code = data.get('code')
         if code:
-            join_room(code)
-            if code not in tableros:
-                tableros[code] = []
-            tableros[code].append(request.sid)
-            emit('board_joined', {'code': code}, room=code)
-            print(f"Tablero {code} unido con SID: {request.sid}")
+            formato = data.get('formato', 'json')
+            registrar_tablero(code, formato)
+            emit('board_joined', {'code': code, 'formato': formato}, room=code)
+            log.info("Tablero unido", extra={"code": code, "sid": request.sid, "formato": formato})
         else:
             emit('error', {"message": "Código no proporcionado"})
 
+    # Canal del controlador: se une una vez a la partida con controlGame y
+    # después manda cada acción como controlCommand con ack, en lugar de una
+    # petición HTTP por clic. La sesión guarda el código ya validado y si la
+    # partida existe, así que los comandos no vuelven a leerla para validarlo.
+    @socketio.on('controlGame')
+    def handle_control_game(data):
+        from app.control import CAMPOS_EXISTENCIA, buscar_partida_por_codigo, validar_codigo
+
+        code = ((data or {}).get('code') or '').upper()
+        es_valido, mensaje = validar_codigo(code)
+        if not es_valido:
+            return respuesta_control({"success": False, "message": mensaje}, 400)
+        partida = buscar_partida_por_codigo(code, CAMPOS_EXISTENCIA)
+        if not partida and code not in current_app.tableros:
+            return respuesta_control({"success": False, "message": "El código de tablero no existe."}, 404)
+        session['partida'] = code
+        session['partida_verificada'] = bool(partida)
+        log.info("Controlador unido", extra={"code": code, "sid": request.sid})
+        return respuesta_control({"success": True, "code": code, "revision": (partida or {}).get("revision", 0)}, 200)
+
+    @socketio.on('controlCommand')
+    def handle_control_command(nombre, datos=None):
+        from app.control import COMANDOS_CONTROL, ejecutar_comando
+
+        code = session.get('partida')
+        if code is None:
+            return respuesta_control({"success": False, "message": "El controlador no se ha unido a una partida."}, 401)
+        # Los argumentos llegan tal cual del cliente: un nombre que no es texto
+        # no se puede buscar en el registro de comandos.
+        if not isinstance(nombre, str):
+            return respuesta_control({"success": False, "message": "Comando desconocido."}, 400)
+        inicio = time.perf_counter()
+        respuesta, estado = ejecutar_comando(nombre, datos or {}, code=code, verificada=session.get('partida_verificada', False))
+        # Cualquier comando exitoso implica que la partida existe; un 404 indica
+        # que se archivó o se borró y hay que volver a comprobarlo.
+        if estado < 400:
+            session['partida_verificada'] = True
+        elif estado == 404:
+            session['partida_verificada'] = False
+        # El nombre viene del cliente: solo los comandos registrados son etiqueta
+        # de métrica, para que no se pueda crear una serie nueva por cada nombre.
+        etiqueta = nombre if nombre in COMANDOS_CONTROL else "desconocido"
+        metricas = current_app.metricas
+        metricas.observar("comandos_socket_segundos", time.perf_counter() - inicio, comando=etiqueta, estado=estado)
+        metricas.observar("mongo_comandos_por_peticion", g.get("mongo_llamadas", 0), buckets=BUCKETS_LLAMADAS,
+                          endpoint=f"socket.{etiqueta}")
+        return respuesta_control(respuesta, estado)
@@ -1,22 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.control import buscar_partida_por_codigo, validar_codigo
-from app.sockets import tableros
+from app.control import RESPUESTA_RETIRADO, buscar_partida_por_codigo, crear_partida, validar_codigo
 from app.extensions import socketio
+from app.difusion import CAMPOS_TABLERO, construir_game_info
 
 tablero = Blueprint('tablero', __name__)
 @tablero.route('/gameStatus', methods=['POST'])
 def game_status():
     data = request.get_json()
     code = data.get('code', '').upper()
-    print(code)
 
     es_valido, mensaje = validar_codigo(code)
     if not es_valido:
         return jsonify({"success": False, "message": mensaje}), 400
     
-    partida = buscar_partida_por_codigo(code)
+    partida = buscar_partida_por_codigo(code, CAMPOS_TABLERO)
     if not partida:
-        if code in tableros:
+        if code in current_app.tableros:
             new_partida = {
                 "titulo": "Game",
                 "codigo": code,
@@ -31,29 +30,21 @@ def game_status():
                 "robo_puntos": False,
                 "regresive": None
             }
-            current_app.mongo_db.partida.insert_one(new_partida)
+            if not crear_partida(new_partida):
+                return jsonify({**RESPUESTA_RETIRADO, "estado": "disconnected"}), 404
             partida = new_partida
-            for sid in tableros[code]:
-                socketio.emit('gameConnected', {"code": code}, to=sid, room=code)
+            socketio.emit('gameConnected', {"code": code}, to=code)
         else:
             return jsonify({"success": False, "message": "El juego no existe.", "estado": "disconnected"}), 404
 
-    game_info = {
-        "codigo": partida.get("codigo", ""),
-        "estado": partida.get("estado", "unknown"),
-        "titulo": partida.get("titulo", ""),
-        "equipo1": partida.get("equipo1", {}),
-        "equipo2": partida.get("equipo2", {}),
-        "pregunta": partida.get("pregunta", ""),
-        "respuestas": partida.get("respuestas", []),
-        "regresive": partida.get("regresive", None),
-        "puntuacion_ronda": partida.get("puntuacion_ronda", 0),
-        "equipo_actual": partida.get("equipo_actual", 0), 
-        "strike": partida.get("strike", 0),
-        "robo_puntos": partida.get("robo_puntos", False)
-    }
-
-    return jsonify({"success": True, "gameInfo": game_info}), 200
-
-
+    temporizador = current_app.temporizadores.estado(code)
+    # La instantánea se pone al día con la partida antes de responder: una
+    # escritura que no pasó por update_board la dejaría en una revisión vieja.
+    version_actual, game_info = current_app.versiones_tablero.instantanea(code, construir_game_info(partida))
+    version = data.get('version')
+    if isinstance(version, int):
+        parches = current_app.versiones_tablero.parches_desde(code, version)
+        if parches is not None:
+            return jsonify({"success": True, "patches": parches, "temporizador": temporizador}), 200
 
+    return jsonify({"success": True, "gameInfo": game_info, "version": version_actual, "temporizador": temporizador}), 200
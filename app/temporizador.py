@@ -0,0 +1,159 @@
+# app/temporizador.py
+
+import heapq
+import logging
+import math
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Temporizadores:
+    """Cuentas regresivas de todas las partidas, llevadas por el servidor.
+
+    Una sola tarea de fondo revisa un montículo ordenado por el próximo
+    segundo de cada cuenta y emite un ``tick`` por partida cada vez que cambia
+    el número entero que muestran los tableros; no hay un hilo por
+    temporizador. Las entradas del montículo que quedaron viejas por una
+    pausa o una cancelación se descartan por su generación. La tarea termina
+    sola cuando no queda ninguna cuenta corriendo y ``detener`` la apaga.
+
+    Las cuentas viven en la memoria del proceso que las inició. Con varios
+    workers, los ticks llegan a todos los tableros por la cola de mensajes,
+    pero pausar, reanudar, cancelar y el ``temporizador`` de ``/gameStatus``
+    solo funcionan en ese worker. Las peticiones de una partida deben ir
+    siempre al mismo worker (sesiones persistentes por código en el
+    balanceador), y una cuenta en curso se pierde si ese worker se reinicia.
+    """
+
+    def __init__(self, iniciar_tarea, dormir, emitir, al_terminar=None, resolucion=0.05):
+        self.iniciar_tarea = iniciar_tarea
+        self.dormir = dormir
+        self.emitir = emitir
+        self.al_terminar = al_terminar
+        self.resolucion = resolucion
+        self._temporizadores = {}
+        self._monticulo = []
+        self._generacion = 0
+        self._en_marcha = False
+        self._detenido = False
+        self._tarea = None
+        self._lock = threading.Lock()
+
+    def iniciar(self, code, segundos):
+        with self._lock:
+            temporizador = self._programar(code, time.monotonic() + segundos)
+            datos = self._datos(code, temporizador, time.monotonic())
+            self._arrancar()
+        self.emitir(code, datos)
+        return datos
+
+    def pausar(self, code):
+        with self._lock:
+            temporizador = self._temporizadores.get(code)
+            if temporizador is None or temporizador["pausado"]:
+                return None
+            ahora = time.monotonic()
+            temporizador["restante"] = max(temporizador["fin"] - ahora, 0)
+            temporizador["pausado"] = True
+            temporizador["generacion"] = None
+            datos = self._datos(code, temporizador, ahora)
+        self.emitir(code, datos)
+        return datos
+
+    def reanudar(self, code):
+        with self._lock:
+            temporizador = self._temporizadores.get(code)
+            if temporizador is None or not temporizador["pausado"]:
+                return None
+            temporizador = self._programar(code, time.monotonic() + temporizador["restante"])
+            datos = self._datos(code, temporizador, time.monotonic())
+            self._arrancar()
+        self.emitir(code, datos)
+        return datos
+
+    def cancelar(self, code):
+        with self._lock:
+            return self._temporizadores.pop(code, None) is not None
+
+    def estado(self, code):
+        with self._lock:
+            temporizador = self._temporizadores.get(code)
+            if temporizador is None:
+                return None
+            return self._datos(code, temporizador, time.monotonic())
+
+    def detener(self, espera=None):
+        """Apaga la tarea de fondo y espera hasta ``espera`` segundos a que termine.
+
+        Después de detenerse ya no se emiten ticks aunque se inicien cuentas nuevas.
+        """
+        with self._lock:
+            self._detenido = True
+            tarea = self._tarea
+        if tarea is not None:
+            tarea.join(espera)
+
+    def __len__(self):
+        return len(self._temporizadores)
+
+    def revisar(self, ahora=None):
+        """Emite los ticks vencidos y termina las cuentas que llegaron a cero."""
+        ahora = time.monotonic() if ahora is None else ahora
+        ticks, terminados = [], []
+        with self._lock:
+            while self._monticulo and self._monticulo[0][0] <= ahora:
+                _, generacion, code = heapq.heappop(self._monticulo)
+                temporizador = self._temporizadores.get(code)
+                if temporizador is None or temporizador["generacion"] != generacion:
+                    continue
+                datos = self._datos(code, temporizador, ahora)
+                ticks.append(datos)
+                if datos["regresive"] == 0:
+                    del self._temporizadores[code]
+                    terminados.append(code)
+                else:
+                    siguiente = temporizador["fin"] - (datos["regresive"] - 1)
+                    heapq.heappush(self._monticulo, (siguiente, generacion, code))
+        for datos in ticks:
+            self.emitir(datos["code"], datos)
+        for code in terminados:
+            if self.al_terminar:
+                self.al_terminar(code)
+        return len(ticks)
+
+    def _programar(self, code, fin):
+        self._generacion += 1
+        temporizador = {"fin": fin, "restante": None, "pausado": False, "generacion": self._generacion}
+        self._temporizadores[code] = temporizador
+        restante = math.ceil(max(fin - time.monotonic(), 0))
+        heapq.heappush(self._monticulo, (fin - max(restante - 1, 0), self._generacion, code))
+        return temporizador
+
+    def _datos(self, code, temporizador, ahora):
+        restante = temporizador["restante"] if temporizador["pausado"] else max(temporizador["fin"] - ahora, 0)
+        return {
+            "code": code,
+            "regresive": math.ceil(restante),
+            "restanteMs": int(restante * 1000),
+            "pausado": temporizador["pausado"],
+        }
+
+    def _arrancar(self):
+        if not self._en_marcha and not self._detenido:
+            self._en_marcha = True
+            self._tarea = self.iniciar_tarea(self._bucle)
+
+    def _bucle(self):
+        while True:
+            self.dormir(self.resolucion)
+            try:
+                self.revisar()
+            except Exception:
+                log.exception("Error en las cuentas regresivas")
+            with self._lock:
+                # Las cuentas pausadas no están en el montículo: reanudar vuelve a arrancar la tarea.
+                if self._detenido or not self._monticulo:
+                    self._en_marcha = False
+                    return
@@ -0,0 +1,376 @@
+# app/torneos.py
+#
+# Torneos: agrupan códigos de partida y mantienen agregados precalculados
+# (clasificación de equipos y estadísticas de respuestas reveladas) que se
+# actualizan con cada /endRound. El historial de rondas es la fuente de
+# verdad: ``reconstruir`` recalcula los agregados recorriéndolo en streaming.
+
+import logging
+import threading
+import time
+import uuid
+from copy import deepcopy
+
+import click
+from flask import Blueprint, current_app, jsonify, request
+from pymongo import DESCENDING, UpdateOne
+
+from app.indice_preguntas import normalizar
+
+log = logging.getLogger(__name__)
+
+LIMITE_CLASIFICACION = 50
+
+
+def clave_texto(texto):
+    return normalizar(" ".join(str(texto or "").split()))
+
+
+def contribucion_ronda(ronda, marcador):
+    """Cambios que una ronda del historial aporta a los agregados de su torneo.
+
+    ``marcador`` son los puntajes de la partida tras su ronda anterior: los
+    equipos guardan puntajes acumulados, así que a la clasificación se suma
+    la diferencia. Devuelve ``(marcador, equipos, respuestas)``, donde
+    ``equipos`` va de la clave del equipo a sus incrementos y ``respuestas``
+    de ``(pregunta, respuesta)`` normalizadas a sus apariciones y reveladas.
+    """
+    nuevo = dict(marcador)
+    equipos = {}
+    for campo in ("equipo1", "equipo2"):
+        equipo = ronda.get(campo) or {}
+        clave = clave_texto(equipo.get("name"))
+        if not clave:
+            continue
+        puntaje = equipo.get("score") or 0
+        equipos[clave] = {
+            "nombre": " ".join(str(equipo.get("name")).split()),
+            "puntos": puntaje - marcador.get(clave, 0),
+            "rondas": 1,
+            "rondas_ganadas": 0,
+            "partidas": 0 if clave in marcador else 1,
+        }
+        nuevo[clave] = puntaje
+
+    ganadores = [clave for clave, cambios in equipos.items() if cambios["puntos"] > 0]
+    if ganadores:
+        ganador = max(ganadores, key=lambda clave: equipos[clave]["puntos"])
+        equipos[ganador]["rondas_ganadas"] = 1
+
+    respuestas = {}
+    pregunta = ronda.get("pregunta", "")
+    for respuesta in ronda.get("respuestas") or []:
+        texto = respuesta.get("respuesta", "")
+        clave = (clave_texto(pregunta), clave_texto(texto))
+        conteo = respuestas.setdefault(clave, {"pregunta": pregunta, "respuesta": texto, "apariciones": 0, "reveladas": 0})
+        conteo["apariciones"] += 1
+        conteo["reveladas"] += 1 if respuesta.get("revealed") else 0
+    return nuevo, equipos, respuestas
+
+
+def sumar_contribucion(equipos, respuestas, equipos_ronda, respuestas_ronda):
+    """Suma en memoria la contribución de una ronda a los totales de un torneo."""
+    for clave, cambios in equipos_ronda.items():
+        total = equipos.setdefault(clave, {"nombre": cambios["nombre"], "puntos": 0, "rondas": 0, "rondas_ganadas": 0, "partidas": 0})
+        total["nombre"] = cambios["nombre"]
+        for campo in ("puntos", "rondas", "rondas_ganadas", "partidas"):
+            total[campo] += cambios[campo]
+    for clave, cambios in respuestas_ronda.items():
+        total = respuestas.setdefault(clave, {"pregunta": cambios["pregunta"], "respuesta": cambios["respuesta"], "apariciones": 0, "reveladas": 0})
+        total["apariciones"] += cambios["apariciones"]
+        total["reveladas"] += cambios["reveladas"]
+
+
+def registrar_ronda(torneos, torneo, code, ronda):
+    marcador = torneos.marcador(torneo, code)
+    nuevo, equipos, respuestas = contribucion_ronda(ronda, marcador)
+    torneos.acumular(torneo, code, nuevo, equipos, respuestas)
+
+
+def reconstruir(torneos, historial, ids=None):
+    """Recalcula los agregados de los torneos ``ids`` (todos si es ``None``).
+
+    Hace una sola pasada en streaming por las rondas de sus partidas, en
+    orden de código y número; en memoria solo quedan los totales por equipo y
+    por respuesta de cada torneo. Devuelve cuántas rondas se procesaron.
+    """
+    torneo_de = {}
+    totales = {}
+    for torneo in torneos.listar():
+        if ids is None or torneo["id"] in ids:
+            totales[torneo["id"]] = ({}, {}, {})
+            for code in torneo["codigos"]:
+                torneo_de[code] = torneo["id"]
+
+    rondas = 0
+    for ronda in historial.iterar(list(torneo_de)):
+        code = ronda["codigo"]
+        marcadores, equipos, respuestas = totales[torneo_de[code]]
+        marcadores[code], equipos_ronda, respuestas_ronda = contribucion_ronda(ronda, marcadores.get(code, {}))
+        sumar_contribucion(equipos, respuestas, equipos_ronda, respuestas_ronda)
+        rondas += 1
+
+    for torneo, (marcadores, equipos, respuestas) in totales.items():
+        torneos.reemplazar_agregados(torneo, marcadores, equipos, respuestas)
+    return rondas
+
+
+def nuevo_torneo(nombre, codigos=()):
+    return {"id": uuid.uuid4().hex, "nombre": nombre, "codigos": list(dict.fromkeys(codigos)), "creado": time.time()}
+
+
+def ordenar_equipos(equipos, limite):
+    return sorted(equipos, key=lambda equipo: (-equipo["puntos"], -equipo["rondas_ganadas"], equipo["nombre"] or ""))[:limite]
+
+
+def ordenar_respuestas(respuestas, limite):
+    return sorted(respuestas, key=lambda respuesta: (-respuesta["reveladas"], -respuesta["apariciones"]))[:limite]
+
+
+class TorneosMongo:
+    """Torneos y sus agregados en colecciones propias; los totales se actualizan con ``$inc``."""
+
+    def __init__(self, db):
+        self.torneos = db.torneo
+        self.partidas = db.torneo_partida
+        self.equipos = db.torneo_equipo
+        self.respuestas = db.torneo_respuesta
+
+    def crear(self, nombre, codigos=()):
+        torneo = nuevo_torneo(nombre, codigos)
+        self.torneos.insert_one({"_id": torneo["id"], **torneo})
+        return torneo
+
+    def obtener(self, torneo):
+        return self.torneos.find_one({"_id": torneo}, {"_id": 0})
+
+    def listar(self):
+        return self.torneos.find({}, {"_id": 0})
+
+    def agregar_partida(self, torneo, code):
+        resultado = self.torneos.update_one({"_id": torneo}, {"$addToSet": {"codigos": code}})
+        return resultado.matched_count == 1
+
+    def marcador(self, torneo, code):
+        partida = self.partidas.find_one({"torneo": torneo, "codigo": code}, {"_id": 0, "marcador": 1})
+        return partida["marcador"] if partida else {}
+
+    def acumular(self, torneo, code, marcador, equipos, respuestas):
+        self.partidas.update_one({"torneo": torneo, "codigo": code}, {"$set": {"marcador": marcador}}, upsert=True)
+        if equipos:
+            self.equipos.bulk_write([
+                UpdateOne(
+                    {"torneo": torneo, "clave": clave},
+                    {"$set": {"nombre": cambios["nombre"]},
+                     "$inc": {campo: cambios[campo] for campo in ("puntos", "rondas", "rondas_ganadas", "partidas")}},
+                    upsert=True,
+                )
+                for clave, cambios in equipos.items()
+            ], ordered=False)
+        if respuestas:
+            self.respuestas.bulk_write([
+                UpdateOne(
+                    {"torneo": torneo, "clave_pregunta": clave[0], "clave_respuesta": clave[1]},
+                    {"$set": {"pregunta": cambios["pregunta"], "respuesta": cambios["respuesta"]},
+                     "$inc": {"apariciones": cambios["apariciones"], "reveladas": cambios["reveladas"]}},
+                    upsert=True,
+                )
+                for clave, cambios in respuestas.items()
+            ], ordered=False)
+
+    def reemplazar_agregados(self, torneo, marcadores, equipos, respuestas):
+        for coleccion in (self.partidas, self.equipos, self.respuestas):
+            coleccion.delete_many({"torneo": torneo})
+        if marcadores:
+            self.partidas.insert_many([{"torneo": torneo, "codigo": code, "marcador": marcador} for code, marcador in marcadores.items()])
+        if equipos:
+            self.equipos.insert_many([{"torneo": torneo, "clave": clave, **totales} for clave, totales in equipos.items()])
+        if respuestas:
+            self.respuestas.insert_many([
+                {"torneo": torneo, "clave_pregunta": clave[0], "clave_respuesta": clave[1], **totales}
+                for clave, totales in respuestas.items()
+            ])
+
+    def clasificacion(self, torneo, limite=LIMITE_CLASIFICACION):
+        return list(self.equipos.find({"torneo": torneo}, {"_id": 0, "torneo": 0, "clave": 0})
+                    .sort([("puntos", DESCENDING), ("rondas_ganadas", DESCENDING)]).limit(limite))
+
+    def estadisticas_respuestas(self, torneo, limite=LIMITE_CLASIFICACION):
+        return list(self.respuestas.find({"torneo": torneo}, {"_id": 0, "torneo": 0, "clave_pregunta": 0, "clave_respuesta": 0})
+                    .sort([("reveladas", DESCENDING), ("apariciones", DESCENDING)]).limit(limite))
+
+
+class TorneosMemoria:
+    def __init__(self):
+        self._torneos = {}
+        self._agregados = {}
+        self._lock = threading.Lock()
+
+    def crear(self, nombre, codigos=()):
+        torneo = nuevo_torneo(nombre, codigos)
+        with self._lock:
+            self._torneos[torneo["id"]] = torneo
+            self._agregados[torneo["id"]] = ({}, {}, {})
+        return deepcopy(torneo)
+
+    def obtener(self, torneo):
+        with self._lock:
+            return deepcopy(self._torneos.get(torneo))
+
+    def listar(self):
+        with self._lock:
+            return deepcopy(list(self._torneos.values()))
+
+    def agregar_partida(self, torneo, code):
+        with self._lock:
+            if torneo not in self._torneos:
+                return False
+            if code not in self._torneos[torneo]["codigos"]:
+                self._torneos[torneo]["codigos"].append(code)
+            return True
+
+    def marcador(self, torneo, code):
+        with self._lock:
+            return dict(self._agregados.get(torneo, ({}, {}, {}))[0].get(code, {}))
+
+    def acumular(self, torneo, code, marcador, equipos, respuestas):
+        with self._lock:
+            marcadores, totales_equipos, totales_respuestas = self._agregados.setdefault(torneo, ({}, {}, {}))
+            marcadores[code] = dict(marcador)
+            sumar_contribucion(totales_equipos, totales_respuestas, equipos, respuestas)
+
+    def reemplazar_agregados(self, torneo, marcadores, equipos, respuestas):
+        with self._lock:
+            self._agregados[torneo] = (deepcopy(marcadores), deepcopy(equipos), deepcopy(respuestas))
+
+    def clasificacion(self, torneo, limite=LIMITE_CLASIFICACION):
+        with self._lock:
+            equipos = deepcopy(list(self._agregados.get(torneo, ({}, {}, {}))[1].values()))
+        return ordenar_equipos(equipos, limite)
+
+    def estadisticas_respuestas(self, torneo, limite=LIMITE_CLASIFICACION):
+        with self._lock:
+            respuestas = deepcopy(list(self._agregados.get(torneo, ({}, {}, {}))[2].values()))
+        return ordenar_respuestas(respuestas, limite)
+
+
+def registrar_fin_de_ronda(partida, ronda):
+    """Actualiza el torneo de la partida, si tiene; un fallo no impide terminar la ronda."""
+    torneo = partida.get("torneo")
+    if not torneo:
+        return
+    try:
+        registrar_ronda(current_app.torneos, torneo, partida["codigo"], ronda)
+    except Exception:
+        log.exception("Error al actualizar el torneo", extra={"code": partida["codigo"], "torneo": torneo})
+
+
+torneos = Blueprint('torneos', __name__, cli_group='torneos')
+
+@torneos.route('/tournaments', methods=['POST'])
+def crear_torneo():
+    data = request.get_json() or {}
+    nombre = (data.get('nombre') or '').strip()
+    if not nombre:
+        return jsonify({"success": False, "message": "El torneo necesita un nombre."}), 400
+    codigos = data.get('codigos', [])
+    if not isinstance(codigos, list):
+        return jsonify({"success": False, "message": "'codigos' debe ser una lista."}), 400
+    # Se revisan todas las partidas antes de crear el torneo para no dejar
+    # uno a medias si alguna no se puede agregar.
+    codigos = [(code or '').upper() if isinstance(code, str) else '' for code in codigos]
+    for code in codigos:
+        _, error = revisar_partida(code)
+        if error:
+            return jsonify(error[0]), error[1]
+    torneo = current_app.torneos.crear(nombre)
+    for code in codigos:
+        respuesta, estado = agregar_partida(torneo["id"], code)
+        if estado != 200:
+            return jsonify(respuesta), estado
+    return jsonify({"success": True, "torneo": current_app.torneos.obtener(torneo["id"])}), 201
+
+@torneos.route('/tournaments/<torneo>', methods=['GET'])
+def obtener_torneo(torneo):
+    datos = current_app.torneos.obtener(torneo)
+    if datos is None:
+        return jsonify({"success": False, "message": "El torneo no existe."}), 404
+    return jsonify({"success": True, "torneo": datos}), 200
+
+@torneos.route('/tournaments/<torneo>/games', methods=['POST'])
+def agregar_partida_torneo(torneo):
+    data = request.get_json() or {}
+    respuesta, estado = agregar_partida(torneo, data.get('code', ''))
+    return jsonify(respuesta), estado
+
+@torneos.route('/tournaments/<torneo>/leaderboard', methods=['GET'])
+def clasificacion_torneo(torneo):
+    if current_app.torneos.obtener(torneo) is None:
+        return jsonify({"success": False, "message": "El torneo no existe."}), 404
+    limite = leer_limite()
+    if limite is None:
+        return jsonify({"success": False, "message": "'limite' debe ser un entero positivo."}), 400
+    return jsonify({"success": True, "equipos": current_app.torneos.clasificacion(torneo, limite)}), 200
+
+@torneos.route('/tournaments/<torneo>/answers', methods=['GET'])
+def respuestas_torneo(torneo):
+    if current_app.torneos.obtener(torneo) is None:
+        return jsonify({"success": False, "message": "El torneo no existe."}), 404
+    limite = leer_limite()
+    if limite is None:
+        return jsonify({"success": False, "message": "'limite' debe ser un entero positivo."}), 400
+    return jsonify({"success": True, "respuestas": current_app.torneos.estadisticas_respuestas(torneo, limite)}), 200
+
+def leer_limite():
+    """``limite`` de la petición acotado a ``LIMITE_CLASIFICACION * 10``; ``None`` si no es válido."""
+    if 'limite' not in request.args:
+        return LIMITE_CLASIFICACION
+    limite = request.args.get('limite', type=int)
+    if limite is None or limite < 1:
+        return None
+    return min(limite, LIMITE_CLASIFICACION * 10)
+
+def revisar_partida(code, torneo=None):
+    """Devuelve ``(partida, None)`` si la partida puede sumarse al torneo, o ``(None, (respuesta, estado))``."""
+    from app.control import buscar_partida_por_codigo, validar_codigo
+
+    es_valido, mensaje = validar_codigo(code)
+    if not es_valido:
+        return None, ({"success": False, "message": mensaje}, 400)
+    partida = buscar_partida_por_codigo(code, ('torneo',))
+    if not partida:
+        return None, ({"success": False, "message": "El juego no existe."}, 404)
+    if partida.get('torneo') and partida['torneo'] != torneo:
+        return None, ({"success": False, "message": "El juego ya pertenece a otro torneo."}, 409)
+    return partida, None
+
+def agregar_partida(torneo, code):
+    """Suma la partida al torneo junto con las rondas que ya jugó."""
+    from app.control import PartidaInexistente, actualizar_partida, update_board
+
+    code = (code or '').upper()
+    partida, error = revisar_partida(code, torneo)
+    if error:
+        return error
+    if not current_app.torneos.agregar_partida(torneo, code):
+        return {"success": False, "message": "El torneo no existe."}, 404
+    if partida.get('torneo') != torneo:
+        # Una ronda que termine entre estos dos pasos se contaría dos veces;
+        # ``flask torneos reconstruir`` corrige cualquier desvío.
+        try:
+            actualizar_partida(code, {"$set": {"torneo": torneo}})
+        except PartidaInexistente:
+            return {"success": False, "message": "El juego no existe."}, 404
+        # La escritura sube la revisión; tableros y controladores deben verla.
+        update_board(code)
+        for ronda in current_app.historial.iterar([code]):
+            registrar_ronda(current_app.torneos, torneo, code, ronda)
+    return {"success": True, "message": "Juego agregado al torneo."}, 200
+
+@torneos.cli.command('reconstruir')
+@click.option('--torneo', 'ids', multiple=True, help='Solo este torneo (se puede repetir).')
+def reconstruir_agregados(ids):
+    """Recalcula los agregados de los torneos desde el historial de rondas."""
+    inicio = time.perf_counter()
+    rondas = reconstruir(current_app.torneos, current_app.historial, set(ids) or None)
+    click.echo(f"{rondas} rondas procesadas en {time.perf_counter() - inicio:.2f} s.")
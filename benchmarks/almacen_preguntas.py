@@ -0,0 +1,63 @@
+# benchmarks/almacen_preguntas.py
+#
+# Compara guardar/cargar el banco con el enfoque anterior (json.dump con
+# indent=4 de todo el banco en cada guardado) contra el log JSONL.
+# Uso: python -m benchmarks.almacen_preguntas [tamaño ...]
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from app.almacen_preguntas import AlmacenPreguntasJSONL, Pregunta
+
+
+def generar_preguntas(cantidad, desde=0):
+    return [
+        Pregunta(
+            f"tema {i % 50}",
+            f"¿Pregunta de prueba número {i} sobre algo común?",
+            [(f"respuesta {i}-{j}", 20) for j in range(5)],
+        )
+        for i in range(desde, desde + cantidad)
+    ]
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main(tamanos):
+    directorio = tempfile.mkdtemp()
+    for tamano in tamanos:
+        banco = generar_preguntas(tamano)
+        nueva = generar_preguntas(1, desde=tamano)
+
+        ruta_json = os.path.join(directorio, f"legado-{tamano}.json")
+
+        def guardar_legado():
+            with open(ruta_json, "w", encoding="utf-8") as archivo:
+                json.dump([pregunta.a_dict() for pregunta in banco + nueva], archivo, ensure_ascii=False, indent=4)
+
+        def cargar_legado():
+            with open(ruta_json, "r", encoding="utf-8") as archivo:
+                json.load(archivo)
+
+        almacen = AlmacenPreguntasJSONL(os.path.join(directorio, f"banco-{tamano}.jsonl"))
+        almacen.compactar(banco)
+
+        resultados = {
+            "legado guardar 1": cronometrar(guardar_legado),
+            "legado cargar": cronometrar(cargar_legado),
+            "jsonl agregar 1": cronometrar(lambda: almacen.agregar(nueva)),
+            "jsonl compactar": cronometrar(lambda: almacen.compactar(banco + nueva)),
+            "jsonl cargar": cronometrar(almacen.cargar),
+        }
+        print(f"{tamano:>7} preguntas | " + " | ".join(f"{nombre} {ms:8.1f} ms" for nombre, ms in resultados.items()))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,81 @@
+# benchmarks/arranque.py
+#
+# Mide el arranque de la app y la memoria del banco de preguntas: el enfoque
+# anterior (json.load de todo el banco como dicts) contra los registros
+# compactos de Pregunta cargados en diferido.
+# Uso: python -m benchmarks.arranque [tamaño]  (RSS desde /proc, solo Linux)
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.almacen_preguntas import AlmacenPreguntasJSONL
+from benchmarks.almacen_preguntas import generar_preguntas
+
+ARRANQUE = """
+import sys, time
+inicio = time.perf_counter()
+from app import create_app
+app = create_app()
+arranque = time.perf_counter() - inicio
+if sys.argv[1] == "cargar":
+    app.banco_preguntas.indice
+total = time.perf_counter() - inicio
+with open("/proc/self/status") as estado:
+    rss = next(int(linea.split()[1]) for linea in estado if linea.startswith("VmHWM")) / 1024
+print(f"{arranque * 1000:.0f} {total * 1000:.0f} {rss:.0f}")
+"""
+
+
+def medir(funcion):
+    gc.collect()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    del resultado
+    gc.collect()
+    tracemalloc.start()
+    resultado = funcion()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, duracion * 1000, memoria / 2**20
+
+
+def main(tamano=100_000):
+    directorio = tempfile.mkdtemp()
+    banco = generar_preguntas(tamano)
+    ruta_jsonl = os.path.join(directorio, "preguntas.jsonl")
+    ruta_json = os.path.join(directorio, "preguntas.json")
+    AlmacenPreguntasJSONL(ruta_jsonl).compactar(banco)
+    with open(ruta_json, "w", encoding="utf-8") as archivo:
+        json.dump([pregunta.a_dict() for pregunta in banco], archivo, ensure_ascii=False, indent=4)
+    del banco
+
+    def cargar_legado():
+        with open(ruta_json, "r", encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+    for nombre, funcion in (
+        ("dicts (json.load)", cargar_legado),
+        ("registros Pregunta", AlmacenPreguntasJSONL(ruta_jsonl).cargar),
+    ):
+        resultado, ms, mib = medir(funcion)
+        print(f"{nombre:>20}: {len(resultado)} preguntas en {ms:7.0f} ms, {mib:6.1f} MiB")
+        del resultado
+
+    entorno = dict(os.environ, PREGUNTAS_PATH=ruta_jsonl)
+    for modo in ("diferido", "cargar"):
+        salida = subprocess.run(
+            [sys.executable, "-c", ARRANQUE, modo], env=entorno, capture_output=True, text=True, check=True
+        ).stdout.split()
+        arranque, total, rss = salida[-3:]
+        print(f"create_app ({modo:>8}): arranque {arranque} ms, hasta banco listo {total} ms, RSS máx {rss} MiB")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
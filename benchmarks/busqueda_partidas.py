@@ -0,0 +1,91 @@
+# benchmarks/busqueda_partidas.py
+#
+# Latencia de buscar una partida por código según crece la colección, sin y
+# con los índices de arranque, y con las distintas proyecciones. Los
+# documentos llevan el historial de rondas que guardaban las versiones
+# anteriores, para ver lo que ahorra leer solo el estado vivo.
+# Uso: python -m benchmarks.busqueda_partidas [--mongo URI] [--busquedas N] [tamaño ...]
+#
+# Sin --mongo usa mongomock, que no usa índices: ahí solo se ve el efecto de
+# las proyecciones. Con un mongod local se ve también el del índice.
+
+import argparse
+import random
+import statistics
+import string
+import time
+
+from app.control import CAMPOS_EXISTENCIA
+from app.difusion import CAMPOS_TABLERO
+from app.estado import PROYECCION_VIVA, asegurar_indices
+
+
+def codigo(azar):
+    return "".join(azar.choices(string.ascii_uppercase + string.digits, k=6))
+
+
+def partida(code, rondas):
+    equipo = {"name": "Equipo", "color": "#ff0000", "score": 0, "avatar": "🐯"}
+    respuestas = [{"respuesta": f"respuesta {i}", "pts": 20, "revealed": False} for i in range(5)]
+    ronda = {"equipo1": equipo, "equipo2": equipo, "pregunta": "¿Pregunta?", "respuestas": respuestas}
+    return {
+        "codigo": code, "estado": "game-selection", "titulo": "Partida", "revision": 0,
+        "equipo1": equipo, "equipo2": equipo, "pregunta": "¿Pregunta?", "respuestas": respuestas,
+        "puntuacion_ronda": 0, "equipo_actual": 0, "strike": 0, "robo_puntos": False,
+        "rondas": [ronda] * rondas, "usadas": ["¿Pregunta?"] * rondas,
+    }
+
+
+def medir(coleccion, codigos, proyeccion):
+    tiempos = []
+    for code in codigos:
+        inicio = time.perf_counter()
+        coleccion.find_one({"codigo": code}, proyeccion)
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", help="URI de un mongod local; por defecto mongomock")
+    parser.add_argument("--busquedas", type=int, default=200)
+    parser.add_argument("--rondas", type=int, default=30, help="Rondas de historial heredado por partida")
+    parser.add_argument("tamanos", nargs="*", type=int, default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    if args.mongo:
+        from pymongo import MongoClient
+        cliente = MongoClient(args.mongo)
+    else:
+        import mongomock
+        cliente = mongomock.MongoClient()
+
+    azar = random.Random(3)
+    proyecciones = {
+        "completo": {"_id": 0},
+        "vivo": PROYECCION_VIVA,
+        "tablero": {"_id": 0, "codigo": 1, **dict.fromkeys(CAMPOS_TABLERO, 1)},
+        "existencia": {"_id": 0, "codigo": 1, **dict.fromkeys(CAMPOS_EXISTENCIA, 1)},
+    }
+    for tamano in args.tamanos:
+        cliente.drop_database("benchmark_busqueda")
+        db = cliente["benchmark_busqueda"]
+        codigos = list({codigo(azar) for _ in range(tamano)})
+        for inicio in range(0, len(codigos), 1000):
+            db.partida.insert_many([partida(code, args.rondas) for code in codigos[inicio:inicio + 1000]])
+        muestra = azar.sample(codigos, min(args.busquedas, len(codigos)))
+
+        resultados = {"sin índice": medir(db.partida, muestra, proyecciones["completo"])}
+        asegurar_indices(db, ttl_archivo=86400)
+        for nombre, proyeccion in proyecciones.items():
+            resultados[f"índice+{nombre}"] = medir(db.partida, muestra, proyeccion)
+
+        print(f"{len(codigos):>7} partidas | " + " | ".join(
+            f"{nombre} p50 {p50:8.0f} µs p99 {p99:8.0f} µs" for nombre, (p50, p99) in resultados.items()
+        ))
+    cliente.drop_database("benchmark_busqueda")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# benchmarks/carga_tableros.py
+#
+# Prueba de carga: conecta muchos tableros por Socket.IO y mide la latencia
+# de /updateGameBoard mientras están conectados. Levanta run.py en un
+# subproceso con el modo asíncrono indicado.
+#
+# Uso: python -m benchmarks.carga_tableros --modo eventlet --tableros 1000
+# Requiere python-socketio[asyncio_client] (aiohttp).
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+import socketio
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+async def esperar_servidor(url, limite=20):
+    fin = time.monotonic() + limite
+    async with aiohttp.ClientSession() as sesion:
+        while time.monotonic() < fin:
+            try:
+                async with sesion.get(f"{url}/categories"):
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("El servidor no respondió")
+
+
+async def conectar_tablero(url, recibidos, code=None):
+    cliente = socketio.AsyncClient(reconnection=False)
+    codigo = asyncio.get_running_loop().create_future()
+
+    @cliente.on("*")
+    async def recibir(evento, datos):
+        recibidos[evento] = recibidos.get(evento, 0) + 1
+        if evento == "gameCodeGenerated" and not codigo.done():
+            codigo.set_result(datos["code"])
+
+    await cliente.connect(url, transports=["websocket"])
+    if code is None:
+        await cliente.emit("generateGameCode")
+        code = await asyncio.wait_for(codigo, 10)
+    else:
+        await cliente.emit("joinGame", {"code": code})
+    return cliente, code
+
+
+async def preparar_juego(sesion, url, code):
+    pasos = [
+        ("/connectGameCode", {}),
+        ("/gameStatus", {}),
+        ("/gameSetup", {"titulo": "Carga", "e1": {"name": "A", "score": 0}, "e2": {"name": "B", "score": 0}}),
+        ("/gameAddQuestion", {"pregunta": {"pregunta": "¿Carga?", "respuestas": [
+            {"respuesta": f"r{i}", "pts": 20} for i in range(5)
+        ]}}),
+        ("/gameInitControl", {"team": 0}),
+    ]
+    for ruta, datos in pasos:
+        async with sesion.post(f"{url}{ruta}", json={"code": code, **datos}) as respuesta:
+            respuesta.raise_for_status()
+
+
+async def controlador(sesion, url, codigos, peticiones, latencias):
+    for _ in range(peticiones):
+        code = random.choice(codigos)
+        cuerpo = {
+            "code": code,
+            "equipo1": {"name": "A", "score": random.randint(0, 300)},
+            "equipo2": {"name": "B", "score": random.randint(0, 300)},
+            "pregunta": "¿Carga?",
+            "respuestas": [
+                {"respuesta": f"r{i}", "pts": 20, "revealed": random.random() < 0.5}
+                for i in range(5)
+            ],
+            "puntuacion_ronda": random.randint(0, 100),
+            "equipo_actual": random.randint(0, 1),
+            "strike": random.randint(0, 3),
+            "robo_puntos": False,
+        }
+        inicio = time.perf_counter()
+        async with sesion.post(f"{url}/updateGameBoard", json=cuerpo) as respuesta:
+            await respuesta.read()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+async def ejecutar(args):
+    url = f"http://127.0.0.1:{args.puerto}"
+    await esperar_servidor(url)
+    recibidos = {}
+    limite = asyncio.Semaphore(50)
+
+    async def con_limite(corrutina):
+        async with limite:
+            return await corrutina
+
+    juegos = max(1, args.tableros // args.por_juego)
+    inicio = time.perf_counter()
+    principales = await asyncio.gather(*(con_limite(conectar_tablero(url, recibidos)) for _ in range(juegos)))
+    codigos = [code for _, code in principales]
+    secundarios = await asyncio.gather(*(
+        con_limite(conectar_tablero(url, recibidos, code))
+        for code in codigos
+        for _ in range(args.por_juego - 1)
+    ))
+    clientes = [cliente for cliente, _ in principales + secundarios]
+    print(f"{len(clientes)} tableros conectados en {juegos} juegos ({time.perf_counter() - inicio:.1f} s)")
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.controladores)) as sesion:
+        await asyncio.gather(*(con_limite(preparar_juego(sesion, url, code)) for code in codigos))
+        latencias = []
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            controlador(sesion, url, codigos, args.peticiones // args.controladores, latencias)
+            for _ in range(args.controladores)
+        ))
+        duracion = time.perf_counter() - inicio
+
+    await asyncio.sleep(1)
+    print(
+        f"/updateGameBoard [{args.modo}]: {len(latencias)} peticiones, {len(latencias) / duracion:.0f} req/s, "
+        f"p50 {percentil(latencias, 50):.1f} ms, p99 {percentil(latencias, 99):.1f} ms, "
+        f"media {statistics.mean(latencias):.1f} ms"
+    )
+    print(f"Eventos recibidos por los tableros: {recibidos}")
+    await asyncio.gather(*(cliente.disconnect() for cliente in clientes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modo", default="threading", choices=["threading", "eventlet", "gevent"])
+    parser.add_argument("--tableros", type=int, default=1000)
+    parser.add_argument("--por-juego", type=int, default=10)
+    parser.add_argument("--controladores", type=int, default=20)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--puerto", type=int, default=5200)
+    args = parser.parse_args()
+
+    entorno = dict(os.environ, SOCKETIO_ASYNC_MODE=args.modo, PORT=str(args.puerto))
+    servidor = subprocess.Popen([sys.executable, "run.py"], env=entorno,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(ejecutar(args))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
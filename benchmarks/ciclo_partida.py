@@ -0,0 +1,284 @@
+# benchmarks/ciclo_partida.py
+#
+# Recorre el ciclo completo de varias partidas contra la app real de
+# create_app: generateGameCode y joinGame de M tableros, /connectGameCode,
+# /gameSetup y, por cada ronda, /gameAddQuestion, N controladores enviando
+# /updateGameBoard (o /roundCommand con --comandos) y /endRound. Informa
+# rendimiento, latencias por ruta, operaciones de Mongo por acción y bytes
+# emitidos por evento. Con --socket los controladores mandan las mismas
+# acciones como controlCommand por Socket.IO en lugar de peticiones HTTP.
+#
+# Con --guardar escribe los resultados en JSON y con --comparar marca las
+# rutas cuyo p99 o cuyas operaciones de Mongo por acción empeoraron más que
+# --tolerancia respecto a un resultado guardado; termina con código 1 si hay
+# regresiones.
+#
+# Uso: python -m benchmarks.ciclo_partida [--almacen memoria|mongomock|mongo] [--mongo URI]
+#        [--partidas G] [--controladores N] [--tableros M] [--rondas R] [--acciones K]
+#        [--comandos] [--socket] [--guardar archivo] [--comparar archivo] [--tolerancia 0.2]
+#
+# mongomock no emite eventos de monitoreo, así que con ese almacén se
+# cronometran sus métodos y se pasan al mismo EscuchaMongo que usa la app.
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+METODOS_MONGO = (
+    "find", "find_one", "find_one_and_update", "insert_one", "insert_many",
+    "update_one", "update_many", "replace_one", "delete_one", "delete_many", "count_documents",
+)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def crear_app(args):
+    os.environ["SOCKETIO_ASYNC_MODE"] = "threading"
+    os.environ.setdefault("LOG_NIVEL", "WARNING")
+    os.environ.setdefault("PARTIDAS_ARCHIVAR_TRAS", "0")
+    if args.almacen != "memoria":
+        os.environ["MONGO_URI"] = args.mongo or "mongodb://localhost:27017"
+        os.environ.setdefault("MONGO_DB", "benchmark_ciclo")
+
+    import app.extensions as extensiones
+    if args.almacen == "mongomock":
+        import mongomock
+        extensiones.MongoClient = lambda uri, **opciones: mongomock.MongoClient(uri)
+
+    from app import create_app
+    from app.metricas import EscuchaMongo
+
+    app = create_app()
+    if args.almacen == "mongomock":
+        cronometrar_mongomock(EscuchaMongo(app.metricas))
+    elif args.almacen == "mongo":
+        app.mongo_db.client.drop_database(app.mongo_db.name)
+    return app, extensiones.socketio
+
+
+def cronometrar_mongomock(escucha):
+    from mongomock.collection import Collection
+
+    # mongomock implementa unos métodos con otros; solo cuenta la llamada de la app.
+    anidado = threading.local()
+
+    def envolver(nombre, metodo):
+        def cronometrado(*args, **kwargs):
+            if getattr(anidado, "activo", False):
+                return metodo(*args, **kwargs)
+            anidado.activo = True
+            inicio = time.perf_counter()
+            try:
+                return metodo(*args, **kwargs)
+            finally:
+                anidado.activo = False
+                micros = int((time.perf_counter() - inicio) * 1e6)
+                escucha.succeeded(SimpleNamespace(command_name=nombre, duration_micros=micros))
+        return cronometrado
+
+    for nombre in METODOS_MONGO:
+        setattr(Collection, nombre, envolver(nombre, getattr(Collection, nombre)))
+
+
+class Cliente:
+    """Controlador HTTP que cronometra cada petición por ruta."""
+
+    def __init__(self, app, latencias, lock):
+        self.http = app.test_client()
+        self.latencias = latencias
+        self.lock = lock
+        self.estados = {}
+
+    def post(self, ruta, **datos):
+        inicio = time.perf_counter()
+        respuesta = self.http.post(ruta, json=datos)
+        segundos = time.perf_counter() - inicio
+        with self.lock:
+            self.latencias.setdefault(ruta, []).append(segundos)
+            clave = f"{ruta} {respuesta.status_code}"
+            self.estados[clave] = self.estados.get(clave, 0) + 1
+        return respuesta
+
+
+class ClienteSocket(Cliente):
+    """Controlador por Socket.IO: se une una vez a la partida y manda cada acción con ack."""
+
+    def __init__(self, app, servidor, code, latencias, lock):
+        self.socket = servidor.test_client(app)
+        self.socket.emit("controlGame", {"code": code}, callback=True)
+        self.latencias = latencias
+        self.lock = lock
+        self.estados = {}
+
+    def post(self, ruta, **datos):
+        inicio = time.perf_counter()
+        respuesta = self.socket.emit("controlCommand", ruta.lstrip("/"), datos, callback=True)
+        segundos = time.perf_counter() - inicio
+        with self.lock:
+            self.latencias.setdefault(ruta, []).append(segundos)
+            clave = f"{ruta} {respuesta['status']}"
+            self.estados[clave] = self.estados.get(clave, 0) + 1
+        return respuesta
+
+
+def respuestas_ronda(numero):
+    return [{"respuesta": f"respuesta {numero}-{i}", "pts": 40 - i * 10} for i in range(4)]
+
+
+def jugar_partida(app, servidor, args, latencias, lock, estados):
+    tableros = [servidor.test_client(app) for _ in range(args.tableros)]
+    tableros[0].emit("generateGameCode")
+    code = next(m for m in tableros[0].get_received() if m["name"] == "gameCodeGenerated")["args"][0]["code"]
+    for tablero in tableros[1:]:
+        tablero.emit("joinGame", {"code": code})
+
+    if args.socket:
+        controladores = [ClienteSocket(app, servidor, code, latencias, lock) for _ in range(args.controladores)]
+    else:
+        controladores = [Cliente(app, latencias, lock) for _ in range(args.controladores)]
+    principal = controladores[0]
+    principal.post("/connectGameCode", code=code)
+    principal.post("/gameSetup", code=code, titulo="Benchmark",
+                   e1={"name": "A", "score": 0}, e2={"name": "B", "score": 0})
+
+    for numero in range(args.rondas):
+        respuestas = respuestas_ronda(numero)
+        principal.post("/gameAddQuestion", code=code,
+                       pregunta={"pregunta": f"¿Pregunta {numero}?", "respuestas": respuestas})
+        principal.post("/gameInitControl", code=code, team=numero % 2)
+
+        def controlar(indice, cliente):
+            for accion in range(args.acciones):
+                posicion = (indice + accion) % len(respuestas)
+                if args.comandos:
+                    cliente.post("/roundCommand", code=code, comando="revelar", indice=posicion)
+                    continue
+                reveladas = [dict(r, revealed=i <= posicion) for i, r in enumerate(respuestas)]
+                puntos = sum(r["pts"] for r in reveladas if r["revealed"])
+                cliente.post("/updateGameBoard", code=code, pregunta=f"¿Pregunta {numero}?",
+                             equipo1={"name": "A", "score": puntos}, equipo2={"name": "B", "score": 0},
+                             respuestas=reveladas, puntuacion_ronda=puntos, equipo_actual=numero % 2,
+                             strike=accion % 3, robo_puntos=False)
+
+        hilos = [threading.Thread(target=controlar, args=(i, c)) for i, c in enumerate(controladores)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        principal.post("/endRound", code=code)
+
+    recibidos = sum(len(tablero.get_received()) for tablero in tableros)
+    for tablero in tableros + [c.socket for c in controladores if args.socket]:
+        tablero.disconnect()
+    with lock:
+        for cliente in controladores:
+            for clave, cantidad in cliente.estados.items():
+                estados[clave] = estados.get(clave, 0) + cantidad
+        estados["mensajes recibidos por tableros"] = estados.get("mensajes recibidos por tableros", 0) + recibidos
+
+
+def por_endpoint(serie):
+    return {dict(clave).get("endpoint") or dict(clave).get("evento"): valor for clave, valor in serie.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--almacen", choices=("memoria", "mongomock", "mongo"), default="mongomock")
+    parser.add_argument("--mongo", help="URI de un mongod local para --almacen mongo")
+    parser.add_argument("--partidas", type=int, default=8)
+    parser.add_argument("--controladores", type=int, default=2)
+    parser.add_argument("--tableros", type=int, default=3)
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--acciones", type=int, default=20, help="Acciones por controlador y ronda")
+    parser.add_argument("--comandos", action="store_true", help="Usa /roundCommand en lugar de /updateGameBoard")
+    parser.add_argument("--socket", action="store_true", help="Manda las acciones por controlCommand en lugar de HTTP")
+    parser.add_argument("--guardar")
+    parser.add_argument("--comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    app, servidor = crear_app(args)
+    latencias, estados = {}, {}
+    lock = threading.Lock()
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=jugar_partida, args=(app, servidor, args, latencias, lock, estados))
+             for _ in range(args.partidas)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    total = sum(len(valores) for valores in latencias.values())
+    mongo = por_endpoint(app.metricas.histograma("mongo_comandos_por_peticion"))
+    bytes_emitidos = por_endpoint(app.metricas.contador("socketio_emision_bytes_total"))
+    emisiones = por_endpoint(app.metricas.contador("socketio_emisiones_total"))
+    if args.socket:
+        endpoints = {ruta: f"socket.{ruta.lstrip('/')}" for ruta in latencias}
+    else:
+        endpoints = {regla.rule: regla.endpoint for regla in app.url_map.iter_rules()}
+
+    resultado = {"rutas": {}, "eventos": {}, "acciones_por_segundo": total / segundos}
+    print(f"{args.partidas} partidas x {args.rondas} rondas, {args.controladores} controladores y "
+          f"{args.tableros} tableros por partida, almacén {args.almacen}"
+          f"{', controladores por Socket.IO' if args.socket else ''}")
+    print(f"{total} peticiones en {segundos:.2f} s ({total / segundos:.0f} peticiones/s)")
+    print(f"{'ruta':<18}{'n':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mongo/acción':>14}")
+    for ruta, valores in sorted(latencias.items()):
+        cantidad, suma = mongo.get(endpoints.get(ruta), (0, 0))
+        fila = {
+            "n": len(valores),
+            "p50": statistics.median(valores) * 1000,
+            "p95": percentil(valores, 95) * 1000,
+            "p99": percentil(valores, 99) * 1000,
+            "mongo": suma / cantidad if cantidad else 0,
+        }
+        resultado["rutas"][ruta] = fila
+        print(f"{ruta:<18}{fila['n']:>7}{fila['p50']:>9.2f}{fila['p95']:>9.2f}{fila['p99']:>9.2f}{fila['mongo']:>14.2f}")
+    print(f"{'evento':<18}{'emisiones':>10}{'bytes':>12}{'bytes/emisión':>15}")
+    for evento, cantidad in sorted(emisiones.items()):
+        resultado["eventos"][evento] = {"emisiones": cantidad, "bytes": bytes_emitidos.get(evento, 0)}
+        print(f"{evento:<18}{cantidad:>10}{bytes_emitidos.get(evento, 0):>12}"
+              f"{bytes_emitidos.get(evento, 0) / cantidad:>15.0f}")
+    print(f"respuestas {estados}")
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = []
+        for ruta, fila in resultado["rutas"].items():
+            anterior = base["rutas"].get(ruta)
+            if anterior is None:
+                continue
+            # Con pocas muestras el p99 es una sola petición y solo mide ruido.
+            medidas = ("p99", "mongo") if fila["n"] >= 20 and anterior["n"] >= 20 else ("mongo",)
+            for medida in medidas:
+                if fila[medida] > anterior[medida] * (1 + args.tolerancia) and fila[medida] - anterior[medida] > 0.05:
+                    regresiones.append(f"{ruta} {medida}: {anterior[medida]:.2f} -> {fila[medida]:.2f}")
+        for evento, fila in resultado["eventos"].items():
+            anterior = base["eventos"].get(evento)
+            if anterior and anterior["emisiones"] and fila["emisiones"]:
+                antes = anterior["bytes"] / anterior["emisiones"]
+                ahora = fila["bytes"] / fila["emisiones"]
+                if ahora > antes * (1 + args.tolerancia):
+                    regresiones.append(f"{evento} bytes/emisión: {antes:.0f} -> {ahora:.0f}")
+        print("sin regresiones" if not regresiones else "REGRESIONES\n  " + "\n  ".join(regresiones))
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/codigos.py
+#
+# Entrega un millón de códigos de partida y mide el costo por código en cada
+# tramo, para comprobar que no crece con la cantidad ya emitida. Cada código
+# entregado pasa a una "partida" (un set, como el índice único de Mongo) y se
+# libera su reserva, como hace /connectGameCode. Con --pool se sirven desde
+# el pool de códigos generados de antemano.
+# Uso: python -m benchmarks.codigos [--codigos N] [--tramos N] [--pool N]
+
+import argparse
+import random
+import time
+
+from app.codigos import AsignadorCodigos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--codigos", type=int, default=1_000_000)
+    parser.add_argument("--tramos", type=int, default=10)
+    parser.add_argument("--pool", type=int, default=0)
+    args = parser.parse_args()
+
+    partidas = set()
+    consultas = 0
+
+    def en_uso(code):
+        nonlocal consultas
+        consultas += 1
+        return code in partidas
+
+    asignador = AsignadorCodigos(en_uso, tamano_pool=args.pool, azar=random.Random(7))
+    if args.pool:
+        asignador.rellenar()
+
+    por_tramo = args.codigos // args.tramos
+    for tramo in range(args.tramos):
+        consultas = 0
+        inicio = time.perf_counter()
+        for _ in range(por_tramo):
+            code = asignador.asignar()
+            partidas.add(code)
+            asignador.liberar(code)
+        segundos = time.perf_counter() - inicio
+        print(f"hasta {len(partidas):>9} códigos | {segundos / por_tramo * 1e6:5.2f} µs por código | "
+              f"{consultas / por_tramo:.4f} consultas por código")
+
+    assert len(partidas) == por_tramo * args.tramos, "se entregó un código repetido"
+    print(f"{len(partidas)} códigos únicos, reservas pendientes {len(asignador)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/concurrencia.py
+#
+# Martilla un mismo código de partida desde muchos hilos y comprueba que no se
+# pierden actualizaciones. Cada hilo alterna respuestas con /roundCommand; al
+# final cada respuesta debe estar revelada solo si se alternó con éxito un
+# número impar de veces, y el puntaje del equipo debe ser igual a la suma de
+# las respuestas reveladas. Además cada escritura exitosa debe dejar una
+# revisión distinta, las de un mismo hilo deben crecer y la revisión final
+# debe ser la inicial más el número de escrituras. Cualquier fallo termina
+# con AssertionError. Con --legado los hilos usan el flujo anterior (leer el
+# estado, calcularlo en el cliente y enviarlo completo a /updateGameBoard),
+# que pierde actualizaciones y por eso no pasa las comprobaciones; con
+# --latencia segundos de red simulada entre la lectura y la escritura.
+# Uso: python -m benchmarks.concurrencia [--hilos N] [--operaciones N] [--legado] [--latencia S] [--mongo URI]
+
+import argparse
+import os
+import threading
+import time
+
+
+def preparar_partida(app, servidor):
+    tablero = servidor.test_client(app)
+    tablero.emit("generateGameCode")
+    code = tablero.get_received()[0]["args"][0]["code"]
+    cliente = app.test_client()
+    cliente.post("/connectGameCode", json={"code": code})
+    cliente.post("/gameSetup", json={"code": code, "titulo": "Estrés",
+                                     "e1": {"name": "A", "score": 0}, "e2": {"name": "B", "score": 0}})
+    respuestas = [{"respuesta": f"r{i}", "pts": i + 1} for i in range(8)]
+    cliente.post("/gameAddQuestion", json={"code": code, "pregunta": {"pregunta": "¿Estrés?", "respuestas": respuestas}})
+    cliente.post("/gameInitControl", json={"code": code, "team": 0})
+    return tablero, code
+
+
+def alternar_comando(cliente, code, indice, latencia):
+    return cliente.post("/roundCommand", json={"code": code, "comando": "revelar", "indice": indice}).status_code
+
+
+def alternar_legado(cliente, code, indice, latencia):
+    info = cliente.post("/gameStatus", json={"code": code}).get_json()["gameInfo"]
+    # El controlador anterior no conocía la revisión, así que escribe sin condición.
+    info.pop("revision", None)
+    time.sleep(latencia)
+    respuesta = info["respuestas"][indice]
+    signo = -1 if respuesta.get("revealed") else 1
+    respuesta["revealed"] = signo > 0
+    info["equipo1"]["score"] += signo * respuesta["pts"]
+    info["puntuacion_ronda"] += signo * respuesta["pts"]
+    return cliente.post("/updateGameBoard", json={"code": code, **info}).status_code
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--operaciones", type=int, default=200)
+    parser.add_argument("--legado", action="store_true")
+    parser.add_argument("--latencia", type=float, default=0.002)
+    parser.add_argument("--mongo", help="URI de Mongo; por defecto se usa el almacén en memoria")
+    args = parser.parse_args()
+
+    os.environ["SOCKETIO_ASYNC_MODE"] = "threading"
+    if args.mongo:
+        os.environ["MONGO_URI"] = args.mongo
+        os.environ.setdefault("MONGO_DB", "benchmark_concurrencia")
+
+    from app import create_app
+    from app.extensions import socketio as servidor
+
+    app = create_app()
+    tablero, code = preparar_partida(app, servidor)
+    alternar = alternar_legado if args.legado else alternar_comando
+    estados = {}
+    alternadas = [0] * 8
+    lock = threading.Lock()
+
+    # Revisión que dejó cada escritura exitosa, con el hilo que la hizo.
+    revisiones = []
+    actualizar = app.partidas.actualizar
+
+    def registrar_revision(code, cambios, revision=None):
+        partida = actualizar(code, cambios, revision)
+        if partida is not None:
+            with lock:
+                revisiones.append((threading.get_ident(), partida["revision"]))
+        return partida
+
+    app.partidas.actualizar = registrar_revision
+    inicial = app.partidas.obtener(code)["revision"]
+
+    def trabajar(numero):
+        cliente = app.test_client()
+        for i in range(args.operaciones):
+            indice = (numero + i) % 8
+            estado = alternar(cliente, code, indice, args.latencia)
+            with lock:
+                estados[estado] = estados.get(estado, 0) + 1
+                if estado == 200:
+                    alternadas[indice] += 1
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=trabajar, args=(n,)) for n in range(args.hilos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    app.partidas.invalidar(code)
+    partida = app.partidas.obtener(code)
+    reveladas = sum(r["pts"] for r in partida["respuestas"] if r.get("revealed"))
+    esperadas = [veces % 2 == 1 for veces in alternadas]
+    actuales = [bool(r.get("revealed")) for r in partida["respuestas"]]
+    total = args.hilos * args.operaciones
+    print(f"{total} operaciones en {segundos:.2f} s ({total / segundos:.0f} op/s) | respuestas HTTP {estados}")
+    print(f"puntaje equipo1 {partida['equipo1']['score']} | puntuacion_ronda {partida['puntuacion_ronda']} | "
+          f"suma de reveladas {reveladas} | revisión {partida.get('revision')}")
+    print(f"reveladas esperadas {esperadas}\nreveladas actuales  {actuales}")
+    consistente = esperadas == actuales and partida["equipo1"]["score"] == partida["puntuacion_ronda"] == reveladas
+    print("estado consistente" if consistente else "ACTUALIZACIONES PERDIDAS")
+    tablero.disconnect()
+
+    assert set(estados) <= {200, 409}, f"Respuestas inesperadas: {estados}"
+    assert esperadas == actuales, "Se perdieron alternancias de respuestas"
+    assert partida["equipo1"]["score"] == partida["puntuacion_ronda"] == reveladas, "Los puntajes no cuadran"
+    assert len(revisiones) == estados.get(200, 0), \
+        f"{len(revisiones)} escrituras para {estados.get(200, 0)} comandos exitosos"
+    vistas = sorted(revision for _, revision in revisiones)
+    assert vistas == list(range(inicial + 1, partida["revision"] + 1)), \
+        "Las revisiones de las escrituras exitosas no son únicas y consecutivas"
+    por_hilo = {}
+    for hilo, revision in revisiones:
+        assert revision > por_hilo.get(hilo, inicial), f"Revisión {revision} no crece en el hilo {hilo}"
+        por_hilo[hilo] = revision
+    print(f"revisiones {inicial + 1}..{partida['revision']} únicas y crecientes por hilo")
+
+if __name__ == "__main__":
+    main()
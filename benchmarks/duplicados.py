@@ -0,0 +1,90 @@
+# benchmarks/duplicados.py
+#
+# Mide la deduplicación completa del banco con preguntas sintéticas en las
+# que se insertan copias exactas y paráfrasis (tildes, signos y una palabra
+# intercambiadas). Para tamaños pequeños compara contra la comparación por pares.
+# Uso: python -m benchmarks.duplicados [tamaño ...]
+
+import random
+import sys
+import time
+
+from app.duplicados import DetectorDuplicados, jaccard, simplificar, tejas
+
+SILABAS = "ca sa pe rro ga to pla ya fies ta co mi da es cue la tra ba jo fa mi lia ciu dad mu si ca li bro".split()
+PALABRAS = sorted({"".join(random.Random(i).choices(SILABAS, k=3)) for i in range(3000)})
+UNIONES = ("de", "la", "el", "en", "que", "un", "una", "con", "para", "los")
+INICIOS = ("¿Qué", "¿Cuál es un", "Menciona algo que", "¿Dónde", "Dime una cosa que", "¿Qué haces")
+
+
+def pregunta_aleatoria(azar):
+    palabras = []
+    for _ in range(azar.randint(3, 6)):
+        palabras += [azar.choice(UNIONES), azar.choice(PALABRAS)]
+    return f"{azar.choice(INICIOS)} {' '.join(palabras)}?"
+
+
+def parafrasear(texto, azar):
+    """Cambia mayúsculas, tildes y signos, y a veces intercambia dos letras."""
+    variante = texto.upper().replace("¿", "").replace("?", " ?").replace("É", "E").replace("Á", "A")
+    if azar.random() < 0.5:
+        i = azar.randrange(len(variante) - 1)
+        variante = variante[:i] + variante[i + 1] + variante[i] + variante[i + 2:]
+    return variante
+
+
+def generar(cantidad, semilla=7):
+    """Devuelve los textos y los índices que son copia o paráfrasis de uno anterior."""
+    azar = random.Random(semilla)
+    textos, repetidas = [], set()
+    for i in range(cantidad):
+        if i > 10 and azar.random() < 0.1:
+            original = textos[azar.randrange(len(textos))]
+            textos.append(original if azar.random() < 0.5 else parafrasear(original, azar))
+            repetidas.add(i)
+        else:
+            textos.append(pregunta_aleatoria(azar))
+    return textos, repetidas
+
+
+def deduplicar(textos):
+    detector = DetectorDuplicados()
+    encontradas = set()
+    for i, texto in enumerate(textos):
+        if detector.agregar_si_nueva(i, texto) is not None:
+            encontradas.add(i)
+    return encontradas
+
+
+def por_pares(textos, umbral=0.85):
+    conjuntos = []
+    encontradas = set()
+    for i, texto in enumerate(textos):
+        conjunto = tejas(simplificar(texto))
+        if any(jaccard(conjunto, otro) >= umbral for otro in conjuntos):
+            encontradas.add(i)
+        else:
+            conjuntos.append(conjunto)
+    return encontradas
+
+
+def main(tamanos):
+    for tamano in tamanos:
+        textos, repetidas = generar(tamano)
+        inicio = time.perf_counter()
+        encontradas = deduplicar(textos)
+        segundos = time.perf_counter() - inicio
+        linea = (
+            f"{tamano:>7} preguntas | lsh {segundos:6.2f} s | "
+            f"repetidas {len(repetidas)} | detectadas {len(encontradas & repetidas)} | "
+            f"falsos positivos {len(encontradas - repetidas)}"
+        )
+        if tamano <= 5000:
+            inicio = time.perf_counter()
+            exactas = por_pares(textos)
+            linea += f" | por pares {time.perf_counter() - inicio:6.2f} s ({len(exactas)} repetidas)"
+        print(linea)
+
+
+if __name__ == "__main__":
+    main([int(valor) for valor in sys.argv[1:]] or [2000, 5000, 20000, 100000])
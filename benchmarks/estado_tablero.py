@@ -0,0 +1,102 @@
+# benchmarks/estado_tablero.py
+#
+# Comprueba que /gameStatus refleja la partida guardada aunque la última
+# escritura no se haya difundido: una escritura directa sin update_board y
+# otra que sigue dentro de la ventana del coalescedor. En ambos casos la
+# revisión que devuelve /gameStatus debe ser la del documento y el siguiente
+# /roundCommand con esa revisión debe funcionar; un tablero que pide parches
+# desde su versión debe llegar al mismo estado. Al sumar la partida a un
+# torneo, el tablero debe recibir la revisión nueva sin pedir /gameStatus.
+# Cualquier fallo termina con AssertionError.
+# Uso: python -m benchmarks.estado_tablero
+
+import copy
+import os
+
+
+def aplicar_parche(estado, ops):
+    """Aplica las operaciones add/remove/replace que genera calcular_parche."""
+    estado = copy.deepcopy(estado)
+    for op in ops:
+        claves = [c.replace("~1", "/").replace("~0", "~") for c in op["path"].split("/")[1:]]
+        if not claves:
+            estado = op["value"]
+            continue
+        contenedor = estado
+        for clave in claves[:-1]:
+            contenedor = contenedor[int(clave) if isinstance(contenedor, list) else clave]
+        clave = int(claves[-1]) if isinstance(contenedor, list) else claves[-1]
+        if op["op"] == "remove":
+            del contenedor[clave]
+        else:
+            contenedor[clave] = op["value"]
+    return estado
+
+
+def main():
+    os.environ["SOCKETIO_ASYNC_MODE"] = "threading"
+    # Una ventana larga deja pendiente la difusión de /setScores.
+    os.environ["TABLERO_VENTANA_MS"] = "60000"
+    os.environ.pop("MONGO_URI", None)
+    os.environ.pop("ALMACEN_COMPARTIDO", None)
+    os.environ.pop("SOCKETIO_MESSAGE_QUEUE", None)
+
+    from app import create_app
+    from app.extensions import socketio as servidor
+
+    app = create_app()
+    tablero = servidor.test_client(app)
+    tablero.emit("generateGameCode")
+    code = tablero.get_received()[0]["args"][0]["code"]
+    cliente = app.test_client()
+    cliente.post("/connectGameCode", json={"code": code})
+    cliente.post("/gameSetup", json={"code": code, "titulo": "Estado",
+                                     "e1": {"name": "A", "score": 0}, "e2": {"name": "B", "score": 0}})
+    respuestas = [{"respuesta": f"r{i}", "pts": i + 1} for i in range(4)]
+    cliente.post("/gameAddQuestion", json={"code": code, "pregunta": {"pregunta": "¿Estado?", "respuestas": respuestas}})
+    cliente.post("/gameInitControl", json={"code": code, "team": 0})
+
+    inicial = cliente.post("/gameStatus", json={"code": code}).get_json()
+    escrituras = [
+        ("escritura sin difusión", lambda: app.partidas.actualizar(code, {"$set": {"titulo": "Cambiado"}})),
+        ("escritura en la ventana del coalescedor",
+         lambda: cliente.post("/setScores", json={"code": code, "scoreFrist": 7, "scoreSecond": 3})),
+    ]
+    for i, (nombre, escribir) in enumerate(escrituras):
+        escribir()
+        documento = app.partidas.obtener(code)
+        estado = cliente.post("/gameStatus", json={"code": code}).get_json()
+        assert estado["gameInfo"]["revision"] == documento["revision"], \
+            f"{nombre}: /gameStatus en la revisión {estado['gameInfo']['revision']}, el documento en {documento['revision']}"
+        assert estado["gameInfo"]["titulo"] == "Cambiado", f"{nombre}: {estado['gameInfo']['titulo']}"
+
+        parches = cliente.post("/gameStatus", json={"code": code, "version": inicial["version"]}).get_json()
+        reconstruido = inicial["gameInfo"]
+        for parche in parches["patches"]:
+            reconstruido = aplicar_parche(reconstruido, parche["ops"])
+        assert reconstruido == estado["gameInfo"], f"{nombre}: los parches no llevan al estado guardado"
+
+        respuesta = cliente.post("/roundCommand", json={"code": code, "comando": "revelar", "indice": i,
+                                                        "revision": estado["gameInfo"]["revision"]})
+        assert respuesta.status_code == 200, f"{nombre}: roundCommand -> {respuesta.status_code} {respuesta.get_json()}"
+        print(f"OK {nombre}: /gameStatus en la revisión {documento['revision']} y roundCommand aceptado")
+
+    tablero.get_received()
+    respuesta = cliente.post("/tournaments", json={"nombre": "Estado", "codigos": [code]})
+    assert respuesta.status_code == 201, f"/tournaments -> {respuesta.status_code} {respuesta.get_json()}"
+    documento = app.partidas.obtener(code)
+    revisiones = [op["value"] for evento in tablero.get_received() if evento["name"] == "patchBoard"
+                  for op in evento["args"][0]["ops"] if op["path"] == "/revision"]
+    assert revisiones[-1:] == [documento["revision"]], \
+        f"El tablero recibió las revisiones {revisiones}, el documento está en {documento['revision']}"
+    respuesta = cliente.post("/roundCommand", json={"code": code, "comando": "revelar", "indice": 2,
+                                                    "revision": revisiones[-1]})
+    assert respuesta.status_code == 200, f"tras el torneo: roundCommand -> {respuesta.status_code} {respuesta.get_json()}"
+    print(f"OK partida sumada a un torneo: el tablero recibió la revisión {documento['revision']}")
+
+    tablero.disconnect()
+    print("Resultado: correcto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/formato_compacto.py
+#
+# Compara el formato JSON de updateBoard/patchBoard con el compacto: bytes
+# por actualización y costo de codificar, sobre una secuencia de estados de
+# rondas reales (revelar, strikes, robo, cambio de pregunta). También
+# decodifica el formato compacto como lo hace lib/compacto.ts y comprueba que
+# cada estado reconstruido es igual al game_info original.
+# Uso: python -m benchmarks.formato_compacto [--rondas N] [--repeticiones N]
+
+import argparse
+import copy
+import json
+import random
+import time
+
+from app.compacto import (
+    BANDERAS_RESPUESTA,
+    CAMPOS,
+    CAMPOS_EQUIPO,
+    compactar_game_info,
+    compactar_ops,
+)
+from app.difusion import calcular_parche, construir_game_info
+
+
+def serializar(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def expandir(estado):
+    game_info = {}
+    for campo, valor in zip(CAMPOS, estado):
+        if campo in ("equipo1", "equipo2") and isinstance(valor, list):
+            equipo = dict(valor[len(CAMPOS_EQUIPO)]) if len(valor) > len(CAMPOS_EQUIPO) else {}
+            equipo.update({clave: v for clave, v in zip(CAMPOS_EQUIPO, valor) if v is not None})
+            valor = equipo
+        elif campo == "respuestas" and isinstance(valor, list):
+            valor = [
+                {"respuesta": texto, "pts": pts,
+                 **{bandera: True for bandera, bit in BANDERAS_RESPUESTA.items() if banderas & bit}}
+                for texto, pts, banderas in valor
+            ]
+        game_info[campo] = valor
+    return game_info
+
+
+def aplicar(estado, ops):
+    estado = copy.deepcopy(estado)
+    for tipo, ruta, *valor in ops:
+        padre = estado
+        for posicion in ruta[:-1]:
+            padre = padre[posicion]
+        if tipo == 2:
+            del padre[ruta[-1]]
+        else:
+            padre[ruta[-1]] = valor[0]
+    return estado
+
+
+def estados_partida(rondas, azar):
+    equipos = [
+        {"name": "Los Tigres del Norte", "color": "#ff5733", "score": 0, "avatar": "🐯"},
+        {"name": "Las Águilas Doradas", "color": "#3377ff", "score": 0, "avatar": "🦅"},
+    ]
+    partida = {
+        "codigo": "ABC123", "estado": "game-selection", "titulo": "Noche de trivia",
+        "equipo1": equipos[0], "equipo2": equipos[1], "pregunta": "", "respuestas": [],
+        "puntuacion_ronda": 0, "equipo_actual": 0, "strike": 0, "robo_puntos": False,
+        "regresive": None, "revision": 0,
+    }
+    for numero in range(rondas):
+        partida = copy.deepcopy(partida)
+        partida.update(estado="game-control", pregunta=f"¿Qué es lo primero que haces al despertar? ({numero})",
+                       respuestas=[{"respuesta": f"Respuesta popular número {i}", "pts": 35 - i * 6} for i in range(5)],
+                       puntuacion_ronda=0, strike=0, robo_puntos=False, equipo_actual=numero % 2)
+        yield partida
+        for indice in azar.sample(range(5), 5):
+            partida = copy.deepcopy(partida)
+            if azar.random() < 0.3 and partida["strike"] < 3:
+                partida["strike"] += 1
+            else:
+                respuesta = partida["respuestas"][indice]
+                respuesta["revealed"] = respuesta["shownOnBoard"] = True
+                partida["puntuacion_ronda"] += respuesta["pts"]
+                partida[f"equipo{partida['equipo_actual'] + 1}"]["score"] += respuesta["pts"]
+            partida["revision"] += 1
+            yield partida
+        partida = copy.deepcopy(partida)
+        partida.update(estado="game-selection", puntuacion_ronda=0, strike=0)
+        yield partida
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rondas", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    estados = [construir_game_info(partida) for partida in estados_partida(args.rondas, random.Random(5))]
+    actualizaciones = [(anterior, nuevo, calcular_parche(anterior, nuevo)) for anterior, nuevo in zip(estados, estados[1:])]
+
+    compacto = compactar_game_info(estados[0])
+    for _, nuevo, ops in actualizaciones:
+        compacto = aplicar(compacto, compactar_ops(ops, nuevo))
+        assert expandir(compacto) == nuevo, "el estado compacto no reconstruye el game_info"
+
+    def medir(codificar):
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            tamanos = [len(codificar(*actualizacion)) for actualizacion in actualizaciones]
+        return sum(tamanos) / len(tamanos), (time.perf_counter() - inicio) / (args.repeticiones * len(actualizaciones)) * 1e6
+
+    bytes_json, us_json = medir(lambda anterior, nuevo, ops: serializar({"version": 1, "ops": ops}))
+    bytes_compacto, us_compacto = medir(lambda anterior, nuevo, ops: serializar({"v": 1, "o": compactar_ops(ops, nuevo)}))
+    total_json = len(serializar({**estados[-1], "version": 1}))
+    total_compacto = len(serializar({"v": 1, "d": compactar_game_info(estados[-1])}))
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones * 100):
+        serializar({"v": 1, "d": compactar_game_info(estados[-1])})
+    us_total_compacto = (time.perf_counter() - inicio) / (args.repeticiones * 100) * 1e6
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones * 100):
+        serializar({**estados[-1], "version": 1})
+    us_total_json = (time.perf_counter() - inicio) / (args.repeticiones * 100) * 1e6
+
+    print(f"{len(actualizaciones)} actualizaciones de {args.rondas} rondas; reconstrucción compacta verificada")
+    print(f"{'':<24}{'JSON':>12}{'compacto':>12}{'ahorro':>9}")
+    print(f"{'updateBoard bytes':<24}{total_json:>12}{total_compacto:>12}{1 - total_compacto / total_json:>9.0%}")
+    print(f"{'updateBoard µs':<24}{us_total_json:>12.1f}{us_total_compacto:>12.1f}")
+    print(f"{'patchBoard bytes':<24}{bytes_json:>12.0f}{bytes_compacto:>12.0f}{1 - bytes_compacto / bytes_json:>9.0%}")
+    print(f"{'patchBoard µs':<24}{us_json:>12.1f}{us_compacto:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/generacion.py
+#
+# Mide la cola de generación con un modelo falso de latencia fija: cuántas
+# llamadas al modelo y cuánto tiempo hacen falta para atender ráfagas de
+# pedidos, frente a una llamada síncrona por pedido como antes.
+# Uso: python -m benchmarks.generacion [pedidos] [temas] [latencia_s]
+
+import random
+import sys
+import threading
+import time
+
+from app.generacion import ClienteFalso, ColaGeneracion
+from app.preguntas import validar_pregunta
+
+
+def iniciar_hilo(funcion):
+    threading.Thread(target=funcion, daemon=True).start()
+
+
+def main(pedidos=200, temas=20, latencia=0.2):
+    nombres = [f"tema {i}" for i in range(temas)]
+    solicitados = [random.choice(nombres) for _ in range(pedidos)]
+    print(f"Síncrono (antes): {pedidos} llamadas al modelo, ~{pedidos * latencia:.1f} s de worker bloqueado")
+
+    for nombre, precalentar in (("cola", False), ("cola precalentada", True)):
+        cliente = ClienteFalso(latencia=latencia)
+        cola = ColaGeneracion(cliente, validar_pregunta, iniciar_hilo)
+        if precalentar:
+            cola.precalentar(nombres)
+            while any(cola._pendientes):
+                time.sleep(0.01)
+
+        inicio = time.perf_counter()
+        envio = []
+        for tema in solicitados:
+            t = time.perf_counter()
+            envio.append((cola.enviar(tema), time.perf_counter() - t))
+        respuesta_max = max(duracion for _, duracion in envio) * 1000
+        while any(cola.consultar(id_trabajo)["estado"] == "pendiente" for id_trabajo, _ in envio):
+            time.sleep(0.01)
+        total = time.perf_counter() - inicio
+        print(
+            f"{nombre:>18}: {cliente.llamadas} llamadas al modelo, todos listos en {total:.2f} s, "
+            f"respuesta HTTP máx {respuesta_max:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:4]
+    main(*(int(a) for a in argumentos[:2]), *(float(a) for a in argumentos[2:3]))
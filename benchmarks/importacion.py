@@ -0,0 +1,120 @@
+# benchmarks/importacion.py
+#
+# Mide la importación masiva de preguntas en JSONL y CSV: filas por segundo y
+# pico de memoria de la importación por flujo (lotes de --lote) frente a leer
+# el archivo completo, validarlo y agregarlo de una vez. El archivo tiene
+# copias y paráfrasis (como en benchmarks.duplicados) y un 1 % de filas
+# inválidas; comprueba que todas se informan. Al final mide la exportación.
+# Uso: python -m benchmarks.importacion [--filas N] [--lote L]
+
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app.almacen_preguntas import AlmacenPreguntasJSONL, BancoPreguntas, Pregunta
+from app.importacion import exportar, importar
+from app.preguntas import validar_pregunta
+from benchmarks.duplicados import generar
+
+TEMAS = ("comida", "animales", "deportes", "música", "cine", "viajes", "países", "tecnología")
+
+
+def escribir_archivos(directorio, filas):
+    """Escribe las mismas filas en JSONL y CSV; devuelve las rutas y cuántas son inválidas."""
+    azar = random.Random(13)
+    textos, _ = generar(filas)
+    ruta_jsonl = os.path.join(directorio, "importar.jsonl")
+    ruta_csv = os.path.join(directorio, "importar.csv")
+    invalidas = 0
+    with open(ruta_jsonl, "w", encoding="utf-8") as jsonl, open(ruta_csv, "w", encoding="utf-8", newline="") as archivo_csv:
+        escritor = csv.writer(archivo_csv)
+        escritor.writerow(["tema", "pregunta", "dificultad"] + [f"{campo}{i}" for i in range(1, 6) for campo in ("respuesta", "pts")])
+        for numero, texto in enumerate(textos):
+            puntos = sorted((azar.randint(5, 60) for _ in range(5)), reverse=True)
+            if azar.random() < 0.01:
+                puntos[0] = "muchos"
+                invalidas += 1
+            respuestas = [{"respuesta": f"respuesta {i}", "pts": pts} for i, pts in enumerate(puntos)]
+            jsonl.write(json.dumps({"tema": TEMAS[numero % len(TEMAS)], "pregunta": texto, "respuestas": respuestas},
+                                   ensure_ascii=False) + "\n")
+            escritor.writerow([TEMAS[numero % len(TEMAS)], texto, ""] + [valor for r in respuestas for valor in (r["respuesta"], r["pts"])])
+    return ruta_jsonl, ruta_csv, invalidas
+
+
+def banco_vacio(directorio):
+    ruta = os.path.join(directorio, "banco.jsonl")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    return BancoPreguntas(AlmacenPreguntasJSONL(ruta))
+
+
+def por_flujo(banco, ruta, formato, lote):
+    with open(ruta, encoding="utf-8-sig", newline="") as archivo:
+        return importar(banco, archivo, formato, lote=lote)
+
+
+def todo_en_memoria(banco, ruta, formato, lote):
+    with open(ruta, encoding="utf-8") as archivo:
+        if formato == "jsonl":
+            datos = [json.loads(linea) for linea in archivo]
+        else:
+            from app.importacion import leer_csv
+            datos = [fila for _, fila, _ in leer_csv(archivo)]
+    validas = [Pregunta.desde_dict(fila) for fila in datos if validar_pregunta(fila)[0]]
+    repetidas = banco.agregar(validas)
+    return {"leidas": len(datos), "agregadas": len(validas) - len(repetidas), "repetidas": len(repetidas),
+            "invalidas": len(datos) - len(validas)}
+
+
+def medir(funcion, directorio, *args):
+    banco = banco_vacio(directorio)
+    banco.indice  # la carga del banco vacío no cuenta
+    inicio = time.perf_counter()
+    resumen = funcion(banco, *args)
+    segundos = time.perf_counter() - inicio
+    # El pico de memoria se mide en otra pasada: tracemalloc hace más lento todo.
+    banco = banco_vacio(directorio)
+    banco.indice
+    tracemalloc.start()
+    funcion(banco, *args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resumen, segundos, pico
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    ruta_jsonl, ruta_csv, invalidas = escribir_archivos(directorio, args.filas)
+    print(f"{args.filas} filas ({invalidas} inválidas), lote {args.lote}")
+    print(f"{'':>22}{'filas/s':>10}{'segundos':>10}{'pico MB':>10}{'agregadas':>11}{'repetidas':>11}")
+    for formato, ruta in (("jsonl", ruta_jsonl), ("csv", ruta_csv)):
+        for nombre, funcion in (("por flujo", por_flujo), ("todo en memoria", todo_en_memoria)):
+            resumen, segundos, pico = medir(funcion, directorio, ruta, formato, args.lote)
+            assert resumen["leidas"] == args.filas
+            assert resumen["invalidas"] == invalidas, "no se informaron todas las filas inválidas"
+            assert resumen["agregadas"] + resumen["repetidas"] + resumen["invalidas"] == resumen["leidas"]
+            print(f"{formato + ' ' + nombre:>22}{args.filas / segundos:>10.0f}{segundos:>10.2f}{pico / 1e6:>10.1f}"
+                  f"{resumen['agregadas']:>11}{resumen['repetidas']:>11}")
+
+    banco = BancoPreguntas(AlmacenPreguntasJSONL(os.path.join(directorio, "banco.jsonl")))
+    banco.indice
+    for formato in ("jsonl", "csv"):
+        inicio = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as destino:
+            destino.writelines(exportar(banco.preguntas, formato))
+        segundos = time.perf_counter() - inicio
+        print(f"exportar {len(banco.preguntas)} preguntas en {formato}: {segundos:.2f} s ({len(banco.preguntas) / segundos:.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# benchmarks/multiproceso.py
+#
+# Levanta dos workers que comparten ALMACEN_COMPARTIDO y comprueba que un
+# control que habla con el worker A actualiza un tablero conectado al worker B.
+# Después intercala escrituras en los dos workers y compara el documento final
+# del almacén compartido con lo que devuelve cada worker, y consulta en B un
+# trabajo de generación de preguntas enviado a A. Cualquier fallo
+# termina con AssertionError y código de salida distinto de cero.
+# Uso: python -m benchmarks.multiproceso
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import socketio
+
+from app.compartido import AlmacenPartidasSQLite
+from app.difusion import construir_game_info
+
+PUERTO_A = 5101
+PUERTO_B = 5102
+ESCRITURAS = 10
+
+
+def ejecutar_worker(puerto):
+    from app import create_app
+    from app.extensions import socketio as servidor
+
+    app = create_app()
+    servidor.run(app, host="127.0.0.1", port=puerto, use_reloader=False, allow_unsafe_werkzeug=True)
+
+
+def post(puerto, ruta, **datos):
+    peticion = urllib.request.Request(
+        f"http://127.0.0.1:{puerto}{ruta}",
+        data=json.dumps(datos).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(peticion, timeout=5) as respuesta:
+            return respuesta.status, json.load(respuesta)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def get(puerto, ruta):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto}{ruta}", timeout=5) as respuesta:
+            return respuesta.status, json.load(respuesta)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def esperar_worker(puerto, limite=15):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{puerto}/categories", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El worker en el puerto {puerto} no respondió")
+
+
+def nombre(puerto):
+    return "A" if puerto == PUERTO_A else "B"
+
+
+def recibido(eventos, evento):
+    return any(e == evento for e, _ in eventos)
+
+
+def esperar(condicion, limite=5):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def main():
+    directorio = tempfile.mkdtemp()
+    entorno = dict(os.environ, ALMACEN_COMPARTIDO=os.path.join(directorio, "compartido.db"),
+                   GENERACION_CLIENTE="falso", PREGUNTAS_PATH=os.path.join(directorio, "preguntas.jsonl"))
+    entorno.pop("MONGO_URI", None)
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.multiproceso", "--worker", str(puerto)], env=entorno)
+        for puerto in (PUERTO_A, PUERTO_B)
+    ]
+    try:
+        for puerto in (PUERTO_A, PUERTO_B):
+            esperar_worker(puerto)
+
+        recibidos = []
+        codigo = threading.Event()
+        tablero = socketio.Client()
+
+        @tablero.on("*")
+        def recibir(evento, datos):
+            recibidos.append((evento, datos))
+            if evento == "gameCodeGenerated":
+                codigo.code = datos["code"]
+                codigo.set()
+
+        tablero.connect(f"http://127.0.0.1:{PUERTO_B}")
+        tablero.emit("generateGameCode")
+        if not codigo.wait(5):
+            raise RuntimeError("El worker B no generó un código")
+        code = codigo.code
+
+        # La lectura en B deja la partida en su caché antes de que A la modifique.
+        pasos = [
+            (PUERTO_A, "/connectGameCode", {}, "gameConnected"),
+            (PUERTO_B, "/gameStatus", {}, None),
+            (PUERTO_A, "/gameSetup", {"titulo": "Multiproceso", "e1": {"name": "A", "score": 0}, "e2": {"name": "B", "score": 0}}, "patchBoard"),
+        ]
+        for puerto, ruta, datos, evento in pasos:
+            antes = len(recibidos)
+            estado, respuesta = post(puerto, ruta, code=code, **datos)
+            assert estado == 200, f"{nombre(puerto)} {ruta} -> {estado}: {respuesta}"
+            if evento is not None:
+                assert esperar(lambda: recibido(recibidos[antes:], evento)), \
+                    f"El tablero en B no recibió {evento} tras {ruta} en {nombre(puerto)}"
+            print(f"OK worker {nombre(puerto)} {ruta}; tablero en B recibió {evento or '-'}")
+
+        # Escrituras intercaladas: cada una va al worker contrario de la
+        # anterior con la revisión que dejó aquella, así que una caché vieja
+        # en cualquiera de los dos se vería como un 409 o un puntaje perdido.
+        partidas = AlmacenPartidasSQLite(entorno["ALMACEN_COMPARTIDO"])
+        revision = partidas.buscar(code)["revision"]
+        for i in range(ESCRITURAS):
+            puerto, otro = (PUERTO_A, PUERTO_B) if i % 2 == 0 else (PUERTO_B, PUERTO_A)
+            puntajes = {"scoreFrist": 10 * (i + 1), "scoreSecond": 5 * (i + 1)}
+            antes = len(recibidos)
+            estado, respuesta = post(puerto, "/setScores", code=code, revision=revision, **puntajes)
+            assert estado == 200, f"setScores {i} en {nombre(puerto)} -> {estado}: {respuesta}"
+            revision += 1
+            assert esperar(lambda: recibido(recibidos[antes:], "patchBoard")), \
+                f"El tablero en B no recibió patchBoard tras setScores {i} en {nombre(puerto)}"
+            estado, respuesta = post(otro, "/gameStatus", code=code)
+            equipo1 = respuesta.get("gameInfo", {}).get("equipo1", {})
+            assert equipo1.get("score") == puntajes["scoreFrist"], \
+                f"{nombre(otro)} no ve el puntaje escrito en {nombre(puerto)}: {equipo1}"
+
+        # Una escritura con una revisión ya superada se rechaza en cualquier worker.
+        for puerto in (PUERTO_A, PUERTO_B):
+            estado, respuesta = post(puerto, "/setScores", code=code, revision=revision - 1, scoreFrist=0, scoreSecond=0)
+            assert estado == 409, f"Escritura con revisión vieja en {nombre(puerto)} -> {estado}: {respuesta}"
+            assert respuesta.get("revision") == revision, f"{nombre(puerto)} informó la revisión {respuesta.get('revision')}"
+        print(f"OK {ESCRITURAS} escrituras intercaladas entre A y B; las revisiones viejas dan 409")
+
+        documento = partidas.buscar(code)
+        assert documento["revision"] == revision, f"Revisión final {documento['revision']}, se esperaba {revision}"
+        assert documento["equipo1"] == {"name": "A", "score": 10 * ESCRITURAS}, documento["equipo1"]
+        assert documento["equipo2"] == {"name": "B", "score": 5 * ESCRITURAS}, documento["equipo2"]
+        vistas = [post(puerto, "/gameStatus", code=code) for puerto in (PUERTO_A, PUERTO_B)]
+        for (estado, respuesta), puerto in zip(vistas, (PUERTO_A, PUERTO_B)):
+            assert estado == 200, f"{nombre(puerto)} /gameStatus -> {estado}"
+            assert respuesta["gameInfo"] == construir_game_info(documento), \
+                f"{nombre(puerto)} devuelve {respuesta['gameInfo']}, el almacén tiene {documento}"
+        print("OK el documento final coincide en el almacén compartido, el worker A y el worker B")
+
+        # Los trabajos de generación viven en el almacén compartido: el que
+        # se envió a A se puede consultar en B hasta que termina.
+        estado, respuesta = get(PUERTO_A, "/generar-preguntas?tema=Multiproceso")
+        assert estado == 202, f"/generar-preguntas en A -> {estado}: {respuesta}"
+        ruta = f"/generar-preguntas/{respuesta['trabajo']}"
+        assert esperar(lambda: get(PUERTO_B, ruta)[0] != 202), "El trabajo sigue pendiente en B"
+        estado, respuesta = get(PUERTO_B, ruta)
+        assert estado == 200 and respuesta["preguntas"], f"{ruta} en B -> {estado}: {respuesta}"
+        print(f"OK trabajo de generación enviado a A y consultado en B: {len(respuesta['preguntas'])} preguntas")
+
+        tablero.disconnect()
+        print("Resultado: correcto")
+        return 0
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        ejecutar_worker(int(sys.argv[2]))
+    else:
+        sys.exit(main())
@@ -0,0 +1,82 @@
+# benchmarks/registro_tableros.py
+#
+# Compara el registro de tableros con el diccionario de listas anterior.
+# Uso: python -m benchmarks.registro_tableros [tableros] [clientes_por_tablero]
+
+import json
+import sys
+import time
+
+from app.difusion import construir_game_info
+from app.sockets import RegistroTableros
+
+
+class RegistroLegado:
+    def __init__(self):
+        self.tableros = {}
+
+    def conectar(self, code, sid):
+        self.tableros.setdefault(code, []).append(sid)
+
+    def desconectar(self, sid):
+        for code, clients in self.tableros.items():
+            if sid in clients:
+                clients.remove(sid)
+                return code
+
+
+class EmisorFalso:
+    """Imita el costo de python-socketio: codifica una vez por emit y envía a cada SID."""
+
+    def __init__(self, salas):
+        self.salas = salas
+        self.enviados = 0
+
+    def emit(self, evento, payload, to):
+        paquete = json.dumps([evento, payload])
+        for _ in self.salas(to):
+            self.enviados += len(paquete)
+
+
+def cronometrar(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        funcion(i)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main(num_tableros=2000, por_tablero=3):
+    codigos = [f"{i:06d}" for i in range(num_tableros)]
+    clientes = [(code, f"sid-{code}-{j}") for code in codigos for j in range(por_tablero)]
+    game_info = construir_game_info({"codigo": codigos[0], "titulo": "Benchmark", "respuestas": [
+        {"respuesta": f"respuesta {i}", "pts": 10} for i in range(5)
+    ]})
+    muestra = min(len(clientes), 2000)
+
+    for nombre, registro in (("legado", RegistroLegado()), ("registro", RegistroTableros())):
+        conectar = cronometrar(lambda i: registro.conectar(*clientes[i]), len(clientes))
+
+        if nombre == "legado":
+            emisor = EmisorFalso(lambda sid: [sid])
+            difundir = cronometrar(
+                lambda i: [emisor.emit("updateBoard", game_info, sid) for sid in registro.tableros[codigos[i % num_tableros]]],
+                muestra,
+            )
+        else:
+            emisor = EmisorFalso(registro.sids)
+            difundir = cronometrar(
+                lambda i: emisor.emit("updateBoard", game_info, codigos[i % num_tableros]),
+                muestra,
+            )
+
+        paso = max(1, len(clientes) // muestra)
+        desconectar = cronometrar(lambda i: registro.desconectar(clientes[(i * paso) % len(clientes)][1]), muestra)
+
+        print(
+            f"{nombre:>9}: {len(clientes)} clientes en {num_tableros} tableros | "
+            f"conectar {conectar:8.2f} us | difundir {difundir:8.2f} us | desconectar {desconectar:10.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
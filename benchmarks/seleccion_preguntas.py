@@ -0,0 +1,96 @@
+# benchmarks/seleccion_preguntas.py
+#
+# Mide cuánto cuesta sortear preguntas no usadas para una partida según el
+# tamaño del banco, con SeleccionPreguntas y con el filtrado anterior
+# (recorrer el banco y descartar por texto las de la lista de usadas). Cada
+# partida ya jugó --usadas rondas; el sorteo pide --cantidad preguntas de una
+# categoría y dificultad, sin pesos y con pesos por categoría. Comprueba
+# además que ninguna pregunta sorteada estaba usada.
+# Uso: python -m benchmarks.seleccion_preguntas [--sorteos N] [--usadas N] [--cantidad K] [tamaños ...]
+
+import argparse
+import random
+import statistics
+import time
+
+from app.almacen_preguntas import Pregunta
+from app.indice_preguntas import IndicePreguntas
+from app.seleccion import SeleccionPreguntas
+
+TEMAS = ("comida", "animales", "deportes", "música", "cine", "viajes", "países", "tecnología")
+
+
+class Banco:
+    def __init__(self, preguntas):
+        self.indice = IndicePreguntas(preguntas)
+
+
+class Historial:
+    def __init__(self):
+        self.usadas = {}
+
+    def preguntas_usadas(self, code, desde=0):
+        return self.usadas.get(code, [])[desde:]
+
+
+def banco_sintetico(tamano, azar):
+    preguntas = []
+    for numero in range(tamano):
+        puntos = sorted((azar.randint(5, 60) for _ in range(5)), reverse=True)
+        preguntas.append(Pregunta(
+            TEMAS[numero % len(TEMAS)],
+            f"¿Pregunta sintética número {numero}?",
+            ((f"respuesta {i}", pts) for i, pts in enumerate(puntos)),
+        ))
+    return preguntas
+
+
+def sorteo_filtrando(preguntas, usadas, tema, cantidad, azar):
+    usadas = set(usadas)
+    libres = [p for p in preguntas if p.tema == tema and p.pregunta not in usadas]
+    return azar.sample(libres, min(cantidad, len(libres)))
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return statistics.median(tiempos) * 1e6, tiempos[int(len(tiempos) * 0.99) - 1] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tamanos", nargs="*", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--sorteos", type=int, default=500)
+    parser.add_argument("--usadas", type=int, default=40)
+    parser.add_argument("--cantidad", type=int, default=5)
+    args = parser.parse_args()
+
+    azar = random.Random(3)
+    print(f"{'banco':>10}{'sorteo p50 µs':>15}{'p99 µs':>10}{'con pesos p50':>15}{'filtrando p50':>15}")
+    for tamano in args.tamanos:
+        preguntas = banco_sintetico(tamano, azar)
+        historial = Historial()
+        seleccion = SeleccionPreguntas(Banco(preguntas), historial, azar=random.Random(5))
+        code = "BENCH1"
+        historial.usadas[code] = [p.pregunta for p in azar.sample(preguntas, min(args.usadas, tamano))]
+        usadas = set(historial.usadas[code])
+
+        def sortear():
+            sorteadas, _ = seleccion.sortear(code, args.cantidad, temas=["comida"], dificultades=["media", "dificil"])
+            assert not any(p.pregunta in usadas for p, _ in sorteadas), "se sorteó una pregunta usada"
+
+        sortear()  # la primera llamada carga el historial de la partida
+        p50, p99 = medir(sortear, args.sorteos)
+        pesos, _ = medir(lambda: seleccion.sortear(code, args.cantidad, pesos={"comida": 3, "cine": 2}), args.sorteos)
+        repeticiones = max(3, min(args.sorteos, 2_000_000 // tamano))
+        filtrando, _ = medir(lambda: sorteo_filtrando(preguntas, historial.usadas[code], "comida", args.cantidad, azar),
+                             repeticiones)
+        print(f"{tamano:>10}{p50:>15.1f}{p99:>10.1f}{pesos:>15.1f}{filtrando:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/temporizadores.py
+#
+# Miles de cuentas regresivas a la vez en un solo planificador: mide cuántos
+# ticks se emiten, el retraso de cada tick respecto al segundo que le tocaba y
+# el tiempo de CPU que consume el bucle. Cada cuarta partida se pausa y se
+# reanuda a mitad de la cuenta. Al final comprueba que todas las cuentas
+# terminaron y que la tarea de fondo se apaga con ``detener``.
+# Uso: python -m benchmarks.temporizadores [--partidas N] [--segundos S] [--resolucion R]
+
+import argparse
+import statistics
+import threading
+import time
+
+from app.temporizador import Temporizadores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partidas", type=int, default=5000)
+    parser.add_argument("--segundos", type=int, default=5)
+    parser.add_argument("--resolucion", type=float, default=0.05)
+    args = parser.parse_args()
+
+    inicios = {}
+    retrasos = []
+    terminados = []
+    lock = threading.Lock()
+
+    def emitir(code, datos):
+        # Solo cuentan los ticks del planificador, no el aviso inmediato de iniciar o reanudar.
+        if datos["pausado"] or threading.current_thread() is threading.main_thread():
+            return
+        esperado = inicios[code] + (args.segundos - datos["regresive"])
+        with lock:
+            retrasos.append(time.monotonic() - esperado)
+
+    tareas = []
+
+    def iniciar_tarea(tarea):
+        hilo = threading.Thread(target=tarea, daemon=True)
+        hilo.start()
+        tareas.append(hilo)
+        return hilo
+
+    temporizadores = Temporizadores(
+        iniciar_tarea,
+        time.sleep,
+        emitir,
+        al_terminar=terminados.append,
+        resolucion=args.resolucion,
+    )
+
+    codigos = [f"T{n:05d}" for n in range(args.partidas)]
+    cpu = time.process_time()
+    for code in codigos:
+        inicios[code] = time.monotonic()
+        temporizadores.iniciar(code, args.segundos)
+
+    time.sleep(args.segundos / 2)
+    pausados = codigos[::4]
+    for code in pausados:
+        temporizadores.pausar(code)
+    time.sleep(1)
+    for code in pausados:
+        inicios[code] += 1
+        temporizadores.reanudar(code)
+
+    limite = time.monotonic() + args.segundos + 5
+    while len(terminados) < len(codigos) and time.monotonic() < limite:
+        time.sleep(0.1)
+    cpu = time.process_time() - cpu
+
+    retrasos.sort()
+    print(f"{len(codigos)} cuentas de {args.segundos} s, {len(pausados)} pausadas 1 s | "
+          f"{len(retrasos)} ticks | terminadas {len(terminados)} | pendientes {len(temporizadores)}")
+    print(f"retraso de tick p50 {statistics.median(retrasos) * 1000:.1f} ms "
+          f"p99 {retrasos[int(len(retrasos) * 0.99) - 1] * 1000:.1f} ms "
+          f"máx {retrasos[-1] * 1000:.1f} ms | CPU {cpu:.2f} s")
+
+    assert len(terminados) == len(codigos), f"terminaron {len(terminados)} de {len(codigos)} cuentas"
+    temporizadores.detener(espera=5)
+    assert not any(hilo.is_alive() for hilo in tareas), "la tarea de las cuentas regresivas sigue corriendo"
+    print(f"tarea de fondo detenida ({len(tareas)} arranques)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/torneos.py
+#
+# Costo de mantener los agregados de un torneo: cuánto tarda cada /endRound
+# en actualizar la clasificación y las estadísticas de respuestas, cuánto
+# tarda servir la clasificación precalculada frente a recalcularla leyendo
+# todas las rondas, y cuánto tarda y cuánta memoria usa reconstruir los
+# agregados en una pasada por el historial. Comprueba que la reconstrucción
+# da los mismos totales que las actualizaciones incrementales.
+# Uso: python -m benchmarks.torneos [--almacen memoria|sqlite] [--torneos T] [--partidas G] [--rondas R]
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from app.estado import HistorialMemoria
+from app.torneos import TorneosMemoria, contribucion_ronda, ordenar_equipos, reconstruir, registrar_ronda, sumar_contribucion
+
+EQUIPOS = [f"Equipo {numero}" for numero in range(40)]
+
+
+def ronda(numero, marcador, azar):
+    equipos = azar.sample(EQUIPOS, 2)
+    respuestas = [{"respuesta": f"respuesta {i}", "pts": 40 - i * 8, "revealed": azar.random() < 0.6} for i in range(5)]
+    ganador = equipos[numero % 2]
+    puntos = sum(r["pts"] for r in respuestas if r["revealed"])
+    return {
+        "numero": numero,
+        "equipo1": {"name": equipos[0], "score": marcador.get(equipos[0], 0) + (puntos if ganador == equipos[0] else 0)},
+        "equipo2": {"name": equipos[1], "score": marcador.get(equipos[1], 0) + (puntos if ganador == equipos[1] else 0)},
+        "pregunta": f"¿Pregunta {azar.randrange(300)}?",
+        "respuestas": respuestas,
+    }
+
+
+def almacenes(tipo):
+    if tipo == "memoria":
+        return TorneosMemoria(), HistorialMemoria()
+    from app.compartido import HistorialSQLite, TorneosSQLite
+    ruta = os.path.join(tempfile.mkdtemp(), "torneos.db")
+    return TorneosSQLite(ruta), HistorialSQLite(ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--almacen", choices=("memoria", "sqlite"), default="sqlite")
+    parser.add_argument("--torneos", type=int, default=10)
+    parser.add_argument("--partidas", type=int, default=20, help="Partidas por torneo")
+    parser.add_argument("--rondas", type=int, default=15, help="Rondas por partida")
+    args = parser.parse_args()
+
+    azar = random.Random(11)
+    torneos, historial = almacenes(args.almacen)
+    tiempos = []
+    ids = []
+    for numero_torneo in range(args.torneos):
+        torneo = torneos.crear(f"Torneo {numero_torneo}")
+        ids.append(torneo["id"])
+        for numero_partida in range(args.partidas):
+            code = f"T{numero_torneo:02d}P{numero_partida:02d}"
+            torneos.agregar_partida(torneo["id"], code)
+            marcador = {}
+            for numero in range(1, args.rondas + 1):
+                datos = ronda(numero, marcador, azar)
+                marcador = {datos["equipo1"]["name"]: datos["equipo1"]["score"], datos["equipo2"]["name"]: datos["equipo2"]["score"]}
+                historial.agregar(code, datos)
+                inicio = time.perf_counter()
+                registrar_ronda(torneos, torneo["id"], code, datos)
+                tiempos.append(time.perf_counter() - inicio)
+
+    total_rondas = len(tiempos)
+    tiempos.sort()
+    print(f"{args.torneos} torneos x {args.partidas} partidas x {args.rondas} rondas = {total_rondas} rondas, almacén {args.almacen}")
+    print(f"actualizar al terminar una ronda   p50 {statistics.median(tiempos) * 1e3:7.3f} ms   p99 {tiempos[int(len(tiempos) * 0.99)] * 1e3:7.3f} ms")
+
+    incremental = {torneo: torneos.clasificacion(torneo, 1000) for torneo in ids}
+    respuestas_incremental = {torneo: torneos.estadisticas_respuestas(torneo, 20) for torneo in ids}
+
+    inicio = time.perf_counter()
+    for torneo in ids:
+        torneos.clasificacion(torneo)
+    precalculada = (time.perf_counter() - inicio) / len(ids)
+
+    # Lo que costaría sin agregados: leer todas las rondas del torneo y sumar.
+    inicio = time.perf_counter()
+    for torneo in ids:
+        marcadores, equipos, respuestas = {}, {}, {}
+        for ronda_historial in historial.iterar(torneos.obtener(torneo)["codigos"]):
+            code = ronda_historial["codigo"]
+            marcadores[code], equipos_ronda, respuestas_ronda = contribucion_ronda(ronda_historial, marcadores.get(code, {}))
+            sumar_contribucion(equipos, respuestas, equipos_ronda, respuestas_ronda)
+        ordenar_equipos(list(equipos.values()), 50)
+    recalculada = (time.perf_counter() - inicio) / len(ids)
+    print(f"clasificación precalculada {precalculada * 1e3:9.3f} ms   recalculada desde el historial {recalculada * 1e3:9.3f} ms")
+
+    inicio = time.perf_counter()
+    procesadas = reconstruir(torneos, historial)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    reconstruir(torneos, historial)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"reconstruir {procesadas} rondas en {segundos:.2f} s ({procesadas / segundos:.0f} rondas/s), "
+          f"pico de memoria {pico / 1e6:.1f} MB")
+
+    for torneo in ids:
+        assert torneos.clasificacion(torneo, 1000) == incremental[torneo], "la reconstrucción no coincide con los agregados incrementales"
+        assert torneos.estadisticas_respuestas(torneo, 20) == respuestas_incremental[torneo]
+    print("agregados reconstruidos iguales a los incrementales")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ export default function Page() {
   const [mode, setMode] = useState<'null' | 'tablero' | 'control'>('null');
   const { apiUrl } = useApi()
   const [socket, setSocket] = useState<Socket>(io(apiUrl));
+  const [formato, setFormato] = useState('json');
 
   useEffect(() => {
     const queryParams = new URLSearchParams(location.search);
@@ -21,6 +22,10 @@ export default function Page() {
 
     const savedMode = urlMode || localStorage.getItem('mode');
     const savedGameCode = urlGameCode || localStorage.getItem('gameCode');
+    // ?formato=compacto pide las actualizaciones del tablero sin claves (ver lib/compacto.ts).
+    const formato = queryParams.get('formato') || localStorage.getItem('formato') || 'json';
+    localStorage.setItem('formato', formato);
+    setFormato(formato);
 
     if (savedMode) setMode(savedMode as 'null' | 'tablero' | 'control');
     if (savedMode && savedGameCode) setGameCode(savedGameCode);
@@ -30,12 +35,12 @@ export default function Page() {
       setSocket(newSocket);
 
       if (savedMode === 'tablero') {
-        newSocket.emit('joinGame', { code: savedGameCode });
+        newSocket.emit('joinGame', { code: savedGameCode, formato });
         newSocket.on('joinedBoard', (data) => {
           console.log("Board joined:", data);
         });
       } else {
-        newSocket.emit('generateGameCode');
+        newSocket.emit('generateGameCode', { formato });
         newSocket.on('gameCodeGenerated', (data) => {
           console.log("Game generated:", data);
           setGameCode(data.code);
@@ -63,7 +68,7 @@ export default function Page() {
   return (
     <>
       {mode === 'null' && <HomePage gameCode={gameCode} onModeSelect={handleModeSelect} />}
-      {mode === 'tablero' && <TableroPage gameCode={gameCode} socketio={socket} />}
+      {mode === 'tablero' && <TableroPage gameCode={gameCode} socketio={socket} formato={formato} />}
       {mode === 'control' && <ControlPage gameCode={gameCode} />}
     </>
   );
@@ -1,6 +1,6 @@
 "use client"
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useRouter } from 'next/navigation'
 import { motion, AnimatePresence } from 'framer-motion'
 import { Button } from "@/components/ui/button"
@@ -12,6 +12,8 @@ import { Progress } from "@/components/ui/progress"
 import confetti from 'canvas-confetti'
 import AppLoading from '../ui/loading'
 import { useApi } from '@/hooks/useApi';
+import { useControl } from '@/hooks/useControl';
+import { applyPatch } from '@/lib/json-patch';
 
 type Team = {
   name: string
@@ -40,172 +42,113 @@ export function GameControl({ gameCode, handleStatus }: GameControlProps) {
   const [currentTeamIndex, setCurrentTeamIndex] = useState(0)
   const [roundScore, setRoundScore] = useState(0)
   const [strikes, setStrikes] = useState(0)
-  const [roundState, setRoundState] = useState<RoundState>('playing')
+  const [roundEnded, setRoundEnded] = useState(false)
   const [question, setQuestion] = useState("")
   const [answers, setAnswers] = useState<Answer[]>([])
   const [showStealAnimation, setShowStealAnimation] = useState(false)
   const [showSuccessfulStealAnimation, setShowSuccessfulStealAnimation] = useState(false)
   const [isStealingPoints, setIsStealingPoints] = useState(false)
   const [isLoading, setIsLoading] = useState(true);
-  const [isInitialDataLoaded, setIsInitialDataLoaded] = useState(false);
+  const gameInfoRef = useRef<any>(null)
   const { apiUrl } = useApi()
+  const { enviar } = useControl(gameCode)
+
+  const roundState: RoundState = roundEnded ? 'ended' : strikes >= 3 ? 'stealing' : 'playing'
+
+  const applyGameInfo = (gameInfo: any) => {
+    gameInfoRef.current = gameInfo;
+    setTeams([gameInfo.equipo1, gameInfo.equipo2]);
+    setQuestion(gameInfo.pregunta);
+    setAnswers(gameInfo.respuestas);
+    setRoundScore(gameInfo.puntuacion_ronda);
+    setCurrentTeamIndex(gameInfo.equipo_actual);
+    setStrikes(gameInfo.strike);
+    setIsStealingPoints(gameInfo.robo_puntos);
+  }
+
+  const fetchGameStatus = async () => {
+    const response = await fetch(apiUrl + `/gameStatus`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ code: gameCode }),
+    });
+    if (!response.ok) {
+      throw new Error('Failed to fetch game status');
+    }
+    const data = await response.json();
+    if (data.success) {
+      applyGameInfo(data.gameInfo);
+    }
+  }
 
   useEffect(() => {
     console.log("Game Code:", gameCode);
-    const fetchGameStatus = async () => {
+    const loadGameStatus = async () => {
       try {
-        const response = await fetch(apiUrl + `/gameStatus`, {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({ code: gameCode }),
-        });
-        if (!response.ok) {
-          throw new Error('Failed to fetch game status');
-        }
-        const data = await response.json();
-        if (data.success) {
-          const gameInfo = data.gameInfo;
-          setTeams([gameInfo.equipo1, gameInfo.equipo2]);
-          setQuestion(gameInfo.pregunta);
-          setAnswers(gameInfo.respuestas);
-          setRoundScore(gameInfo.puntuacion_ronda);
-          setCurrentTeamIndex(gameInfo.equipo_actual);
-          setStrikes(gameInfo.strike);
-          setIsStealingPoints(gameInfo.robo_puntos);
-          setIsInitialDataLoaded(true);
-        }
+        await fetchGameStatus();
       } catch (error) {
         console.error('Error fetching game status:', error);
       } finally {
         setIsLoading(false);
       }
     };
-    fetchGameStatus();
+    loadGameStatus();
   }, [gameCode]);
 
-  const sendGameUpdate = async () => {
-    const gameState = {
-      code: gameCode,
-      equipo1: teams[0],
-      equipo2: teams[1],
-      pregunta: question,
-      respuestas: answers,
-      puntuacion_ronda: roundScore,
-      equipo_actual: currentTeamIndex,
-      strike: strikes,
-      robo_puntos: isStealingPoints,
-    };
-
+  // El servidor calcula puntajes, strikes y robos; solo se envía el comando
+  // y se aplica el parche que devuelve.
+  const sendCommand = async (comando: string, datos: Record<string, number> = {}) => {
     try {
-      const response = await fetch(apiUrl + '/updateGameBoard', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(gameState),
-      });
-      if (!response.ok) {
-        throw new Error('Error actualizando el estado del juego');
-      }
-      const data = await response.json();
-      if (data.success) {
-        console.log('Estado del juego actualizado exitosamente');
-      } else {
-        console.error('Error al actualizar el estado del juego:', data.message);
+      const data = await enviar('roundCommand', { comando, revision: gameInfoRef.current?.revision, ...datos });
+      if (!data.success) {
+        console.error('Error al ejecutar el comando:', data.message);
+        await fetchGameStatus();
+        return null;
       }
+      const gameInfo = data.gameInfo ?? applyPatch(gameInfoRef.current, data.ops);
+      applyGameInfo(gameInfo);
+      return gameInfo;
     } catch (error) {
-      console.error('Error al enviar la actualización del juego:', error);
+      console.error('Error al enviar el comando:', error);
+      return null;
     }
   };
 
-  useEffect(() => {
-    if (isInitialDataLoaded) {
-      sendGameUpdate();
+  const handleRevealAnswer = async (index: number) => {
+    const wasStealing = isStealingPoints
+    const gameInfo = await sendCommand('revelar', { indice: index })
+    if (wasStealing && gameInfo && !gameInfo.robo_puntos) {
+      handleSuccessfulSteal()
     }
-  }, [teams, currentTeamIndex, roundScore, strikes, roundState, question, answers, isStealingPoints, isInitialDataLoaded]);
-
-
-  const handleRevealAnswer = (index: number) => {
-    const newAnswers = [...answers]
-    if (newAnswers[index].revealed) {
-      newAnswers[index].revealed = false;
-      newAnswers[index].shownOnBoard = false;
-      if (!isStealingPoints) {
-        setRoundScore(roundScore - newAnswers[index].pts)
-        const teamsNew = [...teams];
-        teamsNew[currentTeamIndex].score -= newAnswers[index].pts;
-        setTeams(teamsNew);
-      }
-    } else {
-      newAnswers[index].revealed = true;
-      newAnswers[index].shownOnBoard = true;
-      if (isStealingPoints) {
-        const newScore = roundScore + newAnswers[index].pts
-        const teamsNew = [...teams];
-        const teamIndex = currentTeamIndex === 0 ? 1 : 0;
-        teamsNew[currentTeamIndex].score += newScore;
-        teamsNew[teamIndex].score -= roundScore;
-        setRoundScore(roundScore + newAnswers[index].pts)
-        setTeams(teamsNew);
-        handleSuccessfulSteal(newAnswers[index].pts)
-      } else {
-        setRoundScore(roundScore + newAnswers[index].pts)
-        const teamsNew = [...teams];
-        teamsNew[currentTeamIndex].score += newAnswers[index].pts;
-        setTeams(teamsNew);
-      }
-    }
-    setAnswers(newAnswers)
   }
 
   const handleSwitchTeam = (index: number) => {
-    const teamsNew = [...teams];
-    teamsNew[index].score += roundScore;
-    teamsNew[currentTeamIndex].score -= roundScore;
-    setTeams(teamsNew);
-    setCurrentTeamIndex(index);
-    console.log(`Team ${currentTeamIndex} has changed to team ${index}`);
+    sendCommand('asignar', { equipo: index })
   }
 
   const handleShowOnBoard = (index: number) => {
-    const newAnswers = [...answers]
-    newAnswers[index].shownOnBoard = !newAnswers[index].shownOnBoard
-    setAnswers(newAnswers)
+    sendCommand('mostrar', { indice: index })
   }
 
   const handleAddStrike = () => {
-    if (strikes < 3) {
-      setStrikes(strikes + 1)
-      if (strikes === 2) {
-        setRoundState('stealing')
-      }
-    }
+    sendCommand('strike')
   }
 
   const handleRemoveStrike = () => {
-    if (strikes > 0) {
-      setStrikes(strikes - 1)
-      if (roundState === 'stealing') {
-        setRoundState('playing')
-      }
-    }
+    sendCommand('quitar_strike')
   }
 
   const handleStealPoints = () => {
     setShowStealAnimation(true)
     setTimeout(() => {
       setShowStealAnimation(false)
-      setIsStealingPoints(true)
-      setCurrentTeamIndex(1 - currentTeamIndex)
+      sendCommand('robar')
     }, 2000)
   }
 
-  const handleSuccessfulSteal = (points: number) => {
-    setIsStealingPoints(false)
-    setRoundState('playing')
-    setStrikes(0)
+  const handleSuccessfulSteal = () => {
     confetti({
       particleCount: 100,
       spread: 70,
@@ -214,17 +157,11 @@ export function GameControl({ gameCode, handleStatus }: GameControlProps) {
   }
 
   const handleEndRound = () => {
-    setRoundState('ended')
+    setRoundEnded(true)
   }
 
   const handleNextRound = async () => {
-    await fetch(apiUrl + '/endRound', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ code: gameCode }),
-    })
+    await enviar('endRound', { revision: gameInfoRef.current?.revision })
 
     handleStatus("game-selection");
   }
@@ -32,13 +32,9 @@ export function GameInit({ gameCode, handleStatus }: GameInitProps) {
   useEffect(() => {
     let interval: NodeJS.Timeout
     if (showQuestion && timer > 0) {
+      // El servidor lleva la cuenta y la envía a los tableros; aquí solo se muestra.
       interval = setInterval(() => {
         setTimer((prevTimer) => prevTimer - 1)
-        fetch(apiUrl + '/gameRegressive', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ code: gameCode, regresive: timer - 1 }),
-        });
         if (timer == 1) fetchQuestion();
       }, 1000)
     } else if (timer === 0) {
@@ -98,7 +94,7 @@ export function GameInit({ gameCode, handleStatus }: GameInitProps) {
     fetch(apiUrl + '/gameRegressive', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ code: gameCode, regresive: timer }),
+      body: JSON.stringify({ code: gameCode, accion: 'iniciar', regresive: timer }),
     });
   }
 
@@ -7,7 +7,7 @@ import { Card, CardContent } from "@/components/ui/card"
 import { Label } from "@/components/ui/label"
 import { Textarea } from "@/components/ui/textarea"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
-import { AlertCircle, Search, Plus, Trophy, Edit, Flag, Eye } from 'lucide-react'
+import { AlertCircle, Search, Plus, Trophy, Edit, Flag, Eye, Shuffle } from 'lucide-react'
 import { Badge } from "@/components/ui/badge"
 import { useApi } from '@/hooks/useApi';
 
@@ -122,6 +122,27 @@ export function GameSelection({ gameCode, handleStatus }: GameSelectionProps) {
     fetchQuestions(currentPage)
   }, [searchTerm, selectedCategory, currentPage])
 
+  // El servidor sortea entre las preguntas que esta partida aún no usó.
+  const handleRandomQuestion = async () => {
+    try {
+      const response = await fetch(`${apiUrl}/gameDrawQuestions`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ code: gameCode, cantidad: 1, category: selectedCategory }),
+      });
+      const data = await response.json();
+      if (!data.success) {
+        setError(data.message || 'No se pudo sortear una pregunta.');
+      } else if (data.questions.length === 0) {
+        setError('No quedan preguntas sin usar en esta categoría.');
+      } else {
+        handleStartRound(data.questions[0]);
+      }
+    } catch (error) {
+      setError('Error al conectar con el servidor.');
+    }
+  };
+
   const handleStartRound = (question: Question) => {
     if (!question.tema.trim()) {
       setError('El tema de la pregunta no puede estar vacío.');
@@ -193,8 +214,13 @@ export function GameSelection({ gameCode, handleStatus }: GameSelectionProps) {
     }
     try {
       setLoading(true)
-      const response = await fetch(`${apiUrl}/generar-preguntas?tema=${topicInput}`)
-      const data = await response.json()
+      let response = await fetch(`${apiUrl}/generar-preguntas?tema=${topicInput}`)
+      let data = await response.json()
+      while (response.status === 202) {
+        await new Promise((resolve) => setTimeout(resolve, 1000))
+        response = await fetch(`${apiUrl}/generar-preguntas/${data.trabajo}`)
+        data = await response.json()
+      }
       if (data.preguntas) {
         setGeneratedQuestions(data.preguntas)
       } else {
@@ -293,6 +319,9 @@ export function GameSelection({ gameCode, handleStatus }: GameSelectionProps) {
               onChange={(e) => setSearchTerm(e.target.value)}
               className="w-full sm:w-64"
             />
+            <Button variant="secondary" onClick={handleRandomQuestion} disabled={loading}>
+              <Shuffle className="mr-2 h-4 w-4" /> Al azar
+            </Button>
           </div>
         </div>
 
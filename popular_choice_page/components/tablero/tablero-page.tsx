@@ -1,7 +1,9 @@
 "use client"
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useApi } from '@/hooks/useApi';
+import { applyPatch } from '@/lib/json-patch';
+import { FORMATO_COMPACTO, aplicarOpsCompactas, compactar, expandir } from '@/lib/compacto';
 import { Socket } from 'socket.io-client';
 import AppLoading from '../ui/loading';
 import ErrorScreen from '../ui/error';
@@ -27,9 +29,10 @@ type Answer = {
 interface TableroPageProps {
     gameCode: string;
     socketio: Socket;
+    formato?: string;
 }
 
-export function TableroPage({ gameCode, socketio }: TableroPageProps) {
+export function TableroPage({ gameCode, socketio, formato = 'json' }: TableroPageProps) {
     const [isLoading, setIsLoading] = useState(true);
     const [status, setStatus] = useState<'game-setup' | 'game-selection' | 'game-init' | 'game-control' | 'disconnected' | null>(null);
     const [error, setError] = useState<string | null>(null);
@@ -46,34 +49,69 @@ export function TableroPage({ gameCode, socketio }: TableroPageProps) {
     const [answers, setAnswers] = useState<Answer[]>([])
     const [isStealingPoints, setIsStealingPoints] = useState(false)
 
+    const gameInfoRef = useRef<any>(null);
+    const versionRef = useRef(0);
+    // Último segundo recibido por regresiveTick; el estado guardado solo trae el valor inicial.
+    const tickRef = useRef<number | null>(null);
+    // Estado en formato compacto, sobre el que se aplican los patchBoard compactos.
+    const compactRef = useRef<any[] | null>(null);
+
+    const applyGameInfo = (gameInfo: any, version: number, compacto?: any[]) => {
+        gameInfoRef.current = gameInfo;
+        versionRef.current = version;
+        if (formato === FORMATO_COMPACTO) {
+            compactRef.current = compacto ?? compactar(gameInfo);
+        }
+        setTitulo(gameInfo.titulo);
+        setTeams([gameInfo.equipo1, gameInfo.equipo2]);
+        setQuestion(gameInfo.pregunta);
+        setAnswers(gameInfo.respuestas);
+        setRoundScore(gameInfo.puntuacion_ronda);
+        setCurrentTeamIndex(gameInfo.equipo_actual);
+        setStrikes(gameInfo.strike);
+        setIsStealingPoints(gameInfo.robo_puntos);
+        setStatus(gameInfo.estado);
+        if (!gameInfo.regresive) {
+            tickRef.current = null;
+        }
+        setRegressive(tickRef.current ?? gameInfo.regresive);
+    }
+
+    const fetchGameStatus = async (version?: number) => {
+        const response = await fetch(apiUrl + `/gameStatus`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ code: gameCode, version }),
+        });
+        if (!response.ok) {
+            throw new Error('Failed to fetch game status');
+        }
+        const data = await response.json();
+        if (!data.success) {
+            return false;
+        }
+        if (data.temporizador) {
+            tickRef.current = data.temporizador.regresive;
+        }
+        if (data.patches) {
+            let gameInfo = gameInfoRef.current;
+            for (const patch of data.patches) {
+                gameInfo = applyPatch(gameInfo, patch.ops);
+            }
+            applyGameInfo(gameInfo, data.patches.length ? data.patches[data.patches.length - 1].version : versionRef.current);
+        } else {
+            applyGameInfo(data.gameInfo, data.version);
+        }
+        return true;
+    }
+
     useEffect(() => {
         console.log("Game Code:", gameCode);
-        const fetchGameStatus = async () => {
+        const loadGameStatus = async () => {
             try {
-                const response = await fetch(apiUrl + `/gameStatus`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ code: gameCode }),
-                });
-                if (!response.ok) {
-                    throw new Error('Failed to fetch game status');
-                }
-                const data = await response.json();
-                if (data.success) {
-                    const gameInfo = data.gameInfo;
-                    setTitulo(gameInfo.titulo);
-                    setTeams([gameInfo.equipo1, gameInfo.equipo2]);
-                    setQuestion(gameInfo.pregunta);
-                    setAnswers(gameInfo.respuestas);
-                    setRoundScore(gameInfo.puntuacion_ronda);
-                    setCurrentTeamIndex(gameInfo.equipo_actual);
-                    setStrikes(gameInfo.strike);
-                    setIsStealingPoints(gameInfo.robo_puntos);
-                    setStatus(gameInfo.estado);
-                    setRegressive(gameInfo.regresive);
-                } else {
+                if (!await fetchGameStatus()) {
                     setError('Error al obtener el estado del juego. Intenta nuevamente.');
                 }
             } catch (error) {
@@ -83,22 +121,44 @@ export function TableroPage({ gameCode, socketio }: TableroPageProps) {
                 setIsLoading(false);
             }
         };
-        fetchGameStatus();
+        loadGameStatus();
 
         socketio.on('updateBoard', (data) => {
-            console.log(data);
-            setTitulo(data.titulo);
-            setTeams([data.equipo1, data.equipo2]);
-            setQuestion(data.pregunta);
-            setAnswers(data.respuestas);
-            setRoundScore(data.puntuacion_ronda);
-            setCurrentTeamIndex(data.equipo_actual);
-            setStrikes(data.strike);
-            setIsStealingPoints(data.robo_puntos);
-            setStatus(data.estado);
+            if (data.d) {
+                applyGameInfo(expandir(data.d), data.v, data.d);
+                return;
+            }
+            const { version, ...gameInfo } = data;
+            applyGameInfo(gameInfo, version);
+        });
+
+        socketio.on('patchBoard', (data) => {
+            const version = data.v ?? data.version;
+            if (gameInfoRef.current === null || version <= versionRef.current) {
+                return;
+            }
+            if (version !== versionRef.current + 1) {
+                fetchGameStatus(versionRef.current).catch((error) => console.error('Error resyncing game status:', error));
+                return;
+            }
+            if (data.o) {
+                const estado = aplicarOpsCompactas(compactRef.current ?? compactar(gameInfoRef.current), data.o);
+                applyGameInfo(expandir(estado), version, estado);
+                return;
+            }
+            applyGameInfo(applyPatch(gameInfoRef.current, data.ops), version);
+        });
+
+        socketio.on('regresiveTick', (data) => {
+            tickRef.current = data.regresive;
             setRegressive(data.regresive);
         });
 
+        return () => {
+            socketio.off('updateBoard');
+            socketio.off('patchBoard');
+            socketio.off('regresiveTick');
+        };
     }, [gameCode]);
 
     if (isLoading || status === 'game-setup' || status === null) {
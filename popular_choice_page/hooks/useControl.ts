@@ -0,0 +1,56 @@
+// hooks/useControl.ts
+//
+// Canal del controlador por Socket.IO: se une a la partida una vez con
+// controlGame (y de nuevo en cada reconexión) y manda cada acción como
+// controlCommand con ack. Si el socket no está listo, la misma acción va por
+// la ruta HTTP del mismo nombre.
+
+import { useEffect, useRef } from 'react';
+import { io, Socket } from 'socket.io-client';
+import { useApi } from '@/hooks/useApi';
+
+const ESPERA_ACK_MS = 5000
+
+export function useControl(gameCode: string) {
+    const { apiUrl } = useApi()
+    const socketRef = useRef<Socket | null>(null)
+    const unidoRef = useRef(false)
+
+    useEffect(() => {
+        const socket = io(apiUrl)
+        socketRef.current = socket
+        socket.on('connect', async () => {
+            const respuesta = await socket.emitWithAck('controlGame', { code: gameCode })
+            unidoRef.current = respuesta.success
+            if (!respuesta.success) console.error('No se pudo unir el controlador:', respuesta.message)
+        })
+        socket.on('disconnect', () => {
+            unidoRef.current = false
+        })
+        return () => {
+            unidoRef.current = false
+            socket.disconnect()
+        }
+    }, [gameCode])
+
+    const enviar = async (comando: string, datos: Record<string, any> = {}) => {
+        const socket = socketRef.current
+        if (socket && unidoRef.current) {
+            try {
+                return await socket.timeout(ESPERA_ACK_MS).emitWithAck('controlCommand', comando, datos)
+            } catch (error) {
+                console.error('Sin respuesta del canal de control, se usa HTTP:', error)
+            }
+        }
+        const response = await fetch(`${apiUrl}/${comando}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ code: gameCode, ...datos }),
+        })
+        return response.json()
+    }
+
+    return { enviar }
+}
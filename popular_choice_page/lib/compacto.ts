@@ -0,0 +1,76 @@
+// lib/compacto.ts
+//
+// Formato compacto de updateBoard y patchBoard (ver app/compacto.py): los
+// objetos viajan como listas en el orden de su esquema y las ops de parche
+// usan rutas de posiciones sobre ese estado compacto.
+
+export const FORMATO_COMPACTO = 'compacto'
+
+const CAMPOS = [
+    'codigo', 'estado', 'titulo', 'equipo1', 'equipo2', 'pregunta', 'respuestas',
+    'puntuacion_ronda', 'equipo_actual', 'strike', 'robo_puntos', 'regresive', 'revision',
+]
+const CAMPOS_EQUIPO = ['name', 'color', 'score', 'avatar']
+const REVEALED = 1
+const SHOWN_ON_BOARD = 2
+
+export type OpCompacta = [0 | 1 | 2, number[], any?]
+
+const expandirEquipo = (equipo: any) => {
+    if (!Array.isArray(equipo)) return equipo
+    const resultado: any = { ...(equipo[CAMPOS_EQUIPO.length] ?? {}) }
+    CAMPOS_EQUIPO.forEach((campo, indice) => {
+        if (equipo[indice] !== null && equipo[indice] !== undefined) resultado[campo] = equipo[indice]
+    })
+    return resultado
+}
+
+const compactarEquipo = (equipo: any) => {
+    if (!equipo || typeof equipo !== 'object') return equipo
+    const valores: any[] = CAMPOS_EQUIPO.map((campo) => equipo[campo] ?? null)
+    const otros = Object.fromEntries(Object.entries(equipo).filter(([clave]) => !CAMPOS_EQUIPO.includes(clave)))
+    return Object.keys(otros).length ? [...valores, otros] : valores
+}
+
+export const expandir = (estado: any[]) => {
+    const gameInfo: any = {}
+    CAMPOS.forEach((campo, indice) => {
+        const valor = estado[indice]
+        if (campo === 'equipo1' || campo === 'equipo2') {
+            gameInfo[campo] = expandirEquipo(valor)
+        } else if (campo === 'respuestas' && Array.isArray(valor)) {
+            gameInfo[campo] = valor.map(([respuesta, pts, banderas]: [string, number, number]) => ({
+                respuesta,
+                pts,
+                ...(banderas & REVEALED ? { revealed: true } : {}),
+                ...(banderas & SHOWN_ON_BOARD ? { shownOnBoard: true } : {}),
+            }))
+        } else {
+            gameInfo[campo] = valor
+        }
+    })
+    return gameInfo
+}
+
+export const compactar = (gameInfo: any) => CAMPOS.map((campo) => {
+    const valor = gameInfo[campo]
+    if (campo === 'equipo1' || campo === 'equipo2') return compactarEquipo(valor)
+    if (campo === 'respuestas' && Array.isArray(valor)) {
+        return valor.map((r: any) => [r.respuesta, r.pts, (r.revealed ? REVEALED : 0) | (r.shownOnBoard ? SHOWN_ON_BOARD : 0)])
+    }
+    return valor
+})
+
+export const aplicarOpsCompactas = (estado: any[], ops: OpCompacta[]) => {
+    const resultado = structuredClone(estado)
+    for (const [tipo, ruta, valor] of ops) {
+        const ultima = ruta[ruta.length - 1]
+        const padre = ruta.slice(0, -1).reduce((nodo: any, posicion) => nodo[posicion], resultado)
+        if (tipo === 2) {
+            padre.splice(ultima, 1)
+        } else {
+            padre[ultima] = valor
+        }
+    }
+    return resultado
+}
@@ -0,0 +1,26 @@
+// lib/json-patch.ts
+
+export type PatchOp = {
+    op: 'add' | 'remove' | 'replace'
+    path: string
+    value?: any
+}
+
+export const applyPatch = (doc: any, ops: PatchOp[]) => {
+    let result = structuredClone(doc);
+    for (const { op, path, value } of ops) {
+        if (path === '') {
+            result = value;
+            continue;
+        }
+        const keys = path.slice(1).split('/').map((key) => key.replace(/~1/g, '/').replace(/~0/g, '~'));
+        const last = keys.pop() as string;
+        const parent = keys.reduce((node, key) => node[key], result);
+        if (op === 'remove') {
+            Array.isArray(parent) ? parent.splice(Number(last), 1) : delete parent[last];
+        } else {
+            parent[last] = value;
+        }
+    }
+    return result;
+}
@@ -1,6 +1,33 @@
+import os
+
+from dotenv import load_dotenv
+
+# El parcheo debe ocurrir antes de importar la app para que PyMongo y los
+# sockets cooperen con el bucle de eventos en lugar de bloquearlo. El modo se
+# fija aquí y se deja en el entorno, del que lo lee Config para pasarlo a
+# SocketIO(async_mode=...): el parcheo y el servidor siempre coinciden.
+#
+# Por defecto se sirve con eventlet. SOCKETIO_ASYNC_MODE=threading usa el
+# servidor de desarrollo de Werkzeug y solo se permite con DEBUG activo. En
+# producción también se puede usar gunicorn con el worker del mismo modo:
+#   SOCKETIO_ASYNC_MODE=eventlet gunicorn -k eventlet -w 1 -b 0.0.0.0:80 run:app
+# Con varios workers hace falta ALMACEN_COMPARTIDO y sesiones persistentes en
+# el balanceador.
+load_dotenv()
+ASYNC_MODE = os.environ['SOCKETIO_ASYNC_MODE'] = os.getenv('SOCKETIO_ASYNC_MODE') or 'eventlet'
+
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 from app import create_app
+from app.extensions import socketio
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=80)
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=int(os.getenv('PORT', 80)),
+                 allow_unsafe_werkzeug=ASYNC_MODE == 'threading' and app.debug)